@@ -41,6 +41,8 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "finca.capture.TrafficCaptureMiddleware",   # no hace nada con FINCA_CAPTURE_RATE = 0
+    "finca.throttling.AdmissionMiddleware",      # 503 a los GET caros si hay demasiados en curso
 ]
 
 ROOT_URLCONF = "config.urls"
@@ -94,7 +96,87 @@ REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
         "rest_framework.authentication.TokenAuthentication",
     ),
+    # orjson si está instalado (fallback a json de la stdlib) + msgpack para la app
+    "DEFAULT_RENDERER_CLASSES": (
+        "finca.renderers.FastJSONRenderer",
+        "finca.renderers.MessagePackRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ),
+    # token bucket por usuario: escrituras y GET marcados "expensive" (finca/throttling.py)
+    "DEFAULT_THROTTLE_CLASSES": (
+        "finca.throttling.TokenBucketThrottle",
+    ),
+    "DEFAULT_PARSER_CLASSES": (
+        "finca.parsers.FastJSONParser",
+        "finca.parsers.MessagePackParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ),
+}
+
+# --- Eventos en vivo (finca/live.py) ---
+# "local": un solo proceso; "postgres": LISTEN/NOTIFY para varios workers ASGI
+FINCA_LIVE_BACKEND = "local"
+FINCA_LIVE_TICKET_TTL = 60      # segundos de validez del ?ticket= de live/ (EventSource)
+
+# --- Sync incremental (finca/sync.py) ---
+# el token no pasa de las filas con más de estos segundos (ids asignados en el INSERT, visibles en el COMMIT)
+FINCA_SYNC_SETTLE_SECONDS = 5
+
+# --- Tareas en segundo plano / timeline de inicio (finca/tasks.py, finca/timeline.py) ---
+FINCA_TASK_WORKERS     = 4
+FINCA_FANOUT_THRESHOLD = 5000   # seguidores a partir de los cuales se mezcla al leer
+FINCA_FANOUT_BATCH     = 1000
+FINCA_TIMELINE_MAX     = 800
+FINCA_NOTIFICATION_BUCKET_HOURS = 6
+
+# --- Shares de WhatsApp en write-behind (finca/shares.py) ---
+FINCA_WHATSAPP_WRITE_BEHIND = False
+FINCA_WHATSAPP_FLUSH_MS     = 250
+
+# --- URLs de media (finca/media.py) ---
+# FINCA_MEDIA_BASE_URL: origen del CDN / host de media, p. ej. "https://media.example.com/media/"
+FINCA_MEDIA_BASE_URL = ""
+FINCA_MEDIA_SIGNED   = False        # URLs con HMAC y vencimiento (servidas por /api/finca/media/)
+FINCA_MEDIA_URL_TTL  = 24 * 3600
+
+# --- Cache de interacciones por usuario: has_* sin consultas (finca/viewercache.py) ---
+# None = solo si CACHES["default"] es compartido entre procesos (no LocMemCache)
+FINCA_ENGAGEMENT_CACHE     = None
+FINCA_ENGAGEMENT_CACHE_TTL = 24 * 3600
+FINCA_ENGAGEMENT_CACHE_MAX = 20000    # ids por tipo; más que eso sigue por SQL
+
+# --- Cabeza precalculada del feed global (finca/feedcache.py) ---
+FINCA_FEED_HEAD     = 100   # posts más nuevos guardados (máximo ?limit=)
+FINCA_FEED_HEAD_TTL = 5     # segundos antes de recalcular contadores (se sirve la copia vieja)
+
+# --- Límites de uso (finca/throttling.py) ---
+FINCA_THROTTLE_BUDGETS = {
+    "write":     (60, 1.0),    # (ráfaga, tokens por segundo) por usuario
+    "expensive": (20, 0.5),    # listados sin paginar, árbol de comentarios, export
 }
+FINCA_EXPENSIVE_INFLIGHT = 8   # GET "expensive" simultáneos por proceso; el resto → 503
+FINCA_RETRY_AFTER        = 2   # segundos (Retry-After del 503)
+
+# --- Fincas cercanas (finca/geo.py) ---
+FINCA_NEARBY_RADIUS_KM = 25    # radio por defecto de feed/?near=
+FINCA_NEARBY_MAX_KM    = 300   # tope de ?radius=
+FINCA_NEARBY_AUTHORS   = 500   # fincas más cercanas que entran en feed/?near=
+
+# --- Vistas async para los GET de lectura (finca/aviews.py) ---
+# solo bajo ASGI (config/asgi.py); bajo WSGI cada request async crea su propio event loop
+FINCA_ASYNC_VIEWS = False
+
+# --- Captura de tráfico para replay_traffic (finca/capture.py) ---
+FINCA_CAPTURE_RATE = 0.0                          # fracción de requests /api/ a guardar (0 = apagado)
+FINCA_CAPTURE_PATH = BASE_DIR / "traffic.jsonl"
+
+# --- Borrado diferido de posts (finca/deletion.py) ---
+FINCA_DELETE_CHUNK = 1000
+
+# --- Trending (finca/trending.py) ---
+FINCA_TRENDING_HALF_LIFE_HOURS = 12
+FINCA_TRENDING_HORIZON_DAYS    = 14
 
 # --- CORS ---
 CORS_ALLOW_ALL_ORIGINS = True
@@ -0,0 +1,194 @@
+# finca/aviews.py
+"""
+Versiones async de los GET de solo lectura más usados: feed/, saved/,
+comments/ y los listados starrers / whatsappers / reposters / savers.
+
+Bajo ASGI (config/asgi.py) una vista DRF ocupa un hilo durante todo el
+request, también mientras espera a la base. Estas son corrutinas:
+- las consultas independientes (has_* del viewer, muestras por tipo, árbol
+  y total de comentarios, listado y total) van en paralelo con
+  asyncio.gather sobre prefetch.off_loop
+- la serialización y el render (fastpath + FastJSONRenderer) corren fuera
+  del event loop: pueden tocar la base (perfil faltante) y son CPU
+- misma salida que las vistas DRF; lo que no cubren (POST, msgpack, API
+  navegable) se delega a la vista sync (with_fallback)
+
+Se activan con FINCA_ASYNC_VIEWS (urls.py). Bajo WSGI conviene dejarlas
+apagadas: ahí cada request async paga un event loop propio.
+"""
+import asyncio
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from . import fastpath, feedcache, prefetch, throttling
+from .models import Comment, Post
+from .renderers import FastJSONRenderer
+from .serializers import _user_preview
+
+off_loop  = prefetch.off_loop
+_renderer = FastJSONRenderer()
+
+
+# ---- infraestructura ----
+def _json(data, status=200):
+    response = HttpResponse(_renderer.render(data), status=status, content_type="application/json")
+    patch_vary_headers(response, ["Accept"])
+    return response
+
+
+def _error(exc):
+    response = _json({"detail": str(exc.detail)}, status=exc.status_code)
+    if exc.status_code == 401:
+        response["WWW-Authenticate"] = TokenAuthentication.keyword
+    if getattr(exc, "wait", None):
+        response["Retry-After"] = "%d" % exc.wait
+    return response
+
+
+def _not_found():
+    return _json({"detail": f"No {Post._meta.object_name} matches the given query."}, status=404)
+
+
+def _plain_json(request):
+    """¿La respuesta va en JSON? (msgpack y la API navegable quedan para DRF)."""
+    accept = request.headers.get("Accept", "")
+    return (
+        request.GET.get("format") in (None, "json", "compact")
+        and "msgpack" not in accept and "text/html" not in accept
+    )
+
+
+async def _authenticate(request):
+    """Usuario del header `Authorization: Token <key>` (mismas reglas que TokenAuthentication)."""
+    parts = request.headers.get("Authorization", "").split()
+    if not parts or parts[0].lower() != TokenAuthentication.keyword.lower():
+        raise exceptions.NotAuthenticated()
+    if len(parts) != 2:
+        raise exceptions.AuthenticationFailed("Invalid token header.")
+    token = await Token.objects.select_related("user").filter(key=parts[1]).afirst()
+    if token is None:
+        raise exceptions.AuthenticationFailed("Invalid token.")
+    if not token.user.is_active:
+        raise exceptions.AuthenticationFailed("User inactive or deleted.")
+    return token.user
+
+
+def with_fallback(async_view, sync_view):
+    """
+    Vista única para la ruta: los GET en JSON van a `async_view(request, user, ...)`,
+    todo lo demás a la vista DRF de siempre (en un hilo). Conserva el
+    throttle_scope de la vista DRF (bucket y AdmissionMiddleware).
+    """
+    fallback = sync_to_async(sync_view)
+    initkwargs = getattr(sync_view, "initkwargs", {})
+    scope = throttling.scope_for("GET", initkwargs.get("throttle_scope"))
+
+    @csrf_exempt
+    @wraps(async_view)
+    async def view(request, *args, **kwargs):
+        if request.method != "GET" or not _plain_json(request):
+            return await fallback(request, *args, **kwargs)
+        try:
+            user = await _authenticate(request)
+        except exceptions.APIException as exc:
+            return _error(exc)
+        if scope is not None:
+            wait = await off_loop(throttling.take, scope, user.pk)
+            if wait is not None:
+                return _error(exceptions.Throttled(wait))
+        request.user = user
+        return await async_view(request, user, *args, **kwargs)
+    view.initkwargs = initkwargs
+    return view
+
+
+# ---- listados de posts ----
+def _render_posts(rows, ctx):
+    data = fastpath.posts(rows, ctx)
+    if "users" in ctx:
+        data = {"users": ctx["users"], "posts": ctx["posts"], "results": data}
+    return _renderer.render(data)
+
+
+async def _posts_response(request, user, rows, base=None):
+    raw_fields = request.GET.get("fields")
+    fields = {f.strip() for f in raw_fields.split(",") if f.strip()} if raw_fields else None
+    ctx = {"request": request, "fields": fields, "previews": {}}
+    ctx["page_state"] = await prefetch.aresolve(rows, user, fields, base)
+    if request.GET.get("format") == "compact":
+        ctx["users"], ctx["posts"] = {}, {}
+    response = HttpResponse(await off_loop(_render_posts, rows, ctx), content_type="application/json")
+    patch_vary_headers(response, ["Accept"])
+    return response
+
+
+async def feed(request, user):
+    """Igual que PostViewSet.feed: la selección es la misma (feedcache.select)."""
+    try:
+        rows, base = await off_loop(feedcache.select, request.GET, user)
+    except ValueError as exc:
+        return _json({"detail": str(exc)}, status=400)
+    if not isinstance(rows, list):
+        rows = [p async for p in rows]
+    return await _posts_response(request, user, rows, base)
+
+
+async def saved(request, user):
+    qs = prefetch.with_counts(
+        Post.objects.filter(saves__user=user)
+    ).order_by("-saves__created_at", "-created_at")
+    return await _posts_response(request, user, [p async for p in qs])
+
+
+# ---- comentarios ----
+async def comments(request, user, pk):
+    post = await Post.objects.filter(pk=pk).afirst()
+    if post is None:
+        return _not_found()
+    tree, count = await asyncio.gather(
+        off_loop(fastpath.comment_tree, post, request),
+        off_loop(Comment.objects.filter(post=post).count),
+    )
+    return _json({"count": count, "results": tree})
+
+
+# ---- listados de usuarios (starrers, whatsappers, reposters, savers) ----
+def _previews(qs, user_field, request):
+    results = []
+    for row in qs:
+        item = _user_preview(getattr(row, user_field), request)
+        item["created_at"] = row.created_at
+        results.append(item)
+    return results
+
+
+def _user_list(kind):
+    model, fk, user_field = prefetch.ENGAGEMENT[kind]
+
+    async def view(request, user, pk):
+        if not await Post.objects.filter(pk=pk).aexists():
+            return _not_found()
+        qs = (
+            model.objects.filter(**{fk: pk})
+            .select_related(user_field, f"{user_field}__finca_profile")
+            .order_by("-created_at")
+        )
+        results, count = await asyncio.gather(
+            off_loop(_previews, qs, user_field, request), off_loop(qs.count),
+        )
+        return _json({"count": count, "results": results})
+    view.__name__ = f"{kind}_users"
+    return view
+
+
+starrers    = _user_list("star")
+whatsappers = _user_list("whatsapp")
+reposters   = _user_list("repost")
+savers      = _user_list("save")
@@ -0,0 +1,146 @@
+# finca/batch.py
+"""
+Aplicación en lote de la cola offline de la app (batch/).
+
+Las operaciones llegan en orden con una clave de idempotencia por operación.
+Estrella / guardado son de "fijar estado" (star / unstar, save / unsave), así
+que un reintento no invierte nada. Se calcula el estado final por
+(post, tipo) y se aplica con pocas sentencias:
+
+- estado actual del usuario en los posts afectados: 1 consulta UNION
+- altas: bulk_create(ignore_conflicts=True) por tipo
+- bajas: un DELETE por tipo
+- comentarios: un bulk_create
+- ChangeLog: un solo INSERT (sync.record_many)
+
+Las claves se reservan primero (BatchReceipt, INSERT con ON CONFLICT DO
+NOTHING) y solo se aplican las operaciones cuya clave insertó este request:
+un reintento que llega mientras el original sigue en curso espera su commit
+y las ve como duplicadas, en vez de repetir los comentarios.
+"""
+import secrets
+
+from django.db import transaction
+
+from . import prefetch, sync, tags
+from .models import BatchReceipt, ChangeLog, Comment, Post, PostSave, PostStar, PostWhatsAppShare
+
+MAX_OPS = 200
+
+# op → (tipo, estado deseado)
+SET_OPS = {
+    "star":     ("star", True),
+    "unstar":   ("star", False),
+    "save":     ("save", True),
+    "unsave":   ("save", False),
+    "whatsapp": ("whatsapp", True),
+}
+MODELS = {"star": PostStar, "save": PostSave, "whatsapp": PostWhatsAppShare}
+
+
+class BatchError(ValueError):
+    pass
+
+
+def _validate(ops):
+    if not isinstance(ops, list) or not ops:
+        raise BatchError("operations debe ser una lista no vacía.")
+    if len(ops) > MAX_OPS:
+        raise BatchError(f"Máximo {MAX_OPS} operaciones por lote.")
+    for op in ops:
+        if not isinstance(op, dict) or not op.get("key") or op.get("op") not in (*SET_OPS, "comment"):
+            raise BatchError("Cada operación necesita key y un op válido.")
+
+
+def _claim(user, keys):
+    """
+    Reserva las claves antes de aplicar nada: INSERT … ON CONFLICT DO NOTHING
+    con un sello propio del request. Un reintento concurrente choca con el
+    índice único (en Postgres espera al commit del otro) y no las obtiene; se
+    devuelven solo las claves que insertó este request.
+    """
+    nonce = secrets.token_hex(8)
+    BatchReceipt.objects.bulk_create(
+        [BatchReceipt(user=user, key=key, status=nonce) for key in keys], ignore_conflicts=True,
+    )
+    claimed = set(
+        BatchReceipt.objects.filter(user=user, key__in=keys, status=nonce).values_list("key", flat=True)
+    )
+    return nonce, claimed
+
+
+@transaction.atomic
+def apply(user, ops):
+    """
+    Devuelve (resultados por operación en orden, ids de posts afectados).
+    Los posts de las operaciones duplicadas también cuentan como afectados:
+    un reintento recibe igual el estado final.
+    """
+    _validate(ops)
+    keys = [str(op["key"])[:64] for op in ops]
+    nonce, claimed = _claim(user, set(keys))
+    wanted_posts = {int(op["post"]) for op in ops if str(op.get("post", "")).isdigit()}
+    existing = set(Post.objects.filter(id__in=wanted_posts).values_list("id", flat=True))
+    parents = {
+        int(op["parent"]) for op in ops if op["op"] == "comment" and str(op.get("parent") or "").isdigit()
+    }
+    parent_posts = dict(Comment.objects.filter(id__in=parents).values_list("id", "post_id"))
+
+    results, desired, comments, failed, seen_posts = [], {}, [], set(), set()
+    for op, key in zip(ops, keys):
+        post_id = int(op["post"]) if str(op.get("post", "")).isdigit() else None
+        if key not in claimed:
+            results.append({"key": key, "status": "duplicate"})
+            if post_id in existing:
+                seen_posts.add(post_id)
+            continue
+        claimed.discard(key)         # la misma clave repetida en el lote: duplicada
+        if post_id not in existing:
+            results.append({"key": key, "status": "error", "detail": "Post no existe."})
+            failed.add(key)
+            continue
+        if op["op"] == "comment":
+            text = (op.get("text") or "").strip()
+            parent = int(op["parent"]) if str(op.get("parent") or "").isdigit() else None
+            if not text:
+                results.append({"key": key, "status": "error", "detail": "Texto requerido."})
+                failed.add(key)
+                continue
+            if parent is not None and parent_posts.get(parent) != post_id:
+                results.append({"key": key, "status": "error", "detail": "Comentario padre inválido."})
+                failed.add(key)
+                continue
+            comments.append(Comment(post_id=post_id, user=user, text=text, parent_id=parent))
+        else:
+            kind, value = SET_OPS[op["op"]]
+            desired[(post_id, kind)] = value     # la última operación gana
+        results.append({"key": key, "status": "applied"})
+
+    affected = {pid for pid, _ in desired} | {c.post_id for c in comments}
+    # estado real en la base (el cache puede ir un commit por detrás)
+    current = prefetch.viewer_flags(list(affected), user, MODELS, use_cache=False) if affected else {}
+    log = []
+    for kind, model in MODELS.items():
+        add = [pid for (pid, k), v in desired.items() if k == kind and v and pid not in current.get(kind, ())]
+        remove = [pid for (pid, k), v in desired.items() if k == kind and not v and pid in current.get(kind, ())]
+        if add:
+            model.objects.bulk_create([model(post_id=pid, user=user) for pid in add], ignore_conflicts=True)
+            created = model.objects.filter(user=user, post_id__in=add).values_list("id", "post_id")
+            log += [(kind, ChangeLog.CREATE, oid, pid, user.id) for oid, pid in created]
+        if remove:
+            # delete() emite post_delete → ChangeLog vía signals
+            model.objects.filter(user=user, post_id__in=remove).delete()
+
+    if comments:
+        created = Comment.objects.bulk_create(comments)
+        log += [("comment", ChangeLog.CREATE, c.id, c.post_id, user.id) for c in created]
+        tags.index_comments(created)
+    if log:
+        sync.record_many(log)
+
+    # las que fallaron se pueden reintentar; el resto queda como aplicada
+    receipts = BatchReceipt.objects.filter(user=user, key__in=set(keys), status=nonce)
+    if failed:
+        receipts.filter(key__in=failed).delete()
+    receipts.update(status="applied")
+    return results, affected | seen_posts
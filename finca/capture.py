@@ -0,0 +1,133 @@
+# finca/capture.py
+"""
+Captura por muestreo del tráfico real de la API (para replay_traffic).
+
+Con FINCA_CAPTURE_RATE > 0, TrafficCaptureMiddleware agrega una línea JSON
+por request muestreado a FINCA_CAPTURE_PATH:
+
+    {"ts": 1718000000.12, "method": "POST", "route": "api/finca/posts/<int:pk>/star/",
+     "args": {"pk": "o:3f9c…"}, "query": {"limit": "20", "cursor": "*"},
+     "body": {"text": "str", "parent": "null"}, "user": "u:a41e…",
+     "status": 200, "ms": 12.4, "bytes": 842}
+
+Anonimizado:
+- ids y usernames de la URL y el usuario autenticado → HMAC corto (estable,
+  para conservar el sesgo de acceso a posts / usuarios "calientes")
+- query: solo se guardan valores de SAFE_PARAMS; el resto queda como "*"
+- body: solo la forma (claves y tipos), nunca los valores; multipart solo
+  el tamaño
+
+Sync y async: bajo ASGI no fuerza async_to_sync en la cadena; el armado de la
+línea (puede resolver request.user) y la escritura al archivo van en un hilo.
+"""
+import hashlib
+import hmac
+import json
+import random
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+
+RATE = getattr(settings, "FINCA_CAPTURE_RATE", 0.0)
+PATH = getattr(settings, "FINCA_CAPTURE_PATH", None)
+SAFE_PARAMS = {"limit", "order", "format", "fields"}
+MAX_BODY = 64 * 1024
+
+_KEY = hashlib.sha256(f"finca.capture:{settings.SECRET_KEY}".encode()).digest()
+_lock = threading.Lock()
+
+
+def synthetic(prefix, value):
+    """Id sintético estable (HMAC) para un id / username real."""
+    digest = hmac.new(_KEY, str(value).encode(), hashlib.sha256).hexdigest()[:12]
+    return f"{prefix}:{digest}"
+
+
+def shape(value, depth=0):
+    """Forma de un valor JSON: mismas claves, tipos en vez de valores."""
+    if isinstance(value, dict):
+        if depth >= 3:
+            return "object"
+        return {k: shape(v, depth + 1) for k, v in value.items()}
+    if isinstance(value, list):
+        return [shape(value[0], depth + 1)] if value else []
+    if value is None:
+        return "null"
+    return {bool: "bool", int: "int", float: "float"}.get(type(value), "str")
+
+
+def _body_shape(request):
+    if request.method in ("GET", "HEAD", "OPTIONS", "DELETE"):
+        return None
+    length = int(request.META.get("CONTENT_LENGTH") or 0)
+    if request.content_type == "application/json" and 0 < length <= MAX_BODY:
+        try:
+            # leer body lo deja cacheado: DRF lo vuelve a leer sin problema
+            return shape(json.loads(request.body))
+        except ValueError:
+            return "invalid"
+    return {"_bytes": length} if length else None
+
+
+def _sampled(request):
+    return RATE and PATH and request.path.startswith("/api/") and random.random() < RATE
+
+
+def _record(request, response, body, started, elapsed):
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return
+    user = getattr(request, "user", None)
+    entry = {
+        "ts": round(started, 3),
+        "method": request.method,
+        "route": match.route,
+        "args": {
+            k: synthetic("u" if k == "username" else "o", v) for k, v in match.kwargs.items()
+        },
+        "query": {k: (v if k in SAFE_PARAMS else "*") for k, v in request.GET.items()},
+        "body": body,
+        "user": synthetic("u", user.username) if user and user.is_authenticated else None,
+        "status": response.status_code,
+        "ms": round(elapsed, 2),
+        "bytes": None if response.streaming else len(response.content),
+    }
+    with _lock, open(PATH, "a", encoding="utf-8") as fh:
+        fh.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+
+class TrafficCaptureMiddleware:
+    sync_capable  = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not _sampled(request):
+            return self.get_response(request)
+
+        body = _body_shape(request)
+        started = time.time()
+        t0 = time.perf_counter()
+        response = self.get_response(request)
+        _record(request, response, body, started, (time.perf_counter() - t0) * 1000)
+        return response
+
+    async def __acall__(self, request):
+        if not _sampled(request):
+            return await self.get_response(request)
+
+        body = _body_shape(request)         # ASGIRequest ya tiene el body en memoria (<= MAX_BODY)
+        started = time.time()
+        t0 = time.perf_counter()
+        response = await self.get_response(request)
+        await sync_to_async(_record)(request, response, body, started, (time.perf_counter() - t0) * 1000)
+        return response
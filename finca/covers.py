@@ -0,0 +1,111 @@
+# finca/covers.py
+"""
+Guardado de las slides de portada (POST cover-slides/).
+
+Antes, por cada uno de los 3 slots: get_or_create + save() de todas las
+columnas, sin transacción (hasta 6 consultas), updated_at movido aunque solo
+cambiara un caption (y con él el ETag de bundle/) y las imágenes
+reemplazadas quedaban en el storage.
+
+Ahora, en una transacción:
+- una consulta trae las slides del usuario (FOR UPDATE: dos guardados
+  simultáneos no se pisan)
+- por slot se calcula qué campos cambian respecto a lo guardado; solo los
+  slots con cambios se escriben (bulk_update / bulk_create) y solo a ellos
+  se les mueve updated_at
+- los archivos reemplazados o vaciados se borran después del commit
+La respuesta se arma con los objetos en memoria, sin releer.
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from . import deletion, imagemeta
+from .models import CoverSlide
+
+SLOTS = 3
+
+# sufijo del campo del request (slide{n}_<sufijo>) → (campo del modelo, conversión)
+STYLE = {
+    "text_x":    ("text_x", float),
+    "text_y":    ("text_y", float),
+    "color":     ("text_color", str),
+    "font":      ("text_font", str),
+    "text_size": ("text_size", lambda v: int(float(v))),
+    "effect":    ("effect", str),
+}
+UPSERT_FIELDS = [
+    "image", "image_meta", "caption", "bibliography",
+    "text_color", "text_font", "text_x", "text_y", "text_size", "effect", "updated_at",
+]
+
+
+def _wanted(data, idx, caption, bibliography):
+    """Valores que el request fija para el slot `idx`; lo que no viene queda como está."""
+    want = {}
+    slot_caption = (data.get(f"slide{idx}_caption") or "").strip() or caption
+    if slot_caption:
+        want["caption"] = slot_caption
+    slot_biblio = (data.get(f"slide{idx}_bibliography") or "").strip() or bibliography
+    if slot_biblio:
+        want["bibliography"] = slot_biblio
+    for suffix, (field, cast) in STYLE.items():
+        value = data.get(f"slide{idx}_{suffix}")
+        if value is None:
+            continue
+        try:
+            want[field] = cast(value)
+        except (TypeError, ValueError):
+            pass    # como siempre: un valor que no convierte se ignora
+    return want
+
+
+def save(user, data, files, caption="", bibliography=""):
+    """
+    Aplica el POST de cover-slides/ (slide{n}, slide{n}_clear, slide{n}_<campo>,
+    caption / bibliography globales). Devuelve las SLOTS slides, por índice.
+    """
+    image_field = CoverSlide._meta.get_field("image")
+    slides, created, updated, fields, stale = [], [], [], set(), []
+
+    with transaction.atomic():
+        current = {s.index: s for s in CoverSlide.objects.select_for_update().filter(user=user)}
+        for idx in range(SLOTS):
+            obj = current.get(idx) or CoverSlide(user=user, index=idx)
+            changed = set()
+            for name, value in _wanted(data, idx, caption, bibliography).items():
+                if getattr(obj, name) != value:
+                    setattr(obj, name, value)
+                    changed.add(name)
+
+            upload = files.get(f"slide{idx}")
+            if (upload or data.get(f"slide{idx}_clear")) and obj.image:
+                stale.append((obj.image.storage, obj.image.name))
+                obj.image = None
+                changed.add("image")
+            if upload:
+                obj.image = upload
+                changed.add("image")
+            if "image" in changed:
+                imagemeta.refresh(obj)          # bulk_* no emite pre_save
+                changed.add("image_meta")
+
+            if obj.pk is None:
+                created.append(obj)
+            elif changed:
+                obj.updated_at = timezone.now()  # bulk_update no aplica auto_now…
+                if upload:
+                    image_field.pre_save(obj, False)    # …ni sube el archivo
+                updated.append(obj)
+                fields |= changed
+            slides.append(obj)
+
+        if created:
+            # un guardado concurrente pudo crear el slot primero: gana el último
+            CoverSlide.objects.bulk_create(
+                created, update_conflicts=True, unique_fields=["user", "index"], update_fields=UPSERT_FIELDS,
+            )
+        if updated:
+            CoverSlide.objects.bulk_update(updated, [*fields, "updated_at"])
+        if stale:
+            deletion.unlink_after_commit(stale)
+    return slides
@@ -0,0 +1,158 @@
+# finca/deletion.py
+"""
+Borrado diferido de posts.
+
+`instance.delete()` hacía que el collector de Django cargara en memoria
+todas las estrellas, comentarios (recursivo por `parent`), shares, guardados
+y reposts (con sus propias interacciones) y lo borrara en una sola
+transacción gigante: en un post viral, timeout.
+
+Ahora:
+1. `start` (dentro del request): marca deleted_at en el post y sus reposts
+   (VisiblePostManager los oculta ya), deja el DELETE en ChangeLog para
+   sync/ y crea el PostDeletion → 204. Nada de COUNT en el request.
+2. `run` (tarea en segundo plano): cuenta lo que queda (`total`), borra las
+   filas dependientes en lotes de FINCA_DELETE_CHUNK con un DELETE … WHERE
+   pk IN (…) directo (sin collector ni signals), una transacción por lote,
+   y va sumando `done`.
+   Las tablas hijas se descubren de Post._meta (CASCADE), así que un modelo
+   nuevo con FK a Post entra solo. Se borra por -pk: las respuestas a un
+   comentario siempre tienen id mayor que su padre.
+3. Al terminar se borran los posts y, tras el commit, sus archivos.
+
+Si el proceso muere a mitad, `manage.py purge_posts` retoma los pendientes.
+"""
+import logging
+
+from django.conf import settings
+from django.db import connection, models, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import feedcache, sync, tasks
+from .models import ChangeLog, Post, PostDeletion
+
+logger = logging.getLogger(__name__)
+
+CHUNK = getattr(settings, "FINCA_DELETE_CHUNK", 1000)
+
+
+def _tree(post_id):
+    """El post y todos sus reposts (recursivo), ocultos o no."""
+    ids, frontier = [post_id], [post_id]
+    while frontier:
+        frontier = list(
+            Post.all_objects.filter(repost_of_id__in=frontier).values_list("id", flat=True)
+        )
+        ids += frontier
+    return ids
+
+
+def _dependents():
+    """(modelo, columna FK) de cada tabla que cae en cascada al borrar un Post."""
+    # include_hidden: también las relaciones con related_name="+" (timeline, notificaciones)
+    found = [
+        (rel.related_model, rel.field.attname)
+        for rel in Post._meta.get_fields(include_hidden=True)
+        if rel.auto_created and not rel.concrete and rel.related_model is not Post
+        and rel.on_delete is models.CASCADE
+    ]
+    # primero las tablas que apuntan a otra de la lista (Mention → Comment)
+    tables = {model for model, _ in found}
+
+    def points_to_other(model):
+        return any(
+            f.is_relation and f.related_model in tables - {model} for f in model._meta.concrete_fields
+        )
+    return sorted(found, key=lambda dep: not points_to_other(dep[0]))
+
+
+def start(post):
+    """Oculta el post (y sus reposts) y programa el borrado. Llamar dentro de una transacción."""
+    tree = _tree(post.id)
+    rows = list(
+        Post.all_objects.filter(id__in=tree).values_list("id", "author_id", "repost_of_id", "created_at")
+    )
+    Post.all_objects.filter(id__in=tree).update(deleted_at=timezone.now())
+
+    log = []
+    for pid, author_id, repost_of_id, created_at in rows:
+        log.append(("post", ChangeLog.DELETE, pid, pid, author_id))
+        if repost_of_id:
+            log.append(("repost", ChangeLog.DELETE, pid, repost_of_id, author_id, created_at))
+    sync.record_many(log)
+    feedcache.invalidate()
+
+    job, _ = PostDeletion.objects.update_or_create(
+        post_id=post.id, defaults={"author_id": post.author_id},
+    )
+    tasks.defer(run, job.id)
+    return job
+
+
+def _advance(job_id, n):
+    PostDeletion.objects.filter(id=job_id).update(done=F("done") + n)
+
+
+def _delete_ids(model, ids):
+    """
+    DELETE … WHERE pk IN (ids) en SQL: sin collector (no carga filas) ni
+    signals (el DELETE del post ya quedó en ChangeLog al ocultarlo).
+    """
+    qn = connection.ops.quote_name
+    placeholders = ", ".join(["%s"] * len(ids))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {qn(model._meta.db_table)} WHERE {qn(model._meta.pk.column)} IN ({placeholders})",
+            list(ids),
+        )
+        return cursor.rowcount
+
+
+def run(job_id):
+    """Borra en lotes lo que depende del post, luego los posts y por último sus archivos."""
+    job = PostDeletion.objects.filter(id=job_id, finished_at__isnull=True).first()
+    if job is None:
+        return
+    tree = _tree(job.post_id)
+    dependents = _dependents()
+    # total: lo que ya se borró (si se retoma) + lo que queda
+    remaining = len(tree) + sum(
+        model._base_manager.filter(**{f"{fk}__in": tree}).count() for model, fk in dependents
+    )
+    PostDeletion.objects.filter(id=job.id).update(total=F("done") + remaining)
+
+    for model, fk in dependents:
+        manager = model._base_manager
+        while True:
+            ids = list(
+                manager.filter(**{f"{fk}__in": tree})
+                .order_by("-pk").values_list("pk", flat=True)[:CHUNK]
+            )
+            if not ids:
+                break
+            with transaction.atomic():
+                _advance(job.id, _delete_ids(model, ids))
+
+    files = [
+        (field.storage, field.name)
+        for post in Post.all_objects.filter(id__in=tree).only("image", "video")
+        for field in (post.image, post.video) if field
+    ]
+    with transaction.atomic():
+        _advance(job.id, _delete_ids(Post, tree))
+        PostDeletion.objects.filter(id=job.id).update(finished_at=timezone.now())
+        unlink_after_commit(files)
+
+
+def unlink_after_commit(files):
+    """Borra del storage los archivos [(storage, nombre)] cuando la transacción confirme."""
+    transaction.on_commit(lambda: _unlink(files))
+
+
+def _unlink(files):
+    for storage, name in files:
+        try:
+            storage.delete(name)
+        except Exception:
+            logger.exception("no se pudo borrar el archivo %s", name)
@@ -0,0 +1,156 @@
+# finca/export.py
+"""
+Exportación de datos personales como ZIP en streaming (export/).
+
+El ZIP se escribe sobre un destino no "seekable" (_Sink): zipfile usa data
+descriptors y no necesita volver atrás, así que cada bloque comprimido se
+entrega al cliente en cuanto se produce. Memoria constante:
+
+- filas con .values().iterator(chunk_size=ROW_CHUNK), una por línea del array JSON
+- archivos copiados en bloques de FILE_BLOCK desde el storage (ZIP_STORED:
+  fotos y videos ya vienen comprimidos)
+
+Contenido:
+    data/*.json     perfil, posts, comentarios, interacciones dadas y recibidas,
+                    seguidos / seguidores, portada
+    media/...       todo lo que hay bajo finca_<uid>/ y profile_<uid>/
+"""
+import json
+import zipfile
+
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from users.models import Profile as UserProfile
+
+from .models import (
+    Profile, Post, PostStar, Comment, PostWhatsAppShare, PostSave, CoverSlide, Follow,
+)
+
+ROW_CHUNK  = 2000
+FILE_BLOCK = 1024 * 1024
+
+# tipo de interacción → modelo (dadas: user=yo; recibidas: post__author=yo)
+ENGAGEMENT = {"stars": PostStar, "saves": PostSave, "whatsapp": PostWhatsAppShare}
+
+
+class _Sink:
+    """Destino de ZipFile sin seek: acumula lo escrito hasta que el generador lo vacía."""
+
+    def __init__(self):
+        self._chunks = []
+        self._pos    = 0
+        self.pending = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._pos += len(data)
+        self.pending += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._pos
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        out = b"".join(self._chunks)
+        self._chunks.clear()
+        self.pending = 0
+        return out
+
+
+def _sections(user):
+    """(nombre del archivo, iterable de dicts) de cada tabla exportada."""
+    def rows(qs, *fields):
+        return qs.order_by("pk").values(*fields).iterator(chunk_size=ROW_CHUNK)
+
+    yield "data/account.json", [{
+        "username": user.username, "email": user.email,
+        "date_joined": user.date_joined, "last_login": user.last_login,
+    }]
+    yield "data/finca_profile.json", rows(
+        Profile.objects.filter(user=user),
+        "display_name", "bio", "avatar", "cover", "updated_at",
+    )
+    yield "data/user_profile.json", rows(
+        UserProfile.objects.filter(user=user),
+        "display_name", "bio", "date_of_birth", "gender", "avatar", "cover", "updated_at",
+    )
+    yield "data/posts.json", rows(
+        Post.objects.filter(author=user), "id", "text", "image", "video", "repost_of_id", "created_at",
+    )
+    yield "data/comments.json", rows(
+        Comment.objects.filter(user=user), "id", "post_id", "parent_id", "text", "created_at",
+    )
+    yield "data/comments_received.json", rows(
+        Comment.objects.filter(post__author=user).exclude(user=user),
+        "id", "post_id", "parent_id", "user__username", "text", "created_at",
+    )
+    for kind, model in ENGAGEMENT.items():
+        yield f"data/{kind}_given.json", rows(model.objects.filter(user=user), "post_id", "created_at")
+        yield f"data/{kind}_received.json", rows(
+            model.objects.filter(post__author=user), "post_id", "user__username", "created_at",
+        )
+    yield "data/reposts_received.json", rows(
+        Post.objects.filter(repost_of__author=user), "repost_of_id", "author__username", "created_at",
+    )
+    yield "data/following.json", rows(
+        Follow.objects.filter(follower=user), "followee__username", "created_at",
+    )
+    yield "data/followers.json", rows(
+        Follow.objects.filter(followee=user), "follower__username", "created_at",
+    )
+    yield "data/cover_slides.json", rows(
+        CoverSlide.objects.filter(user=user),
+        "index", "image", "caption", "bibliography", "text_color", "text_font",
+        "text_x", "text_y", "text_size", "effect", "updated_at",
+    )
+
+
+def _walk(storage, prefix):
+    """Rutas de todos los archivos bajo `prefix` en el storage (recursivo)."""
+    try:
+        dirs, files = storage.listdir(prefix)
+    except (FileNotFoundError, NotADirectoryError):
+        return
+    for name in files:
+        yield f"{prefix}/{name}"
+    for sub in dirs:
+        yield from _walk(storage, f"{prefix}/{sub}")
+
+
+def stream(user, storage=default_storage):
+    """Genera el ZIP de `user` en bloques de bytes."""
+    sink = _Sink()
+    stamp = timezone.localtime().timetuple()[:6]
+
+    def entry(name, compress):
+        info = zipfile.ZipInfo(name, date_time=stamp)
+        info.compress_type = compress
+        return info
+
+    with zipfile.ZipFile(sink, "w") as zf:
+        for name, rows in _sections(user):
+            with zf.open(entry(name, zipfile.ZIP_DEFLATED), "w") as fh:
+                fh.write(b"[")
+                for i, row in enumerate(rows):
+                    fh.write((b",\n" if i else b"\n") + json.dumps(
+                        row, cls=DjangoJSONEncoder, ensure_ascii=False,
+                    ).encode())
+                    if sink.pending >= FILE_BLOCK:
+                        yield sink.drain()
+                fh.write(b"\n]\n")
+            yield sink.drain()
+
+        for prefix in (f"finca_{user.id}", f"profile_{user.id}"):
+            for path in _walk(storage, prefix):
+                with storage.open(path, "rb") as src, \
+                        zf.open(entry(f"media/{path}", zipfile.ZIP_STORED), "w", force_zip64=True) as dst:
+                    while block := src.read(FILE_BLOCK):
+                        dst.write(block)
+                        yield sink.drain()
+                yield sink.drain()
+    yield sink.drain()   # directorio central
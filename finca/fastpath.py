@@ -0,0 +1,82 @@
+# finca/fastpath.py
+"""
+Serialización de solo lectura sin la maquinaria de campos de DRF.
+
+Para feed/ el costo ya no está en la base sino en PostSerializer: 20+
+SerializerMethodField, cada uno con get_attribute / to_representation /
+SkipField por post, y CommentSerializer instancia un serializer anidado (y
+hace una consulta) por cada nodo del árbol.
+
+Aquí la lista de (nombre, accessor) se arma una vez por página a partir de
+PostSerializer.Meta.fields (respetando ?fields=) y los get_* se llaman
+directamente sobre un contexto liviano, así que la salida es la misma que la
+del serializer (finca/tests.py lo verifica). Los comentarios salen de una
+sola consulta y el árbol se arma en memoria.
+
+Solo para GET con filas ya resueltas (context["page_state"]).
+"""
+from types import SimpleNamespace
+
+from rest_framework import serializers
+
+from .models import Comment
+from .serializers import PostSerializer, _user_preview, abs_url
+
+# mismo formato que los DateTimeField de los serializers (ISO 8601, zona actual)
+_datetime = serializers.DateTimeField().to_representation
+
+# campos de modelo: accessor directo; el resto son SerializerMethodField (get_<campo>)
+_MODEL_FIELDS = {
+    "id":         lambda obj, ctx: obj.id,
+    "content":    lambda obj, ctx: obj.text,
+    "image":      lambda obj, ctx: abs_url(ctx.get("request"), obj.image),
+    "image_meta": lambda obj, ctx: obj.image_meta,
+    "video":      lambda obj, ctx: abs_url(ctx.get("request"), obj.video),
+    "created_at": lambda obj, ctx: _datetime(obj.created_at),
+}
+
+
+def _post_accessors(ctx):
+    holder = SimpleNamespace(context=ctx)
+    fields = ctx.get("fields")
+    accessors = []
+    for name in PostSerializer.Meta.fields:
+        if fields and name != "id" and name not in fields:
+            continue
+        if name in _MODEL_FIELDS:
+            accessors.append((name, _MODEL_FIELDS[name]))
+        else:
+            method = getattr(PostSerializer, f"get_{name}")
+            accessors.append((name, lambda obj, ctx, m=method: m(holder, obj)))
+    return accessors
+
+
+def posts(rows, ctx):
+    """Lista de dicts igual a PostSerializer(rows, many=True, context=ctx).data."""
+    accessors = _post_accessors(ctx)
+    return [{name: get(obj, ctx) for name, get in accessors} for obj in rows]
+
+
+def comment_tree(post, request):
+    """Raíces con 'replies' anidadas, igual a CommentSerializer, en una sola consulta."""
+    rows = list(
+        Comment.objects.filter(post=post)
+        .select_related("user", "user__finca_profile")
+        .order_by("created_at", "id")
+    )
+    children = {}
+    for c in rows:
+        children.setdefault(c.parent_id, []).append(c)
+
+    def build(c):
+        return {
+            "id": c.id,
+            "text": c.text,
+            "created_at": _datetime(c.created_at),
+            "parent": c.parent_id,
+            "user": _user_preview(c.user, request),
+            "replies": [build(r) for r in children.get(c.id, ())],
+        }
+
+    return [build(c) for c in children.get(None, ())]
+
@@ -0,0 +1,133 @@
+# finca/feedcache.py
+"""
+Cabeza precalculada del feed global (feed/?limit=N).
+
+En hora pico cientos de clientes piden feed/ en el mismo segundo y cada uno
+rearmaba la misma página. Aquí se guarda en cache la parte que no depende del
+viewer para los HEAD posts más nuevos: filas con contadores, autor y
+original del repost, y el PageState con muestras / primeros (prefetch.resolve
+sin viewer). Por request solo quedan los has_* (viewer_flags) y serializar.
+
+Frescura:
+- cada alta / edición / borrado de post sube `ver` (tras el commit) y programa
+  un rebuild en segundo plano
+- una interacción (estrella, comentario, share…) sobre un post que está en la
+  cabeza también sube `ver` (sync._side_effects → counters_changed): así quien
+  acaba de dar estrella no ve has_starred en vivo junto al stars_count viejo
+  más que mientras dura el rebuild
+- la copia vale si su `ver` es el actual y tiene menos de FINCA_FEED_HEAD_TTL s
+
+Estampida: solo quien gana el lock (cache.add) reconstruye; el resto sirve la
+copia anterior (stale-while-revalidate). Sin copia alguna, los demás esperan
+hasta WAIT segundos a que aparezca y si no, van por la consulta normal. Con
+LocMemCache el lock es por proceso; con un cache compartido, global.
+
+select() elige las filas de feed/ (trending, ?near=, cabeza o todo) para
+PostViewSet.feed y aviews.feed: una sola definición de la semántica.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from . import geo, prefetch, tasks
+from .models import Post
+
+HEAD     = getattr(settings, "FINCA_FEED_HEAD", 100)
+FRESH    = getattr(settings, "FINCA_FEED_HEAD_TTL", 5)
+LOCK_TTL = 30
+WAIT     = 1.0
+
+_DATA, _VER, _LOCK = "finca:feedhead:data", "finca:feedhead:ver", "finca:feedhead:lock"
+_IDS = "finca:feedhead:ids"     # ids de la copia: saber si un post está en la cabeza sin leerla entera
+
+
+def _bump():
+    try:
+        cache.incr(_VER)
+    except ValueError:
+        cache.set(_VER, 1, None)
+    tasks.defer(refresh)
+
+
+def invalidate():
+    """Marca la copia como vieja tras el commit y programa su rebuild."""
+    transaction.on_commit(_bump)
+
+
+def counters_changed(post_id):
+    """Llamar tras el commit de una interacción: si el post está en la cabeza, la copia queda vieja."""
+    ids = cache.get(_IDS)
+    if ids is not None and post_id in ids:
+        _bump()
+
+
+def refresh():
+    """Reconstruye si nadie más lo está haciendo."""
+    if cache.add(_LOCK, 1, LOCK_TTL):
+        _rebuild()
+
+
+def _rebuild():
+    # `ver` se lee antes de consultar: un cambio durante el armado deja la copia vieja
+    try:
+        ver = cache.get(_VER, 0)
+        rows = list(prefetch.with_counts(Post.objects.all()).order_by("-created_at", "-id")[:HEAD])
+        snap = {"ver": ver, "built": time.time(), "rows": rows, "state": prefetch.resolve(rows, None)}
+        cache.set_many({_DATA: snap, _IDS: frozenset(row.id for row in rows)}, None)
+        return snap
+    finally:
+        cache.delete(_LOCK)
+
+
+def head():
+    """(filas, PageState sin viewer) de los HEAD posts más nuevos, o None si no hay copia."""
+    got = cache.get_many([_DATA, _VER])
+    snap, ver = got.get(_DATA), got.get(_VER, 0)
+    if snap is not None and snap["ver"] == ver and time.time() - snap["built"] < FRESH:
+        return snap["rows"], snap["state"]
+
+    if cache.add(_LOCK, 1, LOCK_TTL):
+        if snap is None:
+            snap = _rebuild()
+        else:
+            tasks.defer(_rebuild)               # se sirve la copia vieja mientras tanto
+    elif snap is None:
+        deadline = time.monotonic() + WAIT
+        while snap is None and time.monotonic() < deadline:
+            time.sleep(0.05)
+            snap = cache.get(_DATA)
+        if snap is None:
+            return None
+    return snap["rows"], snap["state"]
+
+
+# ---- selección de filas de feed/ (PostViewSet.feed y aviews.feed) ----
+def queryset():
+    return prefetch.with_counts(Post.objects.all()).order_by("-created_at")
+
+
+def select(params, user):
+    """
+    (queryset o lista de filas, PageState base o None) para feed/ con `params`
+    (query string). ValueError si ?near= no es válido.
+    """
+    try:
+        limit = min(max(int(params.get("limit") or 50), 1), 100)
+    except ValueError:
+        limit = 50
+    if params.get("order") == "trending":
+        qs = prefetch.with_counts(Post.objects.filter(trending__isnull=False)).order_by("-trending__score")
+        return qs[:limit], None
+    if "near" in params:
+        lat, lng = geo.origin(params["near"], user)
+        authors = geo.author_ids(lat, lng, geo.radius(params.get("radius"), geo.DEFAULT_KM), user.id)
+        return queryset().filter(author_id__in=authors)[:limit], None
+    if "limit" in params:
+        cached = head() if limit <= HEAD else None
+        if cached is not None:
+            rows, base = cached
+            return rows[:limit], base
+        return queryset()[:limit], None
+    return queryset(), None
@@ -0,0 +1,201 @@
+# finca/geo.py
+"""
+"Fincas cerca de mí" sin PostGIS (Postgres o SQLite tal cual).
+
+Profile.lat / lng son opcionales; al guardar se codifican en Profile.geohash
+(celda de PRECISION caracteres, índice B-tree). Un prefijo del geohash es una
+celda más grande, así que "todo lo que cae en la celda X" es un rango del
+índice (geohash LIKE 'X%').
+
+- radio: se elige la celda más fina cuyo bloque de 3x3 (la celda del punto y
+  sus 8 vecinas) cubre el radio completo; se leen esos 9 prefijos, acotados
+  además en SQL por el rectángulo lat / lng del círculo (las celdas gruesas
+  son enormes), y la distancia exacta (haversine) se filtra en Python
+- k más cercanas: de celdas finas a gruesas hasta tener k candidatos a una
+  distancia que el bloque garantiza cubrir (`reach`); al final, sin celdas
+
+Se devuelven distancias, nunca las coordenadas de otras fincas.
+"""
+import math
+
+from django.conf import settings
+from django.db.models import Q
+
+from .models import Profile
+
+BASE32    = "0123456789bcdefghjkmnpqrstuvwxyz"
+PRECISION = 9            # ~5 m: lo que se guarda en Profile.geohash
+EARTH_KM  = 6371.0088
+KM_PER_DEG = math.pi * EARTH_KM / 180
+
+DEFAULT_KM  = getattr(settings, "FINCA_NEARBY_RADIUS_KM", 25)
+MAX_KM      = getattr(settings, "FINCA_NEARBY_MAX_KM", 300)
+MAX_AUTHORS = getattr(settings, "FINCA_NEARBY_AUTHORS", 500)
+
+
+# ---- geohash ----
+def encode(lat, lng, precision=PRECISION):
+    lat_lo, lat_hi, lng_lo, lng_hi = -90.0, 90.0, -180.0, 180.0
+    out, ch, bits, even = [], 0, 0, True
+    while len(out) < precision:
+        if even:
+            mid = (lng_lo + lng_hi) / 2
+            if lng >= mid:
+                ch, lng_lo = ch * 2 + 1, mid
+            else:
+                ch, lng_hi = ch * 2, mid
+        else:
+            mid = (lat_lo + lat_hi) / 2
+            if lat >= mid:
+                ch, lat_lo = ch * 2 + 1, mid
+            else:
+                ch, lat_hi = ch * 2, mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            out.append(BASE32[ch])
+            ch = bits = 0
+    return "".join(out)
+
+
+def bbox(cell):
+    """(lat_min, lat_max, lng_min, lng_max) de una celda."""
+    lat_lo, lat_hi, lng_lo, lng_hi = -90.0, 90.0, -180.0, 180.0
+    even = True
+    for c in cell:
+        n = BASE32.index(c)
+        for shift in range(4, -1, -1):
+            bit = (n >> shift) & 1
+            if even:
+                mid = (lng_lo + lng_hi) / 2
+                lng_lo, lng_hi = (mid, lng_hi) if bit else (lng_lo, mid)
+            else:
+                mid = (lat_lo + lat_hi) / 2
+                lat_lo, lat_hi = (mid, lat_hi) if bit else (lat_lo, mid)
+            even = not even
+    return lat_lo, lat_hi, lng_lo, lng_hi
+
+
+def block(lat, lng, precision):
+    """
+    Celdas del bloque 3x3 alrededor de (lat, lng) y `reach`: km hasta los que
+    el bloque cubre cualquier punto. Norte / sur: distancia al borde del
+    bloque; este / oeste: distancia del punto al meridiano del borde (arco de
+    círculo máximo), que no se anula cerca de los polos como el ancho de la
+    celda en su latitud extrema.
+    """
+    lat_lo, lat_hi, lng_lo, lng_hi = bbox(encode(lat, lng, precision))
+    dlat, dlng = lat_hi - lat_lo, lng_hi - lng_lo
+    clat, clng = (lat_lo + lat_hi) / 2, (lng_lo + lng_hi) / 2
+    cells = set()
+    for i in (-1, 0, 1):
+        y = clat + i * dlat
+        if not -90 < y < 90:
+            continue
+        for j in (-1, 0, 1):
+            cells.add(encode(y, (clng + j * dlng + 180) % 360 - 180, precision))
+    top, bottom = min(lat_hi + dlat, 90.0), max(lat_lo - dlat, -90.0)
+    ns = min(top - lat, lat - bottom) * KM_PER_DEG
+    edge = math.radians(min(lng - (lng_lo - dlng), (lng_hi + dlng) - lng, 90.0))
+    ew = EARTH_KM * math.asin(min(1.0, math.sin(edge) * math.cos(math.radians(lat))))
+    return cells, min(ns, ew)
+
+
+def distance_km(lat1, lng1, lat2, lng2):
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    a = (math.sin((p2 - p1) / 2) ** 2
+         + math.cos(p1) * math.cos(p2) * math.sin(math.radians(lng2 - lng1) / 2) ** 2)
+    return 2 * EARTH_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+# ---- consultas ----
+def _box(lat, lng, km):
+    """Rectángulo lat / lng que contiene el círculo de `km` (también cruzando ±180°)."""
+    dlat = km / KM_PER_DEG + 1e-9
+    q = Q(lat__range=(max(lat - dlat, -90.0), min(lat + dlat, 90.0)))
+    ratio = math.sin(min(km / EARTH_KM, math.pi / 2)) / max(math.cos(math.radians(lat)), 1e-12)
+    if lat + dlat >= 90 or lat - dlat <= -90 or ratio >= 1:
+        return q                                # el círculo toca un polo: cualquier longitud
+    dlng = math.degrees(math.asin(ratio)) + 1e-9
+    lo, hi = lng - dlng, lng + dlng
+    if lo < -180:
+        return q & (Q(lng__gte=lo + 360) | Q(lng__lte=hi))
+    if hi > 180:
+        return q & (Q(lng__gte=lo) | Q(lng__lte=hi - 360))
+    return q & Q(lng__range=(lo, hi))
+
+
+def _candidates(cells, lat, lng, km, exclude_user_id, with_users):
+    """
+    [(km, Profile)] dentro de `km`, más cercano primero. `cells` = prefijos
+    del geohash (índice) o None para no acotar por celda; el rectángulo va
+    siempre en SQL, así solo llegan a Python filas cerca del círculo.
+    """
+    qs = Profile.objects.filter(_box(lat, lng, km))
+    if cells is not None:
+        q = Q()
+        for cell in cells:
+            q |= Q(geohash__startswith=cell)
+        qs = qs.filter(q)
+    qs = qs.select_related("user") if with_users else qs.only("user_id", "lat", "lng")
+    if exclude_user_id is not None:
+        qs = qs.exclude(user_id=exclude_user_id)
+    found = ((distance_km(lat, lng, p.lat, p.lng), p) for p in qs if p.lat is not None)
+    return sorted(((d, p) for d, p in found if d <= km), key=lambda pair: pair[0])
+
+
+def nearby(lat, lng, radius_km=None, limit=20, exclude_user_id=None, with_users=True):
+    """
+    [(km, Profile)] más cercano primero. Con `radius_km`: todas las fincas
+    dentro del radio (hasta `limit`); sin él: las `limit` más cercanas
+    (dentro de MAX_KM). with_users=False: solo user_id / lat / lng.
+    """
+    if radius_km is not None:
+        radius_km = min(radius_km, MAX_KM)
+        cells = None                        # ni el bloque más grueso alcanza (p. ej. junto a un polo)
+        for p in range(1, PRECISION + 1):
+            finer, reach = block(lat, lng, p)
+            if reach < radius_km:
+                break
+            cells = finer
+        return _candidates(cells, lat, lng, radius_km, exclude_user_id, with_users)[:limit]
+
+    for p in range(7, -1, -1):
+        cells, reach = block(lat, lng, p) if p else (None, MAX_KM)
+        found = _candidates(cells, lat, lng, min(reach, MAX_KM), exclude_user_id, with_users)
+        if len(found) >= limit or reach >= MAX_KM:
+            return found[:limit]
+
+
+def origin(near, user):
+    """
+    (lat, lng) de `near`: "lat,lng" o "me" / vacío (ubicación del perfil de
+    `user`). ValueError con el mensaje para el cliente si no se puede.
+    """
+    if near and near != "me":
+        try:
+            lat, lng = (float(x) for x in near.split(","))
+        except ValueError:
+            raise ValueError("near debe ser 'lat,lng' o 'me'.")
+        if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+            raise ValueError("Coordenadas fuera de rango.")
+        return lat, lng
+    profile = Profile.objects.filter(user=user).only("lat", "lng").first()
+    if profile is None or profile.lat is None or profile.lng is None:
+        raise ValueError("Tu finca no tiene ubicación; envía near=lat,lng.")
+    return profile.lat, profile.lng
+
+
+def radius(value, default=None):
+    """km de ?radius= (acotado a MAX_KM) o `default`."""
+    try:
+        km = float(value)
+    except (TypeError, ValueError):
+        return default
+    return min(km, MAX_KM) if km > 0 else default
+
+
+def author_ids(lat, lng, radius_km, exclude_user_id=None):
+    """Ids de los usuarios con finca dentro del radio (los MAX_AUTHORS más cercanos)."""
+    found = nearby(lat, lng, radius_km, MAX_AUTHORS, exclude_user_id, with_users=False)
+    return [p.user_id for _, p in found]
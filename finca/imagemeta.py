@@ -0,0 +1,79 @@
+# finca/imagemeta.py
+"""
+Metadatos de imágenes para pintar el esqueleto de la tarjeta antes de bajar
+la imagen: ancho / alto (ya con la orientación EXIF aplicada), bytes, MIME,
+color dominante, un placeholder diminuto (JPEG de THUMB px en data URI) y un
+hash del contenido (versión de la URL en media.py).
+
+Se calculan una sola vez al subir el archivo (signals.py, pre_save) y se
+guardan en el JSONField `<campo>_meta` del modelo; los archivos previos se
+completan con `manage.py backfill_media_meta`.
+"""
+import base64
+import hashlib
+import io
+import logging
+
+from PIL import Image, ImageOps
+
+from .models import CoverSlide, Post, Profile
+
+logger = logging.getLogger(__name__)
+
+THUMB = 16
+
+# modelo → {campo de imagen: campo de metadatos}
+FIELDS = {
+    Post:       {"image": "image_meta"},
+    Profile:    {"avatar": "avatar_meta", "cover": "cover_meta"},
+    CoverSlide: {"image": "image_meta"},
+}
+
+
+def extract(fh, size=None):
+    """Metadatos de un archivo abierto (UploadedFile / File); None si no es una imagen legible."""
+    try:
+        fh.seek(0)
+        digest = hashlib.sha256()
+        for block in iter(lambda: fh.read(64 * 1024), b""):
+            digest.update(block)
+        fh.seek(0)
+        with Image.open(fh) as img:
+            width, height = img.size
+            mime = Image.MIME.get(img.format)
+            if img.getexif().get(0x0112, 1) in (5, 6, 7, 8):   # rotada 90°
+                width, height = height, width
+            img.draft("RGB", (THUMB * 8, THUMB * 8))             # JPEG: decodifica ya reducido
+            thumb = ImageOps.exif_transpose(img).convert("RGB")
+            thumb.thumbnail((THUMB, THUMB))
+    except Exception:
+        logger.warning("no se pudieron leer metadatos de %s", getattr(fh, "name", fh))
+        return None
+    finally:
+        fh.seek(0)
+
+    r, g, b = thumb.resize((1, 1), Image.Resampling.BOX).getpixel((0, 0))
+    buf = io.BytesIO()
+    thumb.save(buf, "JPEG", quality=50, optimize=True)
+    return {
+        "width": width,
+        "height": height,
+        "bytes": size if size is not None else getattr(fh, "size", None),
+        "mime": mime,
+        "color": f"#{r:02x}{g:02x}{b:02x}",
+        "placeholder": "data:image/jpeg;base64," + base64.b64encode(buf.getvalue()).decode(),
+        "hash": digest.hexdigest()[:16],
+    }
+
+
+def refresh(instance):
+    """
+    Recalcula los metadatos de los archivos recién asignados (aún sin
+    guardar en el storage) y limpia los de los campos vaciados.
+    """
+    for field, meta in FIELDS[type(instance)].items():
+        ff = getattr(instance, field)
+        if not ff:
+            setattr(instance, meta, None)
+        elif not ff._committed:
+            setattr(instance, meta, extract(ff.file, ff.size))
@@ -0,0 +1,174 @@
+# finca/live.py
+"""
+Bus de eventos en vivo para live/ (SSE).
+
+- ChangeLog (sync.record) publica cada cambio de contador / comentario nuevo
+  después del commit.
+- Backend "local": se entrega directo a las suscripciones de este proceso.
+- Backend "postgres": se publica con pg_notify y un hilo por proceso escucha
+  el canal (LISTEN) y entrega localmente → fan-out entre workers.
+
+Cada suscripción acumula (coalesce) los eventos por post y el stream los
+envía como un solo mensaje por ventana de BATCH_WINDOW segundos.
+
+EventSource no permite headers: el navegador pide un ticket firmado de corta
+vida (POST live/ticket/, con su token) y lo pasa en ?ticket=. El token de la
+API nunca va en la URL (quedaría en los logs de proxies y access logs). Al
+reconectar, el cliente pide un ticket nuevo.
+"""
+import asyncio
+import json
+import logging
+import select
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.core import signing
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+CHANNEL      = "finca_live"
+BATCH_WINDOW = 0.25
+HEARTBEAT    = 15
+TICKET_SALT  = "finca.live.ticket"
+
+
+def ticket(user_id):
+    return signing.dumps(user_id, salt=TICKET_SALT)
+
+
+def ticket_user(value):
+    """user_id de un ticket válido y no vencido, o None."""
+    try:
+        return signing.loads(value, salt=TICKET_SALT, max_age=ticket_ttl())
+    except signing.BadSignature:     # incluye SignatureExpired
+        return None
+
+
+def ticket_ttl():
+    return getattr(settings, "FINCA_LIVE_TICKET_TTL", 60)
+
+
+class Subscription:
+    """Suscripción de una conexión SSE; vive en el event loop que la creó."""
+
+    def __init__(self, post_ids, loop):
+        self.post_ids = frozenset(post_ids)
+        self.loop     = loop
+        self.pending  = {}
+        self.wakeup   = asyncio.Event()
+
+    def push(self, event):
+        entry = self.pending.setdefault(event["post"], {"post": event["post"], "deltas": {}, "new_comments": []})
+        counter = event.get("counter")
+        if counter:
+            entry["deltas"][counter] = entry["deltas"].get(counter, 0) + event["delta"]
+        if event.get("comment"):
+            entry["new_comments"].append(event["comment"])
+        self.wakeup.set()
+
+    def drain(self):
+        out = [e for e in self.pending.values() if e["new_comments"] or any(e["deltas"].values())]
+        self.pending = {}
+        self.wakeup.clear()
+        return out
+
+
+class LiveBus:
+    def __init__(self):
+        self._subs     = defaultdict(set)   # post_id → {Subscription}
+        self._lock     = threading.Lock()
+        self._listener = None
+
+    @property
+    def backend(self):
+        return getattr(settings, "FINCA_LIVE_BACKEND", "local")
+
+    # ---- suscripciones (desde el event loop) ----
+    def subscribe(self, post_ids):
+        sub = Subscription(post_ids, asyncio.get_running_loop())
+        with self._lock:
+            for pid in sub.post_ids:
+                self._subs[pid].add(sub)
+        if self.backend == "postgres":
+            self._ensure_listener()
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            for pid in sub.post_ids:
+                subs = self._subs.get(pid)
+                if subs is not None:
+                    subs.discard(sub)
+                    if not subs:
+                        del self._subs[pid]
+
+    # ---- entrega (thread-safe) ----
+    def deliver(self, event):
+        with self._lock:
+            subs = list(self._subs.get(event["post"], ()))
+        for sub in subs:
+            try:
+                sub.loop.call_soon_threadsafe(sub.push, event)
+            except RuntimeError:   # loop cerrado
+                self.unsubscribe(sub)
+
+    def publish(self, event):
+        if self.backend == "postgres":
+            with connection.cursor() as cur:
+                cur.execute("SELECT pg_notify(%s, %s)", [CHANNEL, json.dumps(event)])
+        else:
+            self.deliver(event)
+
+    # ---- LISTEN/NOTIFY ----
+    def _ensure_listener(self):
+        with self._lock:
+            if self._listener is None or not self._listener.is_alive():
+                self._listener = threading.Thread(target=self._listen, name="finca-live-listen", daemon=True)
+                self._listener.start()
+
+    def _listen(self):
+        raw = connection.get_new_connection(connection.get_connection_params())
+        raw.autocommit = True
+        raw.cursor().execute(f"LISTEN {CHANNEL}")
+        while True:
+            if select.select([raw], [], [], HEARTBEAT) == ([], [], []):
+                continue
+            for notify in _drain_notifies(raw):
+                try:
+                    self.deliver(json.loads(notify.payload))
+                except (ValueError, KeyError):
+                    logger.warning("live: payload inválido %r", notify.payload)
+
+
+def _drain_notifies(raw):
+    """psycopg2 (poll + lista) o psycopg 3 (generador)."""
+    if hasattr(raw, "poll"):
+        raw.poll()
+        while raw.notifies:
+            yield raw.notifies.pop(0)
+    else:
+        yield from raw.notifies(timeout=0)
+
+
+bus = LiveBus()
+
+
+async def stream(sub):
+    """Generador SSE: un mensaje por ventana con todos los eventos acumulados."""
+    try:
+        yield "retry: 3000\n\n"
+        while True:
+            try:
+                await asyncio.wait_for(sub.wakeup.wait(), timeout=HEARTBEAT)
+            except asyncio.TimeoutError:
+                yield ": ping\n\n"
+                continue
+            await asyncio.sleep(BATCH_WINDOW)
+            events = sub.drain()
+            if events:
+                yield f"event: counters\ndata: {json.dumps(events)}\n\n"
+    finally:
+        bus.unsubscribe(sub)
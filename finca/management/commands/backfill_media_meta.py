@@ -0,0 +1,63 @@
+# finca/management/commands/backfill_media_meta.py
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.models import Q
+
+from finca import imagemeta
+
+logger = logging.getLogger(__name__)
+
+
+def _one(model, pk, field, meta):
+    """Lee el archivo desde el storage y guarda sus metadatos (un UPDATE, sin signals)."""
+    try:
+        ff = getattr(model._base_manager.only(field).get(pk=pk), field)
+        with ff.storage.open(ff.name, "rb") as fh:
+            data = imagemeta.extract(fh, ff.storage.size(ff.name))
+        if data is not None:
+            model._base_manager.filter(pk=pk).update(**{meta: data})
+        return data is not None
+    except Exception:
+        logger.exception("backfill de %s #%s falló", model.__name__, pk)
+        return False
+
+
+def _slice(model, pks, field, meta):
+    """Un worker: su parte de los archivos con una sola conexión, cerrada al terminar."""
+    try:
+        return sum(_one(model, pk, field, meta) for pk in pks)
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = (
+        "Calcula los metadatos de imagen (tamaño, MIME, color, placeholder) de los "
+        "archivos subidos antes de imagemeta.py, en paralelo."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=8)
+
+    def handle(self, *args, **opts):
+        workers = max(opts["workers"], 1)
+        total = ok = 0
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for model, fields in imagemeta.FIELDS.items():
+                for field, meta in fields.items():
+                    pending = list(
+                        model._base_manager
+                        .filter(**{f"{meta}__isnull": True})
+                        .exclude(Q(**{f"{field}__isnull": True}) | Q(**{field: ""}))
+                        .values_list("pk", flat=True)
+                    )
+                    # una porción por worker (no un task por archivo): una conexión por hilo
+                    slices = [pending[i::workers] for i in range(workers) if pending[i::workers]]
+                    done = pool.map(lambda pks: _slice(model, pks, field, meta), slices)
+                    total += len(pending)
+                    ok += sum(done)
+                    self.stdout.write(f"{model.__name__}.{field}: {len(pending)} archivos")
+        self.stdout.write(f"Metadatos calculados: {ok}/{total}.")
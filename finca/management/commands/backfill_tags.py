@@ -0,0 +1,38 @@
+# finca/management/commands/backfill_tags.py
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from finca import tags
+from finca.models import Comment, Mention, Post
+
+
+class Command(BaseCommand):
+    help = (
+        "Indexa los hashtags y menciones de los posts y comentarios publicados antes "
+        "de tags.py, por lotes de posts (se puede repetir: cada lote se recalcula entero)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk", type=int, default=500)
+
+    def handle(self, *args, **opts):
+        last = total = 0
+        while True:
+            posts = list(
+                Post.objects.filter(id__gt=last).order_by("id")
+                .only("id", "author_id", "text", "created_at")[:opts["chunk"]]
+            )
+            if not posts:
+                break
+            ids = [p.id for p in posts]
+            with transaction.atomic():
+                tags.index_posts(posts)
+                Mention.objects.filter(post_id__in=ids, comment__isnull=False).delete()
+                tags.index_comments(
+                    Comment.objects.filter(post_id__in=ids)
+                    .only("id", "post_id", "user_id", "text", "created_at")
+                )
+            last = ids[-1]
+            total += len(posts)
+            self.stdout.write(f"{total} posts indexados…")
+        self.stdout.write(f"Listo: {total} posts.")
@@ -0,0 +1,224 @@
+# finca/management/commands/bench.py
+import asyncio
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import AsyncClient, Client, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from finca import fastpath, prefetch, throttling
+from finca.models import Profile, Post, PostStar, PostSave, Comment
+from finca.renderers import FastJSONRenderer, MessagePackRenderer, orjson
+from finca.serializers import PostSerializer
+from finca.views import PostViewSet
+
+
+class _Rollback(Exception):
+    pass
+
+
+def seed(n_posts, n_users=20):
+    """Datos sintéticos (usuarios, posts, estrellas, guardados, comentarios)."""
+    users = [
+        User.objects.create_user(username=f"bench_{i}", password=None)
+        for i in range(n_users)
+    ]
+    Profile.objects.bulk_create([
+        Profile(user=u, display_name=f"Finca {u.username}") for u in users
+    ])
+    posts = Post.objects.bulk_create([
+        Post(author=users[i % n_users], text=f"Cosecha de café #{i} " * 4)
+        for i in range(n_posts)
+    ])
+    PostStar.objects.bulk_create([
+        PostStar(post=p, user=u) for p in posts for u in users[:5]
+    ])
+    PostSave.objects.bulk_create([
+        PostSave(post=p, user=u) for p in posts[::2] for u in users[:3]
+    ])
+    Comment.objects.bulk_create([
+        Comment(post=p, user=users[0], text="¡Qué buena cosecha!") for p in posts
+    ])
+    return users, posts
+
+
+def timed(fn, rounds):
+    """Devuelve (mediana, p95) en milisegundos."""
+    samples = []
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.95) - 1]
+
+
+class Command(BaseCommand):
+    help = "Micro-benchmarks de la API de finca sobre datos sintéticos (se revierten al terminar)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("target", choices=["render", "serialize", "toggle", "async"])
+        parser.add_argument("--posts", type=int, default=50)
+        parser.add_argument("--rounds", type=int, default=200)
+        parser.add_argument("--threads", type=int, default=16)
+
+    def handle(self, *args, **opts):
+        if opts["target"] in ("toggle", "async"):
+            # los hilos usan sus propias conexiones: los datos tienen que estar confirmados
+            users, posts = seed(opts["posts"])
+            try:
+                getattr(self, f"bench_{opts['target']}")(users, posts, opts)
+            finally:
+                User.objects.filter(id__in=[u.id for u in users]).delete()
+            return
+        try:
+            with transaction.atomic():
+                users, posts = seed(opts["posts"])
+                getattr(self, f"bench_{opts['target']}")(users, posts, opts)
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def report(self, label, median, p95, extra=""):
+        self.stdout.write(f"{label:<28} median={median:8.3f} ms  p95={p95:8.3f} ms  {extra}")
+
+    # ---- codificación de una página de feed ----
+    def bench_render(self, users, posts, opts):
+        request = APIRequestFactory().get("/api/finca/feed/")
+        force_authenticate(request, user=users[0])
+        data = PostViewSet.as_view({"get": "feed"})(request).data
+
+        if orjson is None:
+            self.stdout.write("orjson no instalado: FastJSONRenderer usa el fallback de la stdlib")
+        for label, renderer in (
+            ("JSONRenderer (stdlib)", JSONRenderer()),
+            ("FastJSONRenderer", FastJSONRenderer()),
+            ("MessagePackRenderer", MessagePackRenderer()),
+        ):
+            size = len(renderer.render(data))
+            median, p95 = timed(lambda: renderer.render(data), opts["rounds"])
+            self.report(label, median, p95, f"{size} bytes")
+
+    # ---- PostSerializer vs. fastpath sobre la misma página ya resuelta ----
+    def bench_serialize(self, users, posts, opts):
+        request = APIRequestFactory().get("/api/finca/feed/")
+        request.user = users[0]
+        rows = list(prefetch.with_counts(Post.objects.filter(id__in=[p.id for p in posts])))
+
+        def context():
+            return {"request": request, "previews": {},
+                    "page_state": prefetch.resolve(rows, users[0])}
+
+        ctx = context()
+        for label, fn in (
+            ("PostSerializer", lambda: PostSerializer(rows, many=True, context=ctx).data),
+            ("fastpath.posts", lambda: fastpath.posts(rows, ctx)),
+        ):
+            median, p95 = timed(fn, opts["rounds"])
+            self.report(label, median, p95, f"{len(rows)} posts")
+
+    # ---- estrella con doble toque concurrente sobre un solo post caliente ----
+    def bench_toggle(self, users, posts, opts):
+        hot = posts[0].id
+        # sin token bucket: se mide el toggle, no el 429
+        view = PostViewSet.as_view({"post": "star", "put": "star", "delete": "star"}, throttle_classes=[])
+        factory = APIRequestFactory()
+
+        def worker(i):
+            # cada par de hilos comparte usuario: simula el doble toque
+            user, samples, errors = users[(i // 2) % len(users)], [], 0
+            try:
+                for n in range(opts["rounds"]):
+                    method = ("post", "put", "delete")[n % 3]
+                    request = getattr(factory, method)(f"/api/finca/posts/{hot}/star/")
+                    force_authenticate(request, user=user)
+                    t0 = time.perf_counter()
+                    status = view(request, pk=hot).status_code
+                    samples.append((time.perf_counter() - t0) * 1000)
+                    errors += status >= 500
+            finally:
+                connection.close()
+            return samples, errors
+
+        with ThreadPoolExecutor(max_workers=opts["threads"]) as pool:
+            results = list(pool.map(worker, range(opts["threads"])))
+        samples = sorted(ms for chunk, _ in results for ms in chunk)
+        errors = sum(e for _, e in results)
+        self.report(
+            f"star x{opts['threads']} hilos", statistics.median(samples),
+            samples[int(len(samples) * 0.95) - 1], f"{len(samples)} req, {errors} errores 5xx",
+        )
+
+    # ---- lecturas concurrentes por la pila completa: WSGI con hilos vs. ASGI en un event loop ----
+    def bench_async(self, users, posts, opts):
+        """
+        Client (WSGIHandler) desde N hilos contra AsyncClient (ASGIHandler) con N
+        corrutinas: URLconf y middleware reales. aviews solo entra con
+        FINCA_ASYNC_VIEWS; sin eso el lado async mide las vistas DRF bajo ASGI.
+        """
+        headers = [{"Authorization": f"Token {Token.objects.get_or_create(user=u)[0].key}"} for u in users]
+        hot, per_worker = posts[0].id, max(1, opts["rounds"] // opts["threads"])
+        endpoints = (
+            ("feed?limit=50", "/api/finca/feed/?limit=50"),
+            ("saved", "/api/finca/saved/"),
+            ("comments", f"/api/finca/posts/{hot}/comments/"),
+            ("starrers", f"/api/finca/posts/{hot}/starrers/"),
+        )
+
+        def sync_worker(url, i):
+            client, samples, errors = Client(), [], 0
+            try:
+                for _ in range(per_worker):
+                    t0 = time.perf_counter()
+                    errors += client.get(url, headers=headers[i % len(headers)]).status_code >= 400
+                    samples.append((time.perf_counter() - t0) * 1000)
+            finally:
+                connection.close()
+            return samples, errors
+
+        async def async_worker(url, i):
+            client, samples, errors = AsyncClient(), [], 0
+            for _ in range(per_worker):
+                t0 = time.perf_counter()
+                errors += (await client.get(url, headers=headers[i % len(headers)])).status_code >= 400
+                samples.append((time.perf_counter() - t0) * 1000)
+            return samples, errors
+
+        async def async_load(url):
+            return await asyncio.gather(*(async_worker(url, i) for i in range(opts["threads"])))
+
+        mode = "aviews" if getattr(settings, "FINCA_ASYNC_VIEWS", False) else "vistas DRF (FINCA_ASYNC_VIEWS apagado)"
+        self.stdout.write(f"{opts['threads']} clientes concurrentes x {per_worker} requests; ASGI → {mode}")
+        # sin límites: se mide la vista, no el 429 / 503; "testserver" es el host de Client
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]), \
+                mock.patch.dict(throttling.BUDGETS, {k: (10 ** 9, 10 ** 9) for k in throttling.BUDGETS}), \
+                mock.patch.object(throttling, "MAX_INFLIGHT", 10 ** 9):
+            for label, url in endpoints:
+                t0 = time.perf_counter()
+                with ThreadPoolExecutor(max_workers=opts["threads"]) as pool:
+                    chunks = list(pool.map(lambda i: sync_worker(url, i), range(opts["threads"])))
+                self.report_load(f"{label} (WSGI, hilos)", chunks, time.perf_counter() - t0)
+
+                t0 = time.perf_counter()
+                chunks = asyncio.run(async_load(url))
+                self.report_load(f"{label} (ASGI)", chunks, time.perf_counter() - t0)
+
+    def report_load(self, label, chunks, elapsed):
+        samples = sorted(ms for chunk, _ in chunks for ms in chunk)
+        errors = sum(e for _, e in chunks)
+
+        def pct(q):
+            return samples[min(len(samples) - 1, int(len(samples) * q))]
+
+        self.stdout.write(
+            f"{label:<28} {len(samples) / elapsed:8.1f} req/s  "
+            f"p50={pct(.5):8.3f} ms  p95={pct(.95):8.3f} ms  p99={pct(.99):8.3f} ms  {errors} errores"
+        )
@@ -0,0 +1,48 @@
+# finca/management/commands/compact_changelog.py
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from finca.models import BatchReceipt, ChangeLog
+from finca.sync import record
+
+
+class Command(BaseCommand):
+    help = (
+        "Borra filas de ChangeLog más antiguas que --days en lotes y deja una "
+        "marca 'compact'; los clientes con tokens anteriores hacen resync completo. "
+        "También purga las claves de idempotencia de batch/ de la misma antigüedad."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=30)
+        parser.add_argument("--chunk", type=int, default=5000)
+
+    def handle(self, *args, **opts):
+        cutoff = timezone.now() - timedelta(days=opts["days"])
+        receipts = BatchReceipt.objects.filter(created_at__lt=cutoff).delete()[0]
+        if receipts:
+            self.stdout.write(f"Purgadas {receipts} claves de batch/.")
+        horizon = (
+            ChangeLog.objects.filter(created_at__lt=cutoff)
+            .order_by("-id").values_list("id", flat=True).first()
+        )
+        if horizon is None:
+            self.stdout.write("Nada que compactar.")
+            return
+
+        deleted = 0
+        while True:
+            ids = list(
+                ChangeLog.objects.filter(id__lte=horizon)
+                .values_list("id", flat=True)[:opts["chunk"]]
+            )
+            if not ids:
+                break
+            with transaction.atomic():
+                deleted += ChangeLog.objects.filter(id__in=ids).delete()[0]
+
+        record("compact", ChangeLog.CREATE, horizon)
+        self.stdout.write(f"Compactadas {deleted} filas (horizonte #{horizon}).")
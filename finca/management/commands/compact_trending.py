@@ -0,0 +1,15 @@
+# finca/management/commands/compact_trending.py
+from django.core.management.base import BaseCommand
+
+from finca import trending
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula exacto el puntaje trending de los posts dentro del horizonte "
+        "y borra los más viejos (ejecutar periódicamente)."
+    )
+
+    def handle(self, *args, **opts):
+        updated, dropped = trending.recompute()
+        self.stdout.write(f"Puntajes recalculados: {updated}; descartados: {dropped}.")
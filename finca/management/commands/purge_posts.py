@@ -0,0 +1,28 @@
+# finca/management/commands/purge_posts.py
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from finca import deletion
+from finca.models import PostDeletion
+
+
+class Command(BaseCommand):
+    help = (
+        "Retoma los borrados de posts que quedaron a medias (p. ej. si el proceso "
+        "murió con la tarea en curso) y los termina en línea."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--minutes", type=int, default=10,
+                            help="solo borrados iniciados hace más de N minutos")
+
+    def handle(self, *args, **opts):
+        cutoff = timezone.now() - timedelta(minutes=opts["minutes"])
+        pending = PostDeletion.objects.filter(finished_at__isnull=True, created_at__lt=cutoff)
+        n = 0
+        for job_id in pending.values_list("id", flat=True):
+            deletion.run(job_id)
+            n += 1
+        self.stdout.write(f"Retomados {n} borrados.")
@@ -0,0 +1,193 @@
+# finca/management/commands/replay_traffic.py
+import asyncio
+import json
+import re
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import AsyncClient, Client
+from rest_framework.authtoken.models import Token
+
+from finca import capture
+from finca.management.commands.bench import seed
+from finca.models import Comment
+
+_PARAM = re.compile(r"<(?:\w+:)?(\w+)>")
+
+
+class Pools:
+    """Objetos sembrados a los que se mapean los ids sintéticos de la captura."""
+
+    def __init__(self, users, posts):
+        self.users    = users
+        self.tokens   = [Token.objects.get_or_create(user=u)[0].key for u in users]
+        self.posts    = [p.id for p in posts]
+        self.comments = list(Comment.objects.filter(post__in=posts).values_list("id", flat=True))
+
+    @staticmethod
+    def pick(pool, synthetic):
+        return pool[int(synthetic.split(":")[1], 16) % len(pool)]
+
+    def url(self, entry):
+        """Ruta capturada → URL concreta sobre los datos sembrados (None si no aplica)."""
+        route, args = entry["route"], entry["args"]
+
+        def value(m):
+            name = m.group(1)
+            if name == "username":
+                return self.pick(self.users, args[name]).username
+            if name == "pk":
+                pool = self.comments if "comments/<" in route and "posts/" not in route else self.posts
+                return str(self.pick(pool, args[name])) if pool else "0"
+            raise KeyError(name)
+
+        try:
+            path = "/" + _PARAM.sub(value, route)
+        except KeyError:
+            return None
+        query = "&".join(f"{k}={v}" for k, v in entry["query"].items() if v != "*")
+        return f"{path}?{query}" if query else path
+
+    def body(self, shape):
+        """Cuerpo con la misma forma que el capturado (los int se toman como ids de post)."""
+        if isinstance(shape, dict):
+            if "_bytes" in shape:
+                return {}
+            return {k: self.body(v) for k, v in shape.items()}
+        if isinstance(shape, list):
+            return [self.body(shape[0])] if shape else []
+        return {"str": "replay", "int": self.posts[0], "float": 0.5, "bool": True, "object": {}}.get(shape)
+
+    def auth(self, entry):
+        if not entry.get("user"):
+            return {}
+        return {"Authorization": f"Token {self.pick(self.tokens, entry['user'])}"}
+
+
+class Command(BaseCommand):
+    help = (
+        "Reproduce una captura de FINCA_CAPTURE_PATH contra datos sembrados (se borran al "
+        "terminar) y reporta throughput y percentiles de latencia por ruta."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("capture")
+        parser.add_argument("--concurrency", type=int, default=16)
+        parser.add_argument("--mode", choices=["thread", "asyncio"], default="thread")
+        parser.add_argument("--speed", type=float, default=0,
+                            help="compresión de tiempo (10 = 10x más rápido); 0 = sin pausas")
+        parser.add_argument("--limit", type=int, default=0, help="máximo de requests (0 = todos)")
+        parser.add_argument("--posts", type=int, default=200)
+        parser.add_argument("--users", type=int, default=50)
+
+    def handle(self, *args, **opts):
+        try:
+            with open(opts["capture"], encoding="utf-8") as fh:
+                entries = sorted((json.loads(line) for line in fh if line.strip()), key=lambda e: e["ts"])
+        except OSError as exc:
+            raise CommandError(exc)
+        if opts["limit"]:
+            entries = entries[:opts["limit"]]
+        if not entries:
+            raise CommandError("La captura está vacía.")
+
+        # lo reproducido no se vuelve a capturar
+        capture.RATE = 0
+        # los workers usan sus propias conexiones: los datos tienen que estar confirmados
+        users, posts = seed(opts["posts"], opts["users"])
+        try:
+            pools = Pools(users, posts)
+            jobs = [(e, pools.url(e)) for e in entries]
+            jobs = [(e, url) for e, url in jobs if url]
+            runner = self.run_threads if opts["mode"] == "thread" else self.run_asyncio
+            started = time.perf_counter()
+            results = runner(jobs, pools, opts)
+            self.report(results, time.perf_counter() - started, len(entries) - len(jobs))
+        finally:
+            User.objects.filter(id__in=[u.id for u in users]).delete()
+
+    @staticmethod
+    def _due(entry, t0, opts):
+        return (entry["ts"] - t0) / opts["speed"] if opts["speed"] else 0
+
+    def run_threads(self, jobs, pools, opts):
+        local, results, lock = threading.local(), [], threading.Lock()
+        t0, start = jobs[0][0]["ts"], time.perf_counter()
+
+        def send(entry, url):
+            client = getattr(local, "client", None) or Client()
+            local.client = client
+            body = pools.body(entry["body"]) if entry["body"] is not None else None
+            t = time.perf_counter()
+            try:
+                response = client.generic(
+                    entry["method"], url, json.dumps(body) if body is not None else "",
+                    content_type="application/json", headers=pools.auth(entry),
+                )
+                status = response.status_code
+            except Exception:
+                status = 599
+            finally:
+                connection.close()
+            with lock:
+                results.append((entry["route"], status, (time.perf_counter() - t) * 1000))
+
+        with ThreadPoolExecutor(max_workers=opts["concurrency"]) as pool:
+            for entry, url in jobs:
+                wait = self._due(entry, t0, opts) - (time.perf_counter() - start)
+                if wait > 0:
+                    time.sleep(wait)
+                pool.submit(send, entry, url)
+        return results
+
+    def run_asyncio(self, jobs, pools, opts):
+        async def main():
+            client, results = AsyncClient(), []
+            gate = asyncio.Semaphore(opts["concurrency"])
+            t0, start = jobs[0][0]["ts"], time.perf_counter()
+
+            async def send(entry, url):
+                await asyncio.sleep(max(0, self._due(entry, t0, opts) - (time.perf_counter() - start)))
+                async with gate:
+                    body = pools.body(entry["body"]) if entry["body"] is not None else None
+                    t = time.perf_counter()
+                    try:
+                        response = await client.generic(
+                            entry["method"], url, json.dumps(body) if body is not None else "",
+                            content_type="application/json", headers=pools.auth(entry),
+                        )
+                        status = response.status_code
+                    except Exception:
+                        status = 599
+                    results.append((entry["route"], status, (time.perf_counter() - t) * 1000))
+
+            await asyncio.gather(*(send(e, url) for e, url in jobs))
+            return results
+        return asyncio.run(main())
+
+    def report(self, results, elapsed, skipped):
+        by_route = defaultdict(list)
+        for route, status, ms in results:
+            by_route[route].append((status, ms))
+
+        def pct(samples, q):
+            return samples[min(len(samples) - 1, int(len(samples) * q))]
+
+        self.stdout.write(
+            f"{len(results)} requests en {elapsed:.2f} s → {len(results) / elapsed:.1f} req/s"
+            + (f" ({skipped} sin ruta reproducible)" if skipped else "")
+        )
+        self.stdout.write(f"{'ruta':<48} {'n':>6} {'p50':>8} {'p95':>8} {'p99':>8} {'4xx':>5} {'5xx':>5}")
+        for route, rows in sorted(by_route.items(), key=lambda kv: -len(kv[1])):
+            ms = sorted(m for _, m in rows)
+            c4 = sum(400 <= s < 500 for s, _ in rows)
+            c5 = sum(s >= 500 for s, _ in rows)
+            self.stdout.write(
+                f"{route[:48]:<48} {len(rows):>6} {pct(ms, .5):>8.1f} {pct(ms, .95):>8.1f} "
+                f"{pct(ms, .99):>8.1f} {c4:>5} {c5:>5}"
+            )
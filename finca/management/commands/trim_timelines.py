@@ -0,0 +1,25 @@
+# finca/management/commands/trim_timelines.py
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+
+from finca import timeline
+from finca.models import TimelineEntry
+
+
+class Command(BaseCommand):
+    help = "Recorta cada timeline de inicio a FINCA_TIMELINE_MAX entradas (ejecutar periódicamente)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--keep", type=int, default=timeline.TIMELINE_MAX)
+
+    def handle(self, *args, **opts):
+        keep = opts["keep"]
+        users = (
+            TimelineEntry.objects.values("user_id")
+            .annotate(n=Count("post_id")).filter(n__gt=keep)
+            .values_list("user_id", flat=True)
+        )
+        total = 0
+        for user_id in users.iterator():
+            total += timeline.trim(user_id, keep)
+        self.stdout.write(f"Recortadas {total} entradas.")
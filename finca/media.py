@@ -0,0 +1,105 @@
+# finca/media.py
+"""
+URLs de media: un solo camino para todos los serializers.
+
+Antes cada imagen de cada post, muestra y preview hacía
+request.build_absolute_uri(field.url), atando la URL al Host que vio el
+servidor. Ahora:
+
+- base fija (FINCA_MEDIA_BASE_URL: CDN u host de media) calculada una vez;
+  sin configurar se usa MEDIA_URL (o la vista firmada) con el host del request
+- `?v=<hash>`: hash del contenido (imagemeta) o del nombre del archivo, que
+  no cambia tras la subida → Cache-Control de un año sin riesgo
+- FINCA_MEDIA_SIGNED: `&exp=…&sig=…` HMAC-SHA256 con vencimiento redondeado a
+  ventanas de FINCA_MEDIA_URL_TTL, así la URL es estable dentro de la ventana
+  y el borde puede cachearla; `serve` la verifica para servir en local
+
+/api/finca/media/ solo existe con FINCA_MEDIA_SIGNED (urls.py) y `serve` nunca
+entrega un archivo sin firma válida: sin firmar, media se sirve como siempre
+(MEDIA_URL, solo en DEBUG, o el servidor web / CDN). Los settings se leen en
+cada llamada (override_settings, cambios sin reimportar).
+"""
+import hashlib
+import hmac
+import mimetypes
+import time
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.http import FileResponse, Http404, HttpResponseForbidden
+from django.urls import reverse
+from django.utils.cache import patch_cache_control
+
+from . import imagemeta
+
+_KEY = hashlib.sha256(f"finca.media:{settings.SECRET_KEY}".encode()).digest()
+
+
+def signed():
+    return getattr(settings, "FINCA_MEDIA_SIGNED", False)
+
+
+def _ttl():
+    return getattr(settings, "FINCA_MEDIA_URL_TTL", 24 * 3600)
+
+
+def _sign(name, exp):
+    return hmac.new(_KEY, f"{name}:{exp}".encode(), hashlib.sha256).hexdigest()[:32]
+
+
+def _version(field):
+    """Hash del contenido si imagemeta lo tiene; si no, del nombre (inmutable tras subir)."""
+    meta_field = imagemeta.FIELDS.get(type(field.instance), {}).get(field.field.name)
+    meta = getattr(field.instance, meta_field, None) if meta_field else None
+    if meta and meta.get("hash"):
+        return meta["hash"]
+    return hashlib.blake2s(field.name.encode(), digest_size=8).hexdigest()
+
+
+def _base(request):
+    """Prefijo de las URLs, una vez por request (o fijo si hay FINCA_MEDIA_BASE_URL)."""
+    base_url = getattr(settings, "FINCA_MEDIA_BASE_URL", "")
+    if base_url:
+        return base_url
+    base = getattr(request, "_finca_media_base", None)
+    if base is None:
+        prefix = reverse("finca-media", args=["x"])[:-1] if signed() else settings.MEDIA_URL
+        base = request.build_absolute_uri(prefix) if request else prefix
+        if request is not None:
+            request._finca_media_base = base
+    return base
+
+
+def url(request, field):
+    """URL pública (versionada y, si corresponde, firmada) de un File/ImageField o None."""
+    if not field:
+        return None
+    name = field.name
+    out = f"{_base(request)}{quote(name)}?v={_version(field)}"
+    if signed():
+        ttl = _ttl()
+        exp = (int(time.time()) // ttl + 2) * ttl   # vence entre TTL y 2·TTL desde ahora
+        out += f"&exp={exp}&sig={_sign(name, exp)}"
+    return out
+
+
+def serve(request, name):
+    """Sirve un archivo de media con firma válida (uso local / origen del CDN)."""
+    if not signed():
+        raise Http404
+    try:
+        exp = int(request.GET.get("exp", ""))
+    except ValueError:
+        return HttpResponseForbidden()
+    sig = request.GET.get("sig", "")
+    if exp < time.time() or not hmac.compare_digest(sig, _sign(name, exp)):
+        return HttpResponseForbidden()
+    if not default_storage.exists(name):
+        raise Http404
+    response = FileResponse(
+        default_storage.open(name, "rb"),
+        content_type=mimetypes.guess_type(name)[0] or "application/octet-stream",
+    )
+    patch_cache_control(response, public=True, max_age=max(0, exp - int(time.time())))
+    return response
@@ -0,0 +1,29 @@
+# Generated by Django 5.0.6 on 2026-10-18 21:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finca', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeLog',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entity', models.CharField(max_length=16)),
+                ('op', models.CharField(choices=[('c', 'create'), ('u', 'update'), ('d', 'delete')], max_length=1)),
+                ('object_id', models.BigIntegerField()),
+                ('post_id', models.BigIntegerField(blank=True, null=True)),
+                ('actor_id', models.BigIntegerField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['entity', 'id'], name='finca_chlog_entity_id')],
+            },
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.0.6 on 2026-10-18 21:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finca', '0002_changelog'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='changelog',
+            index=models.Index(fields=['post_id', 'id'], name='finca_chlog_post_id'),
+        ),
+        migrations.AddIndex(
+            model_name='changelog',
+            index=models.Index(fields=['actor_id', 'id'], name='finca_chlog_actor_id'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.0.6 on 2026-10-18 21:33
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finca', '0003_changelog_post_actor_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['author', '-created_at', '-id'], name='finca_post_author_timeline'),
+        ),
+    ]
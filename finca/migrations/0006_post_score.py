@@ -0,0 +1,21 @@
+# Generated by Django 5.0.6 on 2026-10-18 21:36
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finca', '0005_follow_timeline'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostScore',
+            fields=[
+                ('post', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='trending', serialize=False, to='finca.post')),
+                ('score', models.FloatField(db_index=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.0.6 on 2026-10-18 21:37
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finca', '0006_post_score'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='unread_notifications',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='Notification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('star', 'estrella'), ('save', 'guardado'), ('repost', 'compartido'), ('whatsapp', 'WhatsApp'), ('comment', 'comentario')], max_length=16)),
+                ('bucket', models.DateTimeField()),
+                ('actor_count', models.PositiveIntegerField(default=1)),
+                ('actor_ids', models.JSONField(default=list)),
+                ('read', models.BooleanField(default=False)),
+                ('updated_at', models.DateTimeField()),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='finca.post')),
+                ('recipient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='finca_notifications', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['recipient', '-updated_at', '-id'], name='finca_notif_recipient')],
+                'unique_together': {('recipient', 'post', 'kind', 'bucket')},
+            },
+        ),
+    ]
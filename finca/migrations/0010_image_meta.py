@@ -0,0 +1,33 @@
+# Generated by Django 5.0.6 on 2026-10-18 21:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finca', '0009_post_deletion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='coverslide',
+            name='image_meta',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='image_meta',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='avatar_meta',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='cover_meta',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
@@ -1,4 +1,5 @@
 # modulo/finca/models.py
+from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
 from django.contrib.auth.models import User
 
@@ -22,10 +23,32 @@ class Profile(models.Model):
     cover        = models.ImageField(upload_to=user_directory_path, blank=True, null=True)
     updated_at   = models.DateTimeField(auto_now=True)
 
+    # 🖼️ ancho/alto/bytes/mime/color/placeholder (imagemeta.py)
+    avatar_meta  = models.JSONField(null=True, blank=True)
+    cover_meta   = models.JSONField(null=True, blank=True)
+
+    # denormalizado: decide fan-out en escritura vs. en lectura (timeline.py)
+    followers_count = models.PositiveIntegerField(default=0)
+    unread_notifications = models.PositiveIntegerField(default=0)
+
+    # 📍 ubicación opcional; geohash = celda de la grilla con índice B-tree (geo.py)
+    lat     = models.FloatField(null=True, blank=True,
+                                validators=[MinValueValidator(-90), MaxValueValidator(90)])
+    lng     = models.FloatField(null=True, blank=True,
+                                validators=[MinValueValidator(-180), MaxValueValidator(180)])
+    geohash = models.CharField(max_length=12, blank=True, default="", db_index=True)
+
     def __str__(self):
         return f"Finca de {self.user.username}"
 
 
+class VisiblePostManager(models.Manager):
+    """Oculta los posts en borrado (deleted_at): desaparecen al instante de todo listado."""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
+
 class Post(models.Model):
     author     = models.ForeignKey(User, on_delete=models.CASCADE, related_name="finca_posts")
     text       = models.TextField(blank=True)
@@ -33,12 +56,25 @@ class Post(models.Model):
     video      = models.FileField(upload_to=user_directory_path, blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    # 🖼️ ancho/alto/bytes/mime/color/placeholder de `image` (imagemeta.py)
+    image_meta = models.JSONField(null=True, blank=True)
+
     # 🔁 Cuando el post es un “repost”, apunta al post original.
     repost_of  = models.ForeignKey("self", null=True, blank=True,
                                    on_delete=models.CASCADE, related_name="reposts")
 
+    # 🗑️ borrado diferido (deletion.py): oculto ya, filas dependientes por lotes después
+    deleted_at = models.DateTimeField(null=True, blank=True)
+
+    objects     = VisiblePostManager()
+    all_objects = models.Manager()
+
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            # timeline por autor: users/<username>/posts/ (cursor -created_at, -id)
+            models.Index(fields=["author", "-created_at", "-id"], name="finca_post_author_timeline"),
+        ]
 
     def __str__(self):
         preview = self.text[:30] if self.text else "📎 media"
@@ -120,6 +156,8 @@ class CoverSlide(models.Model):
     text_size    = models.PositiveSmallIntegerField(blank=True, null=True)  # px
     effect       = models.CharField(max_length=16, blank=True, default="none")
 
+    image_meta   = models.JSONField(null=True, blank=True)   # imagemeta.py
+
     updated_at   = models.DateTimeField(auto_now=True)
 
     class Meta:
@@ -128,3 +166,164 @@ class CoverSlide(models.Model):
 
     def __str__(self):
         return f"CoverSlide idx={self.index} user={self.user_id}"
+
+
+# ========= Seguidores + timeline de inicio =========
+class Follow(models.Model):
+    """follower sigue a followee."""
+    follower   = models.ForeignKey(User, on_delete=models.CASCADE, related_name="finca_following")
+    followee   = models.ForeignKey(User, on_delete=models.CASCADE, related_name="finca_followers")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ("follower", "followee")
+        indexes = [models.Index(fields=["followee", "follower"], name="finca_follow_followee")]
+
+    def __str__(self):
+        return f"{self.follower_id} → {self.followee_id}"
+
+
+class TimelineEntry(models.Model):
+    """
+    Timeline materializado (fan-out en escritura): solo post + fecha.
+    La fecha se copia del post para paginar sin join.
+    """
+    user       = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+")
+    post       = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="+")
+    created_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = ("user", "post")
+        indexes = [models.Index(fields=["user", "-created_at", "-post"], name="finca_timeline_user")]
+
+    def __str__(self):
+        return f"timeline {self.user_id}: post {self.post_id}"
+
+
+# ========= Notificaciones agregadas (finca/notifications.py) =========
+class Notification(models.Model):
+    """
+    Una fila por (destinatario, post, tipo, franja de tiempo): los eventos se
+    agregan al escribir ("Ana y 12 más dieron estrella a tu publicación").
+    """
+    KIND_CHOICES = [
+        ("star", "estrella"), ("save", "guardado"), ("repost", "compartido"),
+        ("whatsapp", "WhatsApp"), ("comment", "comentario"),
+    ]
+
+    recipient   = models.ForeignKey(User, on_delete=models.CASCADE, related_name="finca_notifications")
+    post        = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="+")
+    kind        = models.CharField(max_length=16, choices=KIND_CHOICES)
+    bucket      = models.DateTimeField()                   # inicio de la franja
+    actor_count = models.PositiveIntegerField(default=1)
+    actor_ids   = models.JSONField(default=list)           # últimos actores (más reciente primero)
+    read        = models.BooleanField(default=False)
+    updated_at  = models.DateTimeField()
+
+    class Meta:
+        unique_together = ("recipient", "post", "kind", "bucket")
+        indexes = [models.Index(fields=["recipient", "-updated_at", "-id"], name="finca_notif_recipient")]
+
+    def __str__(self):
+        return f"🔔 {self.recipient_id}: {self.kind} x{self.actor_count} post {self.post_id}"
+
+
+# ========= Trending (finca/trending.py) =========
+class PostScore(models.Model):
+    """Puntaje trending materializado (log de la suma de interacciones con decaimiento)."""
+    post  = models.OneToOneField(Post, on_delete=models.CASCADE, primary_key=True, related_name="trending")
+    score = models.FloatField(db_index=True)
+
+    def __str__(self):
+        return f"post {self.post_id}: {self.score:.3f}"
+
+
+# ========= Borrado diferido de posts (deletion.py) =========
+class PostDeletion(models.Model):
+    """Progreso del borrado por lotes de un post (y sus reposts) ya oculto."""
+    post_id     = models.BigIntegerField(unique=True)
+    author      = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+")
+    total       = models.PositiveIntegerField(default=0)   # filas a borrar (lo cuenta deletion.run al empezar)
+    done        = models.PositiveIntegerField(default=0)
+    created_at  = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"borrado post {self.post_id}: {self.done}/{self.total}"
+
+
+# ========= Lote offline (batch/) =========
+class BatchReceipt(models.Model):
+    """Clave de idempotencia ya aplicada por el cliente (reintentos de batch/)."""
+    user       = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+")
+    key        = models.CharField(max_length=64)
+    status     = models.CharField(max_length=16)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        unique_together = ("user", "key")
+
+    def __str__(self):
+        return f"{self.user_id}:{self.key} {self.status}"
+
+
+# ========= Hashtags y menciones (finca/tags.py) =========
+class PostTag(models.Model):
+    """
+    Hashtag normalizado de un post (en su texto o en el de sus comentarios).
+    La fecha se copia del post para paginar por el índice sin join.
+    """
+    tag        = models.CharField(max_length=64)
+    post       = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="+")
+    created_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = ("tag", "post")
+        indexes = [models.Index(fields=["tag", "-created_at", "-id"], name="finca_tag_recent")]
+
+    def __str__(self):
+        return f"#{self.tag}: post {self.post_id}"
+
+
+class Mention(models.Model):
+    """@usuario en el texto de un post (comment vacío) o de un comentario."""
+    user       = models.ForeignKey(User, on_delete=models.CASCADE, related_name="finca_mentions")
+    author     = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+")
+    post       = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="+")
+    comment    = models.ForeignKey(Comment, null=True, blank=True, on_delete=models.CASCADE, related_name="+")
+    created_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [models.Index(fields=["user", "-created_at", "-id"], name="finca_mention_recent")]
+
+    def __str__(self):
+        return f"@{self.user_id} en post {self.post_id}"
+
+
+# ========= Registro de cambios (sync/ incremental) =========
+class ChangeLog(models.Model):
+    """
+    Append-only: una fila por cambio en posts / comentarios / interacciones.
+    El id es el token de sincronización del cliente (sync/?since=<id>).
+    Sin FKs para que la fila sobreviva al borrado del objeto.
+    """
+    CREATE, UPDATE, DELETE = "c", "u", "d"
+    OP_CHOICES = [(CREATE, "create"), (UPDATE, "update"), (DELETE, "delete")]
+
+    entity     = models.CharField(max_length=16)   # post, comment, star, save, whatsapp, repost, compact
+    op         = models.CharField(max_length=1, choices=OP_CHOICES)
+    object_id  = models.BigIntegerField()
+    post_id    = models.BigIntegerField(null=True, blank=True)
+    actor_id   = models.BigIntegerField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["id"]
+        indexes = [
+            models.Index(fields=["entity", "id"], name="finca_chlog_entity_id"),
+            models.Index(fields=["post_id", "id"], name="finca_chlog_post_id"),
+            models.Index(fields=["actor_id", "id"], name="finca_chlog_actor_id"),
+        ]
+
+    def __str__(self):
+        return f"#{self.id} {self.entity}:{self.op} {self.object_id}"
@@ -0,0 +1,70 @@
+# finca/notifications.py
+"""
+Notificaciones agregadas al escribir.
+
+sync.record encola `push` (tasks.defer) por cada estrella / guardado / repost /
+share / comentario nuevo; `push` suma el actor a la fila de su franja
+(BUCKET) en vez de crear una fila por evento, y mantiene el contador
+Profile.unread_notifications.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+
+from .models import Notification, Post, Profile
+
+BUCKET     = timedelta(hours=getattr(settings, "FINCA_NOTIFICATION_BUCKET_HOURS", 6))
+MAX_ACTORS = 3
+
+# tipo → (singular, plural)
+VERBS = {
+    "star":     ("dio estrella a tu publicación", "dieron estrella a tu publicación"),
+    "save":     ("guardó tu publicación", "guardaron tu publicación"),
+    "repost":   ("compartió tu publicación", "compartieron tu publicación"),
+    "whatsapp": ("compartió tu publicación por WhatsApp", "compartieron tu publicación por WhatsApp"),
+    "comment":  ("comentó tu publicación", "comentaron tu publicación"),
+}
+
+
+def bucket_for(when):
+    seconds = BUCKET.total_seconds()
+    return when - timedelta(seconds=when.timestamp() % seconds)
+
+
+def push(post_id, kind, actor_id, when):
+    author_id = Post.objects.filter(pk=post_id).values_list("author_id", flat=True).first()
+    if author_id is None or author_id == actor_id:
+        return
+
+    with transaction.atomic():
+        notif, created = Notification.objects.select_for_update().get_or_create(
+            recipient_id=author_id, post_id=post_id, kind=kind, bucket=bucket_for(when),
+            defaults={"actor_ids": [actor_id], "updated_at": when},
+        )
+        newly_unread = created
+        if not created:
+            if actor_id in notif.actor_ids:
+                return
+            newly_unread = notif.read
+            notif.actor_count += 1
+            notif.actor_ids = [actor_id] + notif.actor_ids[:MAX_ACTORS - 1]
+            notif.read = False
+            notif.updated_at = max(notif.updated_at, when)
+            notif.save(update_fields=["actor_count", "actor_ids", "read", "updated_at"])
+        if newly_unread:
+            Profile.objects.get_or_create(user_id=author_id)
+            Profile.objects.filter(user_id=author_id).update(
+                unread_notifications=F("unread_notifications") + 1
+            )
+
+
+def summary(notif, actors):
+    """'Ana y 12 más dieron…' a partir de los previews ya cargados."""
+    first = actors[0]["display_name"] if actors else "Alguien"
+    others = notif.actor_count - 1
+    singular, plural = VERBS[notif.kind]
+    if others > 0:
+        return f"{first} y {others} más {plural}"
+    return f"{first} {singular}"
@@ -0,0 +1,17 @@
+# finca/pagination.py
+from rest_framework.pagination import CursorPagination
+
+
+class TimelinePagination(CursorPagination):
+    """Cursor estable sobre (-created_at, -id); ?limit= hasta 100."""
+    ordering              = ("-created_at", "-id")
+    page_size             = 20
+    page_size_query_param = "limit"
+    max_page_size         = 100
+
+
+class NotificationPagination(CursorPagination):
+    ordering              = ("-updated_at", "-id")
+    page_size             = 30
+    page_size_query_param = "limit"
+    max_page_size         = 100
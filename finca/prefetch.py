@@ -0,0 +1,225 @@
+# finca/prefetch.py
+"""
+Resolución por lotes para una página de posts.
+
+PostSerializer, post por post, hace ~15 consultas (contadores, has_*, muestras
+y primer usuario de cada interacción). Aquí se resuelve la página completa con
+un número fijo de consultas y el serializer lo lee de context["page_state"]:
+
+- contadores: subconsultas correlacionadas en la misma consulta de posts
+- has_*: una sola consulta UNION con las interacciones del viewer
+- muestras / primero: una consulta con ROW_NUMBER() por tipo de interacción
+
+aresolve() es lo mismo para las vistas async (aviews.py), con esas consultas
+en paralelo.
+"""
+import asyncio
+from collections import defaultdict
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery, Value, CharField
+from django.db.models.functions import Coalesce, RowNumber
+from django.db.models.expressions import Window
+
+from . import shares, viewercache
+from .models import Post, PostStar, Comment, PostWhatsAppShare, PostSave
+
+SAMPLE_SIZE = 3
+
+# tipo → (modelo, campo FK al post, campo del usuario)
+ENGAGEMENT = {
+    "star":     (PostStar, "post_id", "user"),
+    "whatsapp": (PostWhatsAppShare, "post_id", "user"),
+    "save":     (PostSave, "post_id", "user"),
+    "repost":   (Post, "repost_of_id", "author"),
+}
+
+# tipo → campos de PostSerializer que dependen de él (flag, muestra, primero)
+FIELDS = {
+    "star":     ("has_starred", "stars_sample", "first_starrer"),
+    "whatsapp": ("has_shared_whatsapp", "whatsapp_sample", "first_whatsapper"),
+    "save":     ("has_saved", "saves_sample", "first_saver"),
+    "repost":   ("has_reposted", "repost_sample", "first_reposter"),
+}
+
+# nombre del contador → (modelo, campo FK al post)
+COUNTS = {
+    "stars_count":    (PostStar, "post_id"),
+    "comments_count": (Comment, "post_id"),
+    "whatsapp_count": (PostWhatsAppShare, "post_id"),
+    "reposts_count":  (Post, "repost_of_id"),
+    "saves_count":    (PostSave, "post_id"),
+}
+
+
+def _count_subquery(model, fk):
+    sub = (
+        model.objects.filter(**{fk: OuterRef("pk")})
+        .order_by().values(fk).annotate(n=Count("pk")).values("n")
+    )
+    return Coalesce(Subquery(sub, output_field=IntegerField()), 0)
+
+
+def with_counts(qs, select_author=True):
+    """
+    Anota los 5 contadores como subconsultas (sin el producto cartesiano de
+    varios Count() sobre joins) y trae el original del repost (y el autor, si
+    `select_author`) en la misma consulta.
+    """
+    related = ["repost_of", "repost_of__author", "repost_of__author__finca_profile"]
+    if select_author:
+        related += ["author", "author__finca_profile"]
+    return (
+        qs.select_related(*related)
+        .annotate(**{name: _count_subquery(model, fk) for name, (model, fk) in COUNTS.items()})
+    )
+
+
+class PageState:
+    """Estado precalculado de una página: flags del viewer, muestras y primeros."""
+
+    def __init__(self):
+        self.flags   = defaultdict(set)    # tipo → {post_id}
+        self.samples = defaultdict(dict)   # tipo → {post_id: [user]}
+        self.first   = defaultdict(dict)   # tipo → {post_id: user}
+
+    def has(self, kind, post):
+        return post.id in self.flags[kind]
+
+    def sample(self, kind, post):
+        return self.samples[kind].get(post.id, [])
+
+    def first_user(self, kind, post):
+        return self.first[kind].get(post.id)
+
+
+def viewer_flags(post_ids, viewer, kinds=ENGAGEMENT, use_cache=True):
+    """
+    {tipo: {post_id}} de las interacciones del viewer. Primero el set cacheado
+    del usuario (viewercache, un solo get); los tipos que no estén ahí van en
+    una sola consulta UNION restringida a `post_ids`.
+    """
+    flags = defaultdict(set)
+    wanted = [kind for kind in ENGAGEMENT if kind in kinds]
+    if use_cache and viewercache.enabled():
+        data, gen = viewercache.read(viewer.id)
+        if data is None:
+            data = {kind: viewercache.pack(_engaged(kind, viewer)) for kind in viewercache.KINDS}
+            viewercache.store(viewer.id, gen, data)
+        pending, wanted = wanted, []
+        for kind in pending:
+            blob = data.get(kind)
+            if blob is None:
+                wanted.append(kind)             # demasiado grande para cachear
+            else:
+                flags[kind] = {pid for pid in post_ids if viewercache.contains(blob, pid)}
+
+    queries = [
+        model.objects.filter(**{f"{fk}__in": post_ids, user_field: viewer})
+        .order_by()
+        .annotate(kind=Value(kind, output_field=CharField()))
+        .values_list(fk, "kind")
+        for kind, (model, fk, user_field) in ENGAGEMENT.items() if kind in wanted
+    ]
+    if queries:
+        for post_id, kind in queries[0].union(*queries[1:], all=True):
+            flags[kind].add(post_id)
+    if "whatsapp" in kinds and shares.enabled():
+        # shares aún en el buffer write-behind: el propio usuario ya los ve
+        flags["whatsapp"] |= shares.buffer.pending_for(viewer.id, set(post_ids))
+    return flags
+
+
+def _engaged(kind, viewer):
+    """Todos los posts con los que el viewer tiene la interacción `kind` (hasta MAX_IDS + 1)."""
+    model, fk, user_field = ENGAGEMENT[kind]
+    return (
+        model.objects.filter(**{user_field: viewer}).exclude(**{f"{fk}__isnull": True})
+        .order_by().values_list(fk, flat=True)[:viewercache.MAX_IDS + 1]
+    )
+
+
+def _samples(state, kind, post_ids):
+    model, fk, user_field = ENGAGEMENT[kind]
+    partition = [F(fk)]
+    rows = (
+        model.objects.filter(**{f"{fk}__in": post_ids})
+        .select_related(user_field, f"{user_field}__finca_profile")
+        .annotate(
+            rn_new=Window(RowNumber(), partition_by=partition, order_by=[F("created_at").desc(), F("pk").desc()]),
+            rn_old=Window(RowNumber(), partition_by=partition, order_by=[F("created_at").asc(), F("pk").asc()]),
+        )
+        .filter(Q(rn_new__lte=SAMPLE_SIZE) | Q(rn_old=1))
+        .order_by(fk, "rn_new")
+    )
+    for row in rows:
+        post_id, user = getattr(row, fk), getattr(row, user_field)
+        if row.rn_new <= SAMPLE_SIZE:
+            state.samples[kind].setdefault(post_id, []).append(user)
+        if row.rn_old == 1:
+            state.first[kind][post_id] = user
+
+
+def resolve(posts, viewer, fields=None, base=None):
+    """
+    Calcula el PageState de `posts` (ya evaluados) para `viewer`.
+    Con `fields` (campos dispersos) solo se consulta lo que se va a mostrar.
+    Con `base` (PageState sin viewer, p. ej. de feedcache) solo faltan los has_*.
+    """
+    state = base if base is not None else PageState()
+    post_ids = [p.id for p in posts]
+    if not post_ids:
+        return state
+
+    def wanted(name):
+        return fields is None or name in fields
+
+    if viewer is not None and viewer.is_authenticated:
+        state.flags = viewer_flags(post_ids, viewer, {k for k, f in FIELDS.items() if wanted(f[0])})
+    if base is not None:
+        return state
+    for kind, (_flag, sample, first) in FIELDS.items():
+        if wanted(sample) or wanted(first):
+            _samples(state, kind, post_ids)
+    return state
+
+
+# ---- vistas async ----
+def off_loop(fn, *args):
+    """
+    Awaitable que corre fn(*args) en un hilo del pool con su propia conexión.
+    El ORM async de Django corre todas las consultas en un mismo hilo (una
+    detrás de otra); con thread_sensitive=False varias sí van en paralelo.
+    """
+    def call():
+        try:
+            return fn(*args)
+        finally:
+            close_old_connections()
+    return sync_to_async(call, thread_sensitive=False)()
+
+
+async def aresolve(posts, viewer, fields=None, base=None):
+    """resolve() con los has_* y las muestras de cada tipo consultados en paralelo."""
+    state = base if base is not None else PageState()
+    post_ids = [p.id for p in posts]
+    if not post_ids:
+        return state
+
+    def wanted(name):
+        return fields is None or name in fields
+
+    jobs = []
+    if base is None:
+        for kind, (_flag, sample, first) in FIELDS.items():
+            if wanted(sample) or wanted(first):
+                state.samples[kind], state.first[kind] = {}, {}    # cada hilo escribe solo su tipo
+                jobs.append(off_loop(_samples, state, kind, post_ids))
+    if viewer is not None and viewer.is_authenticated:
+        kinds = {k for k, f in FIELDS.items() if wanted(f[0])}
+        jobs.append(off_loop(viewer_flags, post_ids, viewer, kinds))
+        *_, state.flags = await asyncio.gather(*jobs)
+    else:
+        await asyncio.gather(*jobs)
+    return state
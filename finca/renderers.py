@@ -0,0 +1,57 @@
+# finca/renderers.py
+from rest_framework.utils.encoders import JSONEncoder
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+import msgpack
+
+# orjson es opcional: si no está instalado usamos el json de la stdlib (DRF).
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+_ORJSON_OPTS = (orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS) if orjson else 0
+_default = JSONEncoder().default
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer con orjson (datetime nativo, sin pasar por json.dumps).
+    Misma salida que el renderer de DRF; con ?indent o desde la API
+    navegable se delega al renderer estándar.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        if orjson is None or self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        ret = orjson.dumps(data, default=_default, option=_ORJSON_OPTS)
+        # igual que DRF: \u2028 / \u2029 escapados para que sea subconjunto de JS
+        if b"\xe2\x80" in ret:
+            ret = ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(b"\xe2\x80\xa9", b"\\u2029")
+        return ret
+
+
+class CompactJSONRenderer(FastJSONRenderer):
+    """
+    JSON normalizado para listados de posts (?format=compact).
+    La vista arma el payload { users, posts, results }; aquí solo se
+    registra el formato para la negociación de DRF.
+    """
+    format = "compact"
+
+
+class MessagePackRenderer(BaseRenderer):
+    """application/msgpack para clientes móviles (Accept: application/msgpack)."""
+    media_type = "application/msgpack"
+    format     = "msgpack"
+    charset    = None
+    render_style = "binary"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        # fechas como ISO 8601 (mismo formato que en JSON)
+        return msgpack.packb(data, default=_default, use_bin_type=True, datetime=False)
@@ -1,17 +1,15 @@
 # modulo/finca/serializers.py
 from django.core.exceptions import ObjectDoesNotExist
 from rest_framework import serializers
+from . import media, shares
 from .models import (
     Profile, Post, PostStar, Comment, PostWhatsAppShare, PostSave, CoverSlide
 )
 
 
 def abs_url(request, filefield):
-    """Devuelve URL absoluta para un File/ImageField o None."""
-    if not filefield:
-        return None
-    url = filefield.url
-    return request.build_absolute_uri(url) if request else url
+    """URL de un File/ImageField o None; todo pasa por media.url (CDN, versión, firma)."""
+    return media.url(request, filefield)
 
 
 # ===== PROFILE =====
@@ -28,9 +26,10 @@ class ProfileSerializer(serializers.ModelSerializer):
         model  = Profile
         fields = [
             "id", "username", "email", "display_name", "bio",
-            "date_of_birth", "gender", "avatar", "cover", "updated_at",
+            "date_of_birth", "gender", "avatar", "cover", "avatar_meta", "cover_meta",
+            "lat", "lng", "updated_at",
         ]
-        read_only_fields = ["id", "username", "email", "updated_at"]
+        read_only_fields = ["id", "username", "email", "avatar_meta", "cover_meta", "updated_at"]
 
     def get_date_of_birth(self, obj):
         dob = getattr(obj.user, "profile", None)
@@ -46,6 +45,10 @@ class ProfileSerializer(serializers.ModelSerializer):
         request = self.context.get("request")
         data["avatar"] = abs_url(request, instance.avatar)
         data["cover"]  = abs_url(request, instance.cover)
+        # la ubicación exacta solo la ve el dueño (los demás ven distancias, geo.py)
+        if getattr(getattr(request, "user", None), "id", None) != instance.user_id:
+            data.pop("lat", None)
+            data.pop("lng", None)
         return data
 
 
@@ -62,6 +65,42 @@ def _user_preview(user, request):
     }
 
 
+def public_profile(profile, request):
+    """
+    Perfil de otra finca (bundle/): el preview más bio y portada. Sin email,
+    fecha de nacimiento, género ni ubicación.
+    """
+    return {
+        "username": profile.user.username,
+        "display_name": profile.display_name or profile.user.username,
+        "avatar": abs_url(request, profile.avatar),
+        "bio": profile.bio,
+        "cover": abs_url(request, profile.cover),
+        "avatar_meta": profile.avatar_meta,
+        "cover_meta": profile.cover_meta,
+    }
+
+
+def _user_ref(user, context):
+    """
+    Referencia a un usuario dentro de un post.
+    En formato compacto (context["users"] presente) devuelve solo el id y
+    registra el preview una sola vez en la tabla lateral `users`.
+    """
+    users = context.get("users")
+    if users is None:
+        # memo por página: cada usuario se arma una sola vez
+        previews = context.get("previews")
+        if previews is None:
+            return _user_preview(user, context.get("request"))
+        if user.id not in previews:
+            previews[user.id] = _user_preview(user, context.get("request"))
+        return previews[user.id]
+    if user.id not in users:
+        users[user.id] = _user_preview(user, context.get("request"))
+    return user.id
+
+
 # ===== COMMENTS =====
 class CommentSerializer(serializers.ModelSerializer):
     user    = serializers.SerializerMethodField()
@@ -119,7 +158,7 @@ class PostSerializer(serializers.ModelSerializer):
     class Meta:
         model  = Post
         fields = [
-            "id", "author", "content", "image", "video", "created_at",
+            "id", "author", "content", "image", "image_meta", "video", "created_at",
             # 🔁 REPOST
             "repost_of", "reposts_count", "has_reposted", "repost_sample", "first_reposter",
             # ⭐
@@ -131,47 +170,52 @@ class PostSerializer(serializers.ModelSerializer):
             # 🔖 Guardados
             "saves_count", "has_saved", "saves_sample", "first_saver",
         ]
+        read_only_fields = ["image_meta"]
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # campos dispersos (?fields=id,content,stars_count): el resto ni se calcula
+        fields = self.context.get("fields")
+        if fields:
+            for name in set(self.fields) - set(fields) - {"id"}:
+                self.fields.pop(name)
 
     # ------- autor -------
     def get_author(self, obj):
-        request = self.context.get("request")
-        try:
-            prof = obj.author.finca_profile
-        except ObjectDoesNotExist:
-            prof, _ = Profile.objects.get_or_create(user=obj.author)
-        return {
-            "username": obj.author.username,
-            "display_name": prof.display_name or obj.author.username,
-            "avatar": abs_url(request, prof.avatar),
-        }
+        return _user_ref(obj.author, self.context)
 
     # ------- 🔁 REPOST -------
     def get_repost_of(self, obj):
         if not obj.repost_of_id:
             return None
+        # formato compacto: el original va una sola vez a la tabla lateral `posts`
+        posts = self.context.get("posts")
+        if posts is not None and obj.repost_of_id in posts:
+            return obj.repost_of_id
         orig = obj.repost_of
         request = self.context.get("request")
-        try:
-            prof = orig.author.finca_profile
-        except ObjectDoesNotExist:
-            prof, _ = Profile.objects.get_or_create(user=orig.author)
-        return {
+        data = {
             "id": orig.id,
-            "author": {
-                "username": orig.author.username,
-                "display_name": prof.display_name or orig.author.username,
-                "avatar": abs_url(request, prof.avatar),
-            },
+            "author": _user_ref(orig.author, self.context),
             "content": orig.text,
             "image": abs_url(request, orig.image),
+            "image_meta": orig.image_meta,
             "video": abs_url(request, orig.video),
             "created_at": orig.created_at,
         }
+        if posts is None:
+            return data
+        posts[orig.id] = data
+        return orig.id
 
     def get_reposts_count(self, obj):
-        return getattr(obj, "reposts_count", None) or obj.reposts.count()
+        n = getattr(obj, "reposts_count", None)
+        return n if n is not None else obj.reposts.count()
 
     def get_has_reposted(self, obj):
+        page = self.context.get("page_state")
+        if page is not None:
+            return page.has("repost", obj)
         request = self.context.get("request")
         user = getattr(request, "user", None)
         if not user or not user.is_authenticated:
@@ -179,20 +223,29 @@ class PostSerializer(serializers.ModelSerializer):
         return Post.objects.filter(author=user, repost_of=obj).exists()
 
     def get_repost_sample(self, obj):
-        request = self.context.get("request")
+        page = self.context.get("page_state")
+        if page is not None:
+            return [_user_ref(u, self.context) for u in page.sample("repost", obj)]
         qs = obj.reposts.select_related("author", "author__finca_profile").order_by("-created_at")[:3]
-        return [_user_preview(r.author, request) for r in qs]
+        return [_user_ref(r.author, self.context) for r in qs]
 
     def get_first_reposter(self, obj):
-        request = self.context.get("request")
+        page = self.context.get("page_state")
+        if page is not None:
+            user = page.first_user("repost", obj)
+            return _user_ref(user, self.context) if user else None
         first = obj.reposts.select_related("author", "author__finca_profile").order_by("created_at").first()
-        return _user_preview(first.author, request) if first else None
+        return _user_ref(first.author, self.context) if first else None
 
     # ------- ⭐ -------
     def get_stars_count(self, obj):
-        return getattr(obj, "stars_count", None) or obj.stars.count()
+        n = getattr(obj, "stars_count", None)
+        return n if n is not None else obj.stars.count()
 
     def get_has_starred(self, obj):
+        page = self.context.get("page_state")
+        if page is not None:
+            return page.has("star", obj)
         request = self.context.get("request")
         user = getattr(request, "user", None)
         if not user or not user.is_authenticated:
@@ -200,12 +253,17 @@ class PostSerializer(serializers.ModelSerializer):
         return PostStar.objects.filter(post=obj, user=user).exists()
 
     def get_stars_sample(self, obj):
-        request = self.context.get("request")
+        page = self.context.get("page_state")
+        if page is not None:
+            return [_user_ref(u, self.context) for u in page.sample("star", obj)]
         qs = obj.stars.select_related("user", "user__finca_profile").order_by("-created_at")[:3]
-        return [_user_preview(s.user, request) for s in qs]
+        return [_user_ref(s.user, self.context) for s in qs]
 
     def get_first_starrer(self, obj):
-        request = self.context.get("request")
+        page = self.context.get("page_state")
+        if page is not None:
+            user = page.first_user("star", obj)
+            return _user_ref(user, self.context) if user else None
         first = (
             obj.stars.select_related("user", "user__finca_profile")
             .order_by("created_at")
@@ -213,42 +271,58 @@ class PostSerializer(serializers.ModelSerializer):
         )
         if not first:
             return None
-        return _user_preview(first.user, request)
+        return _user_ref(first.user, self.context)
 
     # ------- 💬 -------
     def get_comments_count(self, obj):
-        return getattr(obj, "comments_count", None) or obj.comments.count()
+        n = getattr(obj, "comments_count", None)
+        return n if n is not None else obj.comments.count()
 
     # ------- 📲 WhatsApp -------
     def get_whatsapp_count(self, obj):
-        return getattr(obj, "whatsapp_count", None) or obj.whatsapp_shares.count()
+        n = getattr(obj, "whatsapp_count", None)
+        return n if n is not None else obj.whatsapp_shares.count()
 
     def get_has_shared_whatsapp(self, obj):
+        page = self.context.get("page_state")
+        if page is not None:
+            return page.has("whatsapp", obj)
         request = self.context.get("request")
         user = getattr(request, "user", None)
         if not user or not user.is_authenticated:
             return False
+        if shares.enabled() and shares.buffer.pending_for(user.id, {obj.id}):
+            return True
         return PostWhatsAppShare.objects.filter(post=obj, user=user).exists()
 
     def get_whatsapp_sample(self, obj):
-        request = self.context.get("request")
+        page = self.context.get("page_state")
+        if page is not None:
+            return [_user_ref(u, self.context) for u in page.sample("whatsapp", obj)]
         qs = obj.whatsapp_shares.select_related("user", "user__finca_profile").order_by("-created_at")[:3]
-        return [_user_preview(s.user, request) for s in qs]
+        return [_user_ref(s.user, self.context) for s in qs]
 
     def get_first_whatsapper(self, obj):
-        request = self.context.get("request")
+        page = self.context.get("page_state")
+        if page is not None:
+            user = page.first_user("whatsapp", obj)
+            return _user_ref(user, self.context) if user else None
         first = (
             obj.whatsapp_shares.select_related("user", "user__finca_profile")
             .order_by("created_at")
             .first()
         )
-        return _user_preview(first.user, request) if first else None
+        return _user_ref(first.user, self.context) if first else None
 
     # ------- 🔖 GUARDADOS -------
     def get_saves_count(self, obj):
-        return getattr(obj, "saves_count", None) or obj.saves.count()
+        n = getattr(obj, "saves_count", None)
+        return n if n is not None else obj.saves.count()
 
     def get_has_saved(self, obj):
+        page = self.context.get("page_state")
+        if page is not None:
+            return page.has("save", obj)
         request = self.context.get("request")
         user = getattr(request, "user", None)
         if not user or not user.is_authenticated:
@@ -256,24 +330,31 @@ class PostSerializer(serializers.ModelSerializer):
         return PostSave.objects.filter(post=obj, user=user).exists()
 
     def get_saves_sample(self, obj):
-        request = self.context.get("request")
+        page = self.context.get("page_state")
+        if page is not None:
+            return [_user_ref(u, self.context) for u in page.sample("save", obj)]
         qs = obj.saves.select_related("user", "user__finca_profile").order_by("-created_at")[:3]
-        return [_user_preview(s.user, request) for s in qs]
+        return [_user_ref(s.user, self.context) for s in qs]
 
     def get_first_saver(self, obj):
-        request = self.context.get("request")
+        page = self.context.get("page_state")
+        if page is not None:
+            user = page.first_user("save", obj)
+            return _user_ref(user, self.context) if user else None
         first = (
             obj.saves.select_related("user", "user__finca_profile")
             .order_by("created_at")
             .first()
         )
-        return _user_preview(first.user, request) if first else None
+        return _user_ref(first.user, self.context) if first else None
 
     def to_representation(self, instance):
         data = super().to_representation(instance)
         request = self.context.get("request")
-        data["image"] = abs_url(request, instance.image)
-        data["video"] = abs_url(request, instance.video)
+        if "image" in data:
+            data["image"] = abs_url(request, instance.image)
+        if "video" in data:
+            data["video"] = abs_url(request, instance.video)
         return data
 
 
@@ -284,11 +365,11 @@ class CoverSlideSerializer(serializers.ModelSerializer):
     class Meta:
         model  = CoverSlide
         fields = [
-            "id", "index", "image", "caption", "bibliography",
+            "id", "index", "image", "image_meta", "caption", "bibliography",
             "text_color", "text_font", "text_x", "text_y", "text_size", "effect",
             "updated_at",
         ]
-        read_only_fields = ["id", "updated_at"]
+        read_only_fields = ["id", "image_meta", "updated_at"]
 
     def to_representation(self, instance):
         data = super().to_representation(instance)
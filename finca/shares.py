@@ -0,0 +1,167 @@
+# finca/shares.py
+"""
+Write-behind para los shares de WhatsApp (FINCA_WHATSAPP_WRITE_BEHIND).
+
+Cuando un post se vuelve viral en un grupo, cada toque en "compartir" era un
+get_or_create + COUNT sobre la misma fila caliente. En modo write-behind el
+endpoint solo anota (post, usuario) en un buffer en memoria (deduplicado) y
+un hilo lo vuelca cada FINCA_WHATSAPP_FLUSH_MS:
+
+- un bulk_create(ignore_conflicts=True) con los shares nuevos
+- un INSERT de ChangeLog (sync.record_many) → un UPDATE de trending por post
+
+Lectura de lo propio: mientras el share no esté en la base se marca también
+en el cache de Django (compartido entre procesos si CACHES lo es) y
+prefetch.viewer_flags lo une a has_shared_whatsapp.
+
+Durabilidad: al apagar el proceso (atexit) se detiene el hilo, se espera a
+que termine el flush en curso y se hace uno último; si un flush falla, los
+pendientes vuelven al buffer para el siguiente intento. Dos flushes nunca se
+solapan (_flush_lock).
+"""
+import atexit
+import logging
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, transaction
+from django.db.models import Count, Q
+
+from . import sync
+from .models import ChangeLog, Post, PostWhatsAppShare
+
+logger = logging.getLogger(__name__)
+
+MARK_TTL = 60   # segundos; de sobra para varios flushes
+
+
+def enabled():
+    return getattr(settings, "FINCA_WHATSAPP_WRITE_BEHIND", False)
+
+
+def _mark_key(user_id, post_id):
+    return f"finca:wa:{user_id}:{post_id}"
+
+
+class ShareBuffer:
+    def __init__(self, interval):
+        self.interval = interval
+        self._lock     = threading.Lock()
+        self._pending  = {}     # (post_id, user_id) → None, en orden de llegada
+        self._inflight = {}     # lo que se está volcando ahora
+        self._thread   = None
+        self._stop     = threading.Event()
+        self._flush_lock = threading.Lock()
+
+    # ----- escritura -----
+    def add(self, post_id, user_id):
+        """Anota el share; False si ya estaba pendiente."""
+        key = (post_id, user_id)
+        with self._lock:
+            if key in self._pending or key in self._inflight:
+                return False
+            self._pending[key] = None
+            self._start()
+        cache.set(_mark_key(user_id, post_id), 1, MARK_TTL)
+        return True
+
+    # ----- lectura de lo propio -----
+    def pending_for(self, user_id, post_ids):
+        with self._lock:
+            local = {p for p, u in (*self._pending, *self._inflight) if u == user_id and p in post_ids}
+        rest = [p for p in post_ids if p not in local]
+        if rest:
+            marked = cache.get_many([_mark_key(user_id, p) for p in rest])
+            local |= {p for p in rest if _mark_key(user_id, p) in marked}
+        return local
+
+    def pending_users(self, post_id):
+        with self._lock:
+            return {u for p, u in (*self._pending, *self._inflight) if p == post_id}
+
+    # ----- volcado -----
+    def flush(self):
+        """Escribe los pendientes en la base. Devuelve cuántos shares eran nuevos."""
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending:
+                    return 0
+                self._inflight, self._pending = self._pending, {}
+            try:
+                created = _write(list(self._inflight))
+            except Exception:
+                logger.exception("flush de shares de WhatsApp falló; se reintenta")
+                with self._lock:
+                    self._pending = {**self._inflight, **self._pending}
+                return 0
+            finally:
+                with self._lock:
+                    self._inflight = {}
+            return created
+
+    def close(self, timeout=5):
+        """Al salir: detiene el hilo, espera su flush en curso y vuelca lo que quede."""
+        self._stop.set()
+        thread = self._thread
+        if thread is not None and thread.is_alive():
+            thread.join(timeout)
+        self.flush()
+
+    def _start(self):
+        if self._stop.is_set():
+            return                  # cerrando: lo que llegue lo vuelca close()
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._loop, name="finca-shares", daemon=True)
+            self._thread.start()
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.flush()
+            finally:
+                connections.close_all()
+
+
+def _write(keys):
+    post_ids = {p for p, _ in keys}
+    user_ids = {u for _, u in keys}
+    with transaction.atomic():
+        alive = set(Post.objects.filter(id__in=post_ids).values_list("id", flat=True))
+        existing = set(
+            PostWhatsAppShare.objects.filter(post_id__in=post_ids, user_id__in=user_ids)
+            .values_list("post_id", "user_id")
+        )
+        new = {k for k in keys if k[0] in alive and k not in existing}
+        if not new:
+            return 0
+        PostWhatsAppShare.objects.bulk_create(
+            [PostWhatsAppShare(post_id=p, user_id=u) for p, u in new], ignore_conflicts=True,
+        )
+        rows = (
+            PostWhatsAppShare.objects
+            .filter(post_id__in={p for p, _ in new}, user_id__in={u for _, u in new})
+            .values_list("id", "post_id", "user_id")
+        )
+        sync.record_many([
+            ("whatsapp", ChangeLog.CREATE, oid, pid, uid)
+            for oid, pid, uid in rows if (pid, uid) in new
+        ])
+    return len(new)
+
+
+def count(post_id):
+    """
+    whatsapp_count con lo pendiente: filas en la base + usuarios del buffer
+    que aún no tienen fila (en la misma consulta, así un flush en medio no
+    los cuenta dos veces).
+    """
+    users = buffer.pending_users(post_id)
+    stored = PostWhatsAppShare.objects.filter(post_id=post_id).aggregate(
+        total=Count("id"), flushed=Count("id", filter=Q(user_id__in=users)),
+    )
+    return stored["total"] + len(users) - stored["flushed"]
+
+
+buffer = ShareBuffer(getattr(settings, "FINCA_WHATSAPP_FLUSH_MS", 250) / 1000)
+atexit.register(buffer.close)
@@ -0,0 +1,79 @@
+# finca/signals.py
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import receiver
+
+from . import feedcache, geo, imagemeta, tasks, timeline, trending
+from .models import Profile, Post, Comment, PostStar, PostSave, PostWhatsAppShare, ChangeLog
+from .sync import record
+
+
+@receiver(post_save, sender=Post)
+def _post_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    op = ChangeLog.CREATE if created else ChangeLog.UPDATE
+    record("post", op, instance.id, post_id=instance.id, actor_id=instance.author_id)
+    if created and instance.repost_of_id:
+        record("repost", op, instance.id, post_id=instance.repost_of_id, actor_id=instance.author_id)
+    if created:
+        trending.on_post_created(instance)
+        tasks.defer(timeline.fanout_post, instance.id)
+    feedcache.invalidate()
+
+
+@receiver(post_delete, sender=Post)
+def _post_deleted(sender, instance, **kwargs):
+    record("post", ChangeLog.DELETE, instance.id, post_id=instance.id, actor_id=instance.author_id)
+    if instance.repost_of_id:
+        record("repost", ChangeLog.DELETE, instance.id,
+               post_id=instance.repost_of_id, actor_id=instance.author_id, when=instance.created_at)
+
+
+@receiver(post_save, sender=Comment)
+def _comment_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    op = ChangeLog.CREATE if created else ChangeLog.UPDATE
+    record("comment", op, instance.id, post_id=instance.post_id, actor_id=instance.user_id)
+
+
+@receiver(post_delete, sender=Comment)
+def _comment_deleted(sender, instance, **kwargs):
+    record("comment", ChangeLog.DELETE, instance.id, post_id=instance.post_id, actor_id=instance.user_id,
+           when=instance.created_at)
+
+
+_ENGAGEMENT = {PostStar: "star", PostSave: "save", PostWhatsAppShare: "whatsapp"}
+
+
+def _engagement_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        record(_ENGAGEMENT[sender], ChangeLog.CREATE, instance.id,
+               post_id=instance.post_id, actor_id=instance.user_id)
+
+
+def _engagement_deleted(sender, instance, **kwargs):
+    record(_ENGAGEMENT[sender], ChangeLog.DELETE, instance.id,
+           post_id=instance.post_id, actor_id=instance.user_id, when=instance.created_at)
+
+
+for _model in _ENGAGEMENT:
+    post_save.connect(_engagement_saved, sender=_model, dispatch_uid=f"chlog_{_model.__name__}_save")
+    post_delete.connect(_engagement_deleted, sender=_model, dispatch_uid=f"chlog_{_model.__name__}_delete")
+
+
+# ---- metadatos de imagen al subir (imagemeta.py) ----
+def _image_meta(sender, instance, raw=False, **kwargs):
+    if not raw:
+        imagemeta.refresh(instance)
+
+
+for _model in imagemeta.FIELDS:
+    pre_save.connect(_image_meta, sender=_model, dispatch_uid=f"imagemeta_{_model.__name__}")
+
+
+# ---- celda de la grilla para fincas cercanas (geo.py) ----
+@receiver(pre_save, sender=Profile)
+def _profile_geohash(sender, instance, raw=False, **kwargs):
+    located = instance.lat is not None and instance.lng is not None
+    instance.geohash = geo.encode(instance.lat, instance.lng) if located else ""
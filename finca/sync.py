@@ -0,0 +1,208 @@
+# finca/sync.py
+"""
+Sincronización incremental para la app móvil.
+
+Cada cambio en Post / Comment / PostStar / PostSave / PostWhatsAppShare deja una
+fila en ChangeLog (signals.py) dentro de la misma transacción que el cambio.
+`collect_changes` lee las filas posteriores al token del cliente y arma un
+payload proporcional al volumen de cambios, no al tamaño del feed.
+
+El token es un ChangeLog.id, pero el id se asigna en el INSERT y la fila se
+ve recién en el COMMIT: una transacción lenta puede hacer visible un id menor
+que un token ya entregado y ese cambio se perdería. Por eso el token nunca
+pasa de la marca de agua: solo se entregan filas creadas hace más de SETTLE
+segundos (se asume que ninguna transacción que escribe en ChangeLog dura más)
+y la lectura se corta en la primera fila más reciente.
+"""
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from . import feedcache, live, notifications, tasks, trending, viewercache
+from .models import ChangeLog
+
+# entidad de interacción → nombre del contador en PostSerializer
+COUNTERS = {
+    "star":     "stars_count",
+    "comment":  "comments_count",
+    "whatsapp": "whatsapp_count",
+    "repost":   "reposts_count",
+    "save":     "saves_count",
+}
+
+# entidad de interacción → claves de estado del viewer (alta, baja)
+VIEWER_STATE = {
+    "star":     ("starred", "unstarred"),
+    "save":     ("saved", "unsaved"),
+    "whatsapp": ("shared_whatsapp", None),
+    "repost":   ("reposted", "unreposted"),
+}
+
+PAGE_SIZE = 1000
+SETTLE    = getattr(settings, "FINCA_SYNC_SETTLE_SECONDS", 5)
+
+
+def record(entity, op, object_id, post_id=None, actor_id=None, when=None):
+    """`when`: en una baja, el created_at de la fila borrada (trending resta ese término)."""
+    row = ChangeLog.objects.create(
+        entity=entity, op=op, object_id=object_id, post_id=post_id, actor_id=actor_id,
+    )
+    _side_effects(row, when=when)
+    return row
+
+
+def record_many(entries):
+    """
+    Igual que `record` para escrituras en lote (bulk_create no emite signals):
+    entries = [(entity, op, object_id, post_id, actor_id[, when]), ...] → un solo INSERT.
+    """
+    entries = [(*entry, None)[:6] for entry in entries]
+    rows = ChangeLog.objects.bulk_create([
+        ChangeLog(entity=e, op=op, object_id=oid, post_id=pid, actor_id=aid)
+        for e, op, oid, pid, aid, _when in entries
+    ])
+    # trending: un solo UPDATE por (post, tipo, alta/baja, fecha) en vez de uno por fila
+    bumps = Counter(
+        (row.post_id, row.entity, row.op == ChangeLog.CREATE, entry[5])
+        for row, entry in zip(rows, entries) if _counts(row)
+    )
+    for (post_id, entity, added, when), n in bumps.items():
+        trending.bump(post_id, entity, added=added, count=n, when=when)
+    for row in rows:
+        _side_effects(row, bump=False)
+    return rows
+
+
+def _counts(row):
+    return row.entity in COUNTERS and row.op != ChangeLog.UPDATE and row.post_id is not None
+
+
+def _side_effects(row, bump=True, when=None):
+    # contadores / comentarios nuevos → trending, live/ y notificaciones (tras el commit)
+    if not _counts(row):
+        return
+    entity, op, post_id = row.entity, row.op, row.post_id
+    if bump:
+        trending.bump(post_id, entity, added=op == ChangeLog.CREATE, when=when)
+    event = {"post": post_id, "counter": COUNTERS[entity], "delta": 1 if op == ChangeLog.CREATE else -1}
+    if entity == "comment" and op == ChangeLog.CREATE:
+        event["comment"] = row.object_id
+    transaction.on_commit(lambda: live.bus.publish(event))
+    transaction.on_commit(lambda: feedcache.counters_changed(post_id))
+    if entity in viewercache.KINDS and row.actor_id and viewercache.enabled():
+        added = op == ChangeLog.CREATE
+        transaction.on_commit(lambda: viewercache.apply(row.actor_id, entity, post_id, added))
+    if op == ChangeLog.CREATE and entity in notifications.VERBS:
+        tasks.defer(notifications.push, post_id, entity, row.actor_id, row.created_at)
+
+
+def _settled_before():
+    return timezone.now() - timedelta(seconds=SETTLE)
+
+
+def current_token():
+    """
+    Marca de agua: el último id de una fila con más de SETTLE segundos, nunca
+    por debajo del horizonte de compactación (lo anterior ya no existe).
+    """
+    settled = (
+        ChangeLog.objects.filter(created_at__lt=_settled_before())
+        .aggregate(m=Max("id"))["m"] or 0
+    )
+    return max(settled, compaction_horizon())
+
+
+def compaction_horizon():
+    """Último id borrado por compact_changelog (los tokens anteriores ya no sirven)."""
+    marker = (
+        ChangeLog.objects.filter(entity="compact")
+        .order_by("-id").values_list("object_id", flat=True).first()
+    )
+    return marker or 0
+
+
+def collect_changes(since, viewer_id, held_posts=(), threads=(), limit=PAGE_SIZE):
+    """
+    Devuelve un dict con los ids afectados desde `since`; la vista serializa
+    los objetos vivos. Si hay más de `limit` filas, `has_more` queda en True y
+    el cliente repite con el nuevo token. Las filas de los últimos SETTLE
+    segundos (y las que siguen) quedan para el próximo sync.
+    """
+    held_posts = set(held_posts)
+    threads = set(threads)
+    cutoff = _settled_before()
+    rows = list(
+        ChangeLog.objects.filter(id__gt=since)
+        .exclude(entity="compact")
+        .order_by("id")
+        .values_list("id", "entity", "op", "object_id", "post_id", "actor_id", "created_at")[:limit]
+    )
+    has_more = len(rows) == limit
+    for i, row in enumerate(rows):
+        if row[6] >= cutoff:
+            rows, has_more = rows[:i], False
+            break
+
+    upserted_posts, deleted_posts, gone = {}, set(), set()
+    new_comments, deleted_comments = {}, set()
+    deltas = defaultdict(lambda: defaultdict(int))
+    viewer = defaultdict(dict)   # post_id → {clave: bool}; el último evento gana
+
+    for _id, entity, op, object_id, post_id, actor_id, _at in rows:
+        if entity == "post":
+            if op == ChangeLog.DELETE:
+                upserted_posts.pop(object_id, None)
+                gone.add(object_id)
+                if object_id in held_posts:
+                    deleted_posts.add(object_id)
+            elif op == ChangeLog.CREATE or object_id in held_posts:
+                upserted_posts[object_id] = True
+            continue
+
+        if entity == "comment" and post_id in threads:
+            if op == ChangeLog.DELETE:
+                if new_comments.pop(object_id, None) is None:
+                    deleted_comments.add(object_id)
+            elif op == ChangeLog.CREATE:
+                new_comments[object_id] = True
+
+        counter = COUNTERS.get(entity)
+        if counter and post_id in held_posts and op != ChangeLog.UPDATE:
+            deltas[post_id][counter] += 1 if op == ChangeLog.CREATE else -1
+
+        state = VIEWER_STATE.get(entity)
+        if state and actor_id == viewer_id and op != ChangeLog.UPDATE:
+            viewer[post_id][state[0]] = op == ChangeLog.CREATE
+
+    # posts borrados en este tramo: basta con deleted_posts
+    for post_id in gone:
+        deltas.pop(post_id, None)
+        viewer.pop(post_id, None)
+
+    viewer_out = defaultdict(list)
+    for post_id, flags in viewer.items():
+        for entity, (on_key, off_key) in VIEWER_STATE.items():
+            if on_key not in flags:
+                continue
+            if flags[on_key]:
+                viewer_out[on_key].append(post_id)
+            elif off_key:
+                viewer_out[off_key].append(post_id)
+
+    return {
+        "token": rows[-1][0] if rows else since,
+        "has_more": has_more,
+        "upserted_posts": list(upserted_posts),
+        "deleted_posts": sorted(deleted_posts),
+        "new_comments": list(new_comments),
+        "deleted_comments": sorted(deleted_comments),
+        "counter_deltas": {
+            pid: {k: v for k, v in c.items() if v} for pid, c in deltas.items()
+            if any(c.values())
+        },
+        "viewer": dict(viewer_out),
+    }
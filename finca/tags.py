@@ -0,0 +1,92 @@
+# finca/tags.py
+"""
+Índice de hashtags y menciones.
+
+Buscar "#cafe" o "@usuario" sobre Post.text / Comment.text era un
+LIKE '%…%' sin índice. Se extraen al escribir (crear / editar post, crear
+comentario, batch/) a dos tablas con índice (tag | usuario, -created_at, -id):
+
+- PostTag: una fila por (tag, post) si el tag aparece en el texto del post o
+  en el de alguno de sus comentarios; la fecha es la del post
+- Mention: una fila por cada post o comentario que menciona a un usuario
+  existente (sin auto-menciones); la fecha es la del post / comentario
+
+Tags normalizados: minúsculas y sin tildes (#Café, #cafe → "cafe").
+Lo ya publicado se indexa con `manage.py backfill_tags`.
+"""
+import re
+import unicodedata
+
+from django.contrib.auth.models import User
+
+from .models import Comment, Mention, Post, PostTag
+
+HASHTAG = re.compile(r"(?<![\w#])#(\w{1,64})")
+MENTION = re.compile(r"(?<![\w@])@([\w.@+-]{1,150})")
+
+
+def normalize(tag):
+    decomposed = unicodedata.normalize("NFKD", tag.casefold())
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch))[:64]
+
+
+def hashtags(text):
+    return {normalize(t) for t in HASHTAG.findall(text or "")}
+
+
+def mentions(text):
+    # "@ana." al final de una frase → "ana"
+    return {m.rstrip(".") for m in MENTION.findall(text or "")}
+
+
+# ---- escritura ----
+def index_posts(posts):
+    """Recalcula los tags (texto + comentarios) y las menciones del texto de `posts`."""
+    posts = list(posts)
+    ids = [p.id for p in posts]
+    found = {p.id: hashtags(p.text) for p in posts}
+    for post_id, text in Comment.objects.filter(post_id__in=ids).values_list("post_id", "text"):
+        if "#" in text:
+            found[post_id] |= hashtags(text)
+    PostTag.objects.filter(post_id__in=ids).delete()
+    PostTag.objects.bulk_create(
+        [PostTag(tag=t, post_id=p.id, created_at=p.created_at) for p in posts for t in found[p.id]],
+        ignore_conflicts=True,
+    )
+    Mention.objects.filter(post_id__in=ids, comment__isnull=True).delete()
+    _mention(
+        [(p.id, None, p.author_id, p.text, p.created_at) for p in posts]
+    )
+
+
+def index_comments(comments):
+    """Agrega los tags y menciones de comentarios recién creados."""
+    comments = [c for c in comments if "#" in c.text or "@" in c.text]
+    if not comments:
+        return
+    dates = dict(
+        Post.all_objects.filter(id__in={c.post_id for c in comments}).values_list("id", "created_at")
+    )
+    PostTag.objects.bulk_create(
+        [
+            PostTag(tag=t, post_id=c.post_id, created_at=dates[c.post_id])
+            for c in comments for t in hashtags(c.text)
+        ],
+        ignore_conflicts=True,
+    )
+    _mention([(c.post_id, c.id, c.user_id, c.text, c.created_at) for c in comments])
+
+
+def _mention(sources):
+    """sources: (post_id, comment_id, author_id, texto, fecha)."""
+    found = [(src, mentions(src[3])) for src in sources if "@" in (src[3] or "")]
+    names = set().union(*(names for _, names in found)) if found else set()
+    if not names:
+        return
+    ids = dict(User.objects.filter(username__in=names).values_list("username", "id"))
+    Mention.objects.bulk_create([
+        Mention(user_id=ids[name], author_id=author_id, post_id=post_id,
+                comment_id=comment_id, created_at=created_at)
+        for (post_id, comment_id, author_id, _text, created_at), names in found
+        for name in names if name in ids and ids[name] != author_id
+    ])
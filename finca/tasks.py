@@ -0,0 +1,39 @@
+# finca/tasks.py
+"""
+Tareas en segundo plano dentro del proceso (sin broker).
+
+`defer` encola la función para después del commit de la transacción actual y
+la ejecuta en un pool de hilos; cada tarea cierra sus conexiones al terminar.
+Con FINCA_TASKS_EAGER=True se ejecuta en línea (tests / scripts).
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections, transaction
+
+logger = logging.getLogger(__name__)
+
+_executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, "FINCA_TASK_WORKERS", 4),
+    thread_name_prefix="finca-task",
+)
+
+
+def _run(fn, args, kwargs):
+    try:
+        fn(*args, **kwargs)
+    except Exception:
+        logger.exception("tarea %s falló", getattr(fn, "__name__", fn))
+    finally:
+        connections.close_all()
+
+
+def defer(fn, *args, **kwargs):
+    """Ejecuta fn(*args, **kwargs) en segundo plano tras el commit."""
+    def submit():
+        if getattr(settings, "FINCA_TASKS_EAGER", False):
+            fn(*args, **kwargs)
+        else:
+            _executor.submit(_run, fn, args, kwargs)
+    transaction.on_commit(submit)
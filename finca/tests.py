@@ -1,3 +1,414 @@
-from django.test import TestCase
+import json
+import random
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import iscoroutinefunction
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import AsyncClient, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient, APIRequestFactory
+
+from . import capture, fastpath, geo, prefetch, sync, throttling, timeline, toggles, trending, viewercache
+from .models import (
+    BatchReceipt, ChangeLog, Comment, Post, PostSave, PostScore, PostStar, PostWhatsAppShare, Profile,
+)
+from .renderers import FastJSONRenderer
+from .serializers import CommentSerializer, PostSerializer
+
+
+class FastPathParityTests(TestCase):
+    """fastpath.posts / comment_tree deben producir exactamente lo mismo que los serializers."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [User.objects.create_user(f"finca{i}", password=None) for i in range(4)]
+        Profile.objects.bulk_create([
+            Profile(user=u, display_name=f"Finca {i}" if i % 2 else "") for i, u in enumerate(cls.users)
+        ])
+        cls.posts = [
+            Post.objects.create(author=cls.users[i % 4], text=f"Cosecha #{i} ☕", image_meta={"width": i})
+            for i in range(6)
+        ]
+        Post.objects.create(author=cls.users[1], repost_of=cls.posts[0], text="")
+        for u in cls.users:
+            PostStar.objects.create(post=cls.posts[0], user=u)
+        PostSave.objects.create(post=cls.posts[1], user=cls.users[0])
+        PostWhatsAppShare.objects.create(post=cls.posts[0], user=cls.users[2])
+        root = Comment.objects.create(post=cls.posts[0], user=cls.users[1], text="¡Qué buena!")
+        reply = Comment.objects.create(post=cls.posts[0], user=cls.users[0], text="Gracias", parent=root)
+        Comment.objects.create(post=cls.posts[0], user=cls.users[2], text="+1", parent=reply)
+        Comment.objects.create(post=cls.posts[0], user=cls.users[3], text="Otra raíz")
+
+    def setUp(self):
+        self.request = APIRequestFactory().get("/api/finca/feed/")
+        self.request.user = self.users[0]
+
+    def _rows(self):
+        return list(prefetch.with_counts(Post.objects.all()).order_by("-created_at", "-id"))
+
+    def _context(self, rows, fields=None, compact=False):
+        ctx = {
+            "request": self.request, "fields": fields, "previews": {},
+            "page_state": prefetch.resolve(rows, self.users[0], fields),
+        }
+        if compact:
+            ctx.update(users={}, posts={})
+        return ctx
+
+    def assertSameJSON(self, expected, actual):
+        render = FastJSONRenderer().render
+        self.assertEqual(render(expected), render(actual))
+
+    def test_posts_full(self):
+        rows = self._rows()
+        expected = PostSerializer(rows, many=True, context=self._context(rows)).data
+        self.assertSameJSON(expected, fastpath.posts(rows, self._context(rows)))
+
+    def test_posts_sparse_fields(self):
+        rows = self._rows()
+        fields = {"content", "stars_count", "has_starred", "stars_sample", "repost_of"}
+        expected = PostSerializer(rows, many=True, context=self._context(rows, fields)).data
+        self.assertSameJSON(expected, fastpath.posts(rows, self._context(rows, fields)))
+
+    def test_posts_compact(self):
+        rows = self._rows()
+        ctx_a, ctx_b = self._context(rows, compact=True), self._context(rows, compact=True)
+        expected = PostSerializer(rows, many=True, context=ctx_a).data
+        actual = fastpath.posts(rows, ctx_b)
+        self.assertSameJSON(
+            {"users": ctx_a["users"], "posts": ctx_a["posts"], "results": expected},
+            {"users": ctx_b["users"], "posts": ctx_b["posts"], "results": actual},
+        )
+
+    def test_comment_tree(self):
+        roots = Comment.objects.filter(post=self.posts[0], parent__isnull=True).order_by("created_at")
+        expected = CommentSerializer(roots, many=True, context={"request": self.request}).data
+        self.assertSameJSON(expected, fastpath.comment_tree(self.posts[0], self.request))
+
+
+@mock.patch.object(sync, "SETTLE", 5)
+class SyncTokenTests(TestCase):
+    """Token de sync/: paginado, marca de agua y compactación."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("sync", password=None)
+        cls.post = Post.objects.create(author=cls.user, text="Primera")
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _settle(self):
+        ChangeLog.objects.update(created_at=timezone.now() - timedelta(seconds=sync.SETTLE + 1))
+
+    def _sync(self, since, **params):
+        return self.client.get("/api/finca/sync/", {"since": since, **params}).json()
+
+    def test_pages_until_caught_up(self):
+        self._settle()
+        token = sync.current_token()
+        others = [User.objects.create_user(f"fan{i}", password=None) for i in range(5)]
+        PostStar.objects.bulk_create([PostStar(post=self.post, user=u) for u in others])
+        sync.record_many([("star", ChangeLog.CREATE, i, self.post.id, u.id) for i, u in enumerate(others)])
+        self._settle()
+
+        seen = 0
+        for expected_more in (True, True, False):
+            page = sync.collect_changes(token, self.user.id, held_posts=[self.post.id], limit=2)
+            self.assertEqual(page["has_more"], expected_more)
+            seen += page["counter_deltas"].get(self.post.id, {}).get("stars_count", 0)
+            token = page["token"]
+        self.assertEqual(seen, 5)
+        self.assertEqual(token, sync.current_token())
+
+    def test_recent_rows_are_held_back(self):
+        self._settle()
+        token = sync.current_token()
+        Post.objects.create(author=self.user, text="Recién")
+        body = self._sync(token)
+        self.assertEqual((body["token"], body["posts"]), (str(token), []))
+        self.assertEqual(sync.current_token(), token)
+
+        self._settle()
+        body = self._sync(token)
+        self.assertEqual([p["content"] for p in body["posts"]], ["Recién"])
+
+    def test_token_stops_before_unsettled_lower_id(self):
+        # id menor aún "en vuelo" (reciente) y uno mayor ya asentado: no se salta el menor
+        self._settle()
+        token = sync.current_token()
+        late = sync.record("post", ChangeLog.UPDATE, self.post.id, post_id=self.post.id)
+        settled = sync.record("post", ChangeLog.CREATE, self.post.id, post_id=self.post.id)
+        ChangeLog.objects.filter(id=settled.id).update(created_at=timezone.now() - timedelta(minutes=1))
+        page = sync.collect_changes(token, self.user.id)
+        self.assertEqual(page["token"], token)
+        self.assertLess(page["token"], late.id)
+
+    def test_compaction_forces_reset(self):
+        self._settle()
+        token = sync.current_token()
+        Post.objects.create(author=self.user, text="Antes de compactar")
+        self._settle()
+        call_command("compact_changelog", days=0, stdout=StringIO())
+
+        body = self._sync(token)
+        self.assertTrue(body["reset"])
+        self.assertFalse(ChangeLog.objects.exclude(entity="compact").exists())
+        self.assertGreaterEqual(int(body["token"]), sync.compaction_horizon())
+
+
+class BundlePrivacyTests(TestCase):
+    """bundle/ de otra finca: solo el perfil público y sin escrituras."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = User.objects.create_user("alice", email="alice@example.com", password=None)
+        cls.bob = User.objects.create_user("bob", password=None)
+        Profile.objects.create(user=cls.alice, display_name="Finca Alice", bio="Café", lat=9.9, lng=-84.0)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.bob)
+
+    def test_other_finca_gets_public_profile(self):
+        profile = self.client.get("/api/finca/alice/bundle/").json()["profile"]
+        self.assertEqual(profile["display_name"], "Finca Alice")
+        self.assertEqual(profile["bio"], "Café")
+        for private in ("email", "date_of_birth", "gender", "lat", "lng"):
+            self.assertNotIn(private, profile)
+
+    def test_own_bundle_by_username_is_full(self):
+        self.client.force_authenticate(self.alice)
+        profile = self.client.get("/api/finca/alice/bundle/").json()["profile"]
+        self.assertEqual((profile["email"], profile["lat"]), ("alice@example.com", 9.9))
+
+    def test_missing_profile_is_not_created(self):
+        self.client.force_authenticate(self.alice)
+        response = self.client.get("/api/finca/bob/bundle/")
+        self.assertEqual(response.json()["profile"]["display_name"], "bob")
+        self.assertFalse(Profile.objects.filter(user=self.bob).exists())
+
+
+class TrendingRemovalTests(TestCase):
+    """Quitar una interacción resta el término con su fecha original."""
+
+    def test_removing_old_star_restores_exact_score(self):
+        author, fan = (User.objects.create_user(n, password=None) for n in ("autor", "fan"))
+        post = Post.objects.create(author=author, text="Cosecha")
+        star = PostStar.objects.create(post=post, user=fan)
+        PostStar.objects.filter(id=star.id).update(created_at=timezone.now() - timedelta(days=3))
+        trending.recompute()
+        expected = trending.event_score("post", post.created_at)
+
+        star.refresh_from_db()
+        star.delete()
+        self.assertAlmostEqual(PostScore.objects.get(post=post).score, expected, places=6)
+
+    def test_removal_never_takes_log_of_zero(self):
+        post = Post.objects.create(author=User.objects.create_user("solo", password=None), text="x")
+        when = timezone.now()
+        PostScore.objects.filter(post=post).update(score=trending.event_score("star", when))
+        trending.bump(post.id, "star", added=False, when=when - timedelta(microseconds=1))
+        self.assertIsNotNone(PostScore.objects.get(post=post).score)
+
+
+class BatchIdempotencyTests(TestCase):
+    """batch/: reintentos con las mismas claves no repiten nada y devuelven el estado final."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("offline", password=None)
+        cls.post = Post.objects.create(author=cls.user, text="Lote")
+        cls.ops = [
+            {"key": "k-star", "op": "star", "post": cls.post.id},
+            {"key": "k-comment", "op": "comment", "post": cls.post.id, "text": "sin señal"},
+            {"key": "k-missing", "op": "save", "post": cls.post.id + 1000},
+        ]
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _batch(self, ops):
+        return self.client.post("/api/finca/batch/", {"operations": ops}, format="json")
+
+    def test_retry_is_duplicate_and_returns_state(self):
+        first = self._batch(self.ops).json()
+        self.assertEqual([r["status"] for r in first["results"]], ["applied", "applied", "error"])
+
+        retry = self._batch(self.ops).json()
+        self.assertEqual([r["status"] for r in retry["results"]], ["duplicate", "duplicate", "error"])
+        self.assertEqual(Comment.objects.filter(post=self.post).count(), 1)
+        state = retry["posts"][str(self.post.id)]
+        self.assertEqual((state["stars_count"], state["comments_count"], state["has_starred"]), (1, 1, True))
+
+    def test_keys_claimed_by_inflight_request_are_skipped(self):
+        # otro request ya insertó la clave (aún sin marcar como aplicada)
+        BatchReceipt.objects.create(user=self.user, key="k-comment", status="0123456789abcdef")
+        results = self._batch(self.ops[1:2]).json()["results"]
+        self.assertEqual(results, [{"key": "k-comment", "status": "duplicate"}])
+        self.assertFalse(Comment.objects.filter(post=self.post).exists())
+
+    def test_failed_keys_can_be_retried(self):
+        self._batch(self.ops)
+        self.assertEqual(
+            set(BatchReceipt.objects.filter(user=self.user).values_list("key", "status")),
+            {("k-star", "applied"), ("k-comment", "applied")},
+        )
+
+    def test_non_object_body_is_rejected(self):
+        response = self.client.post("/api/finca/batch/", self.ops, format="json")
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(FINCA_TASKS_EAGER=True)
+class HomeTimelineTests(TestCase):
+    """home/: arranque en frío paginado y autores que bajan del umbral de fan-out."""
+
+    def setUp(self):
+        self.author, self.fan, self.other = (
+            User.objects.create_user(n, password=None) for n in ("granja", "vecino", "otro")
+        )
+
+    def _client(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    def test_cold_start_uses_home_envelope_and_cursor(self):
+        posts = [Post.objects.create(author=self.author, text=f"p{i}") for i in range(timeline.PAGE + 5)]
+        client = self._client(self.fan)
+        first = client.get("/api/finca/home/").json()
+        self.assertEqual(len(first["results"]), timeline.PAGE)
+        self.assertIsNotNone(first["next"])
+
+        second = client.get("/api/finca/home/", {"cursor": first["next"]}).json()
+        ids = [p["id"] for p in first["results"] + second["results"]]
+        self.assertEqual(ids, [p.id for p in reversed(posts)])
+        self.assertIsNone(second["next"])
+
+    @mock.patch.object(timeline, "FANOUT_THRESHOLD", 2)
+    def test_posts_from_celebrity_period_survive_dropping_below_threshold(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for user in (self.fan, self.other):
+                self._client(user).post(f"/api/finca/users/{self.author.username}/follow/")
+        with self.captureOnCommitCallbacks(execute=True):
+            post = Post.objects.create(author=self.author, text="Sin fan-out")
+        self.assertIn(post.id, timeline.home_page(self.fan.id)[0])     # mezclado al leer
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self._client(self.other).delete(f"/api/finca/users/{self.author.username}/follow/")
+        self.assertIn(post.id, timeline.home_page(self.fan.id)[0])
+
+
+@override_settings(
+    FINCA_ENGAGEMENT_CACHE=True,
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "viewercache-tests"}},
+)
+class ViewerCacheTests(TestCase):
+    """viewercache: un cambio con el gen desalojado no deja servir el set viejo."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("lector", password=None)
+        self.post = Post.objects.create(author=self.user, text="Cacheado")
+
+    def _starred(self):
+        return self.post.id in prefetch.viewer_flags([self.post.id], self.user)["star"]
+
+    def test_change_after_gen_eviction_drops_data(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            toggles.apply("star", self.post.id, self.user, True)
+        self.assertTrue(self._starred())                    # guarda el set con gen 0
+
+        gen_key, _data_key = viewercache._keys(self.user.id)
+        cache.delete(gen_key)
+        with self.captureOnCommitCallbacks(execute=True):
+            toggles.apply("star", self.post.id, self.user, False)
+        viewercache.read(self.user.id)      # otro request recrea gen=0 y aún no guardó su carga
+        self.assertFalse(self._starred())
+
+
+class GeoNearbyTests(TestCase):
+    """geo.nearby contra fuerza bruta: trópico, antimeridiano y latitudes altas."""
+
+    ORIGINS = [(9.93, -84.08), (-16.5, 179.95), (82.0, 10.0), (64.1, -21.9)]
+
+    @classmethod
+    def setUpTestData(cls):
+        rng = random.Random(7)
+        spots = []
+        for lat, lng in cls.ORIGINS:
+            spots += [
+                (lat + rng.uniform(-2, 2), (lng + rng.uniform(-3, 3) + 180) % 360 - 180)
+                for _ in range(60)
+            ]
+        users = User.objects.bulk_create([User(username=f"geo{i}") for i in range(len(spots))])
+        Profile.objects.bulk_create([
+            Profile(user=u, lat=lat, lng=lng, geohash=geo.encode(lat, lng))
+            for u, (lat, lng) in zip(users, spots)
+        ])
+        cls.points = [(u.id, lat, lng) for u, (lat, lng) in zip(users, spots)]
+
+    def _brute(self, lat, lng):
+        return sorted((geo.distance_km(lat, lng, plat, plng), uid) for uid, plat, plng in self.points)
+
+    def test_radius_matches_brute_force(self):
+        for lat, lng in self.ORIGINS:
+            brute = self._brute(lat, lng)
+            for km in (5, 25, 120, 300):
+                with self.subTest(origin=(lat, lng), km=km):
+                    got = [p.user_id for _, p in geo.nearby(lat, lng, km, limit=1000)]
+                    self.assertEqual(got, [uid for d, uid in brute if d <= km])
+
+    def test_k_nearest_matches_brute_force(self):
+        for lat, lng in self.ORIGINS:
+            brute = [uid for d, uid in self._brute(lat, lng) if d <= geo.MAX_KM]
+            for k in (1, 5, 20):
+                with self.subTest(origin=(lat, lng), k=k):
+                    got = [p.user_id for _, p in geo.nearby(lat, lng, limit=k)]
+                    self.assertEqual(got, brute[:k])
+
+    def test_high_latitude_single_neighbour(self):
+        Profile.objects.all().delete()
+        user = User.objects.create_user("norte", password=None)
+        Profile.objects.create(user=user, lat=82.3, lng=12.0)
+        self.assertEqual([p.user_id for _, p in geo.nearby(82.0, 10.0, limit=1)], [user.id])
+
+    def test_author_ids_loads_only_location(self):
+        ids = geo.author_ids(9.93, -84.08, 50)
+        self.assertEqual(ids, [uid for d, uid in self._brute(9.93, -84.08) if d <= 50])
+
+
+class TrafficCaptureTests(TestCase):
+    """La captura funciona igual en la cadena async (ASGI) que en la sync."""
+
+    async def test_async_request_is_captured(self):
+        with tempfile.NamedTemporaryFile("r", suffix=".jsonl") as fh, \
+                mock.patch.multiple(capture, RATE=1.0, PATH=fh.name):
+            response = await AsyncClient().get("/api/finca/feed/", {"limit": "5", "cursor": "x"})
+            entry = json.loads(fh.readline())
+        self.assertEqual(entry["route"], "api/finca/feed/")
+        self.assertEqual(entry["query"], {"limit": "5", "cursor": "*"})
+        self.assertEqual((entry["status"], entry["user"]), (response.status_code, None))
+
+
+class AdmissionTests(TestCase):
+    """AdmissionMiddleware corre async bajo ASGI y sigue cortando los GET caros."""
+
+    def test_async_chain_is_not_adapted(self):
+        async def get_response(request):
+            return None
+        self.assertTrue(iscoroutinefunction(throttling.AdmissionMiddleware(get_response)))
+
+    async def test_async_expensive_get_over_cap_gets_503(self):
+        with mock.patch.object(throttling, "MAX_INFLIGHT", 0):
+            response = await AsyncClient().get("/api/finca/posts/1/starrers/")
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response["Retry-After"], str(throttling.RETRY_AFTER))
@@ -0,0 +1,148 @@
+# finca/throttling.py
+"""
+Límites de uso: token bucket por usuario y clase de ruta + control de admisión.
+
+TokenBucketThrottle (DEFAULT_THROTTLE_CLASSES)
+- escrituras (POST / PUT / PATCH / DELETE) → bucket "write"
+- GET → solo si la ruta declara throttle_scope en urls.py (p. ej. "expensive")
+- presupuestos en FINCA_THROTTLE_BUDGETS: (ráfaga, tokens por segundo), por
+  usuario (o IP si es anónimo) y por clase
+- el bucket se aproxima con dos ventanas de ráfaga / tokens_por_segundo
+  segundos, la anterior ponderada por lo que aún no se "recargó"; sin el
+  leer-modificar-escribir de SimpleRateThrottle: la ventana actual se cuenta
+  con un incr atómico
+- costo por request: dos idas a la caché (incr de la actual + get de la
+  anterior); tres en el primer request de cada ventana (incr fallido + add)
+- pre-chequeo local: un cliente rechazado se vuelve a rechazar en este proceso
+  sin tocar la caché hasta que pueda reintentar
+- con LocMemCache (por defecto) los presupuestos son por proceso; con una
+  caché compartida, globales
+
+AdmissionMiddleware (sync y async)
+- como mucho FINCA_EXPENSIVE_INFLIGHT GET "expensive" en curso por proceso;
+  el resto recibe 503 con Retry-After antes de pedir conexión a la base, así
+  feed/ y las escrituras siguen teniendo conexiones durante un pico
+"""
+import math
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.http import JsonResponse
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.throttling import BaseThrottle
+
+BUDGETS      = getattr(settings, "FINCA_THROTTLE_BUDGETS", {"write": (60, 1.0), "expensive": (20, 0.5)})
+MAX_INFLIGHT = getattr(settings, "FINCA_EXPENSIVE_INFLIGHT", 8)
+RETRY_AFTER  = getattr(settings, "FINCA_RETRY_AFTER", 2)
+LOCAL_MAX    = 10000
+
+_blocked = {}           # (scope, ident) → monotonic hasta el que se rechaza sin ir a la caché
+_lock = threading.Lock()
+
+
+def take(scope, ident):
+    """Consume un token de `scope` para `ident`; None si pasa, si no los segundos de espera."""
+    burst, rate = BUDGETS[scope]
+    local = (scope, ident)
+    until = _blocked.get(local)
+    if until is not None:
+        left = until - time.monotonic()
+        if left > 0:
+            return left
+        _blocked.pop(local, None)
+
+    period = burst / rate
+    now = time.time()
+    slot, into = divmod(now, period)
+    key = f"finca:tb:{scope}:{ident}:{int(slot)}"
+    try:
+        used = cache.incr(key)
+    except ValueError:
+        # ventana nueva: add ya cuenta este request; si otro la creó antes, incr
+        used = 1 if cache.add(key, 1, math.ceil(period * 2)) else cache.incr(key)
+    previous = cache.get(f"finca:tb:{scope}:{ident}:{int(slot) - 1}", 0)
+    level = previous * (1 - into / period) + used
+    if level <= burst:
+        return None
+
+    wait = max(1 / rate, (level - burst) / rate)
+    with _lock:
+        if len(_blocked) >= LOCAL_MAX:
+            _blocked.clear()
+        _blocked[local] = time.monotonic() + wait
+    return wait
+
+
+def scope_for(method, view_scope):
+    """Clase de presupuesto de un request, o None si no se limita."""
+    scope = "write" if method not in SAFE_METHODS else view_scope
+    return scope if scope in BUDGETS else None
+
+
+class TokenBucketThrottle(BaseThrottle):
+    def allow_request(self, request, view):
+        scope = scope_for(request.method, getattr(view, "throttle_scope", None))
+        if scope is None:
+            return True
+        user = request.user
+        ident = user.pk if user and user.is_authenticated else self.get_ident(request)
+        self._wait = take(scope, ident)
+        return self._wait is None
+
+    def wait(self):
+        return self._wait
+
+
+class AdmissionMiddleware:
+    """Descarta con 503 los GET "expensive" que excedan el cupo de este proceso."""
+
+    sync_capable  = True
+    async_capable = True        # bajo ASGI no obliga a async_to_sync en la cadena (aviews, live/)
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.inflight = 0
+        self.lock = threading.Lock()
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        return self._done(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self._done(request, await self.get_response(request))
+
+    def _done(self, request, response):
+        if getattr(request, "_finca_admitted", False):
+            if response.streaming:
+                # export/ sigue leyendo de la base mientras se envía
+                response._resource_closers.append(self._release)
+            else:
+                self._release()
+        return response
+
+    def _release(self):
+        with self.lock:
+            self.inflight -= 1
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if request.method not in ("GET", "HEAD"):
+            return None
+        if getattr(view_func, "initkwargs", {}).get("throttle_scope") != "expensive":
+            return None
+        with self.lock:
+            admitted = self.inflight < MAX_INFLIGHT
+            if admitted:
+                self.inflight += 1
+        if admitted:
+            request._finca_admitted = True
+            return None
+        response = JsonResponse({"detail": "Servidor ocupado, reintenta en unos segundos."}, status=503)
+        response["Retry-After"] = str(RETRY_AFTER)
+        return response
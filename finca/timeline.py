@@ -0,0 +1,186 @@
+# finca/timeline.py
+"""
+Timeline de inicio con fan-out híbrido.
+
+- Autores normales: al publicar, el post se copia (id + fecha) a TimelineEntry
+  de cada seguidor, en lotes y en segundo plano (fan-out en escritura).
+- Autores con muchos seguidores (followers_count >= FANOUT_THRESHOLD): no se
+  copia nada; sus posts se mezclan al leer (fan-out en lectura).
+- Un autor que baja del umbral deja de mezclarse al leer: sus últimos posts
+  se empujan entonces a todos sus seguidores (demote).
+- Cada timeline se recorta a TIMELINE_MAX entradas (trim_timelines).
+- Sin seguidos (usuario nuevo) → la vista cae al feed global, en páginas de
+  PAGE con el mismo cursor (global_page).
+"""
+import base64
+import heapq
+from datetime import datetime
+
+from django.conf import settings
+from django.db.models import Q
+
+from .models import Follow, Post, TimelineEntry
+
+FANOUT_THRESHOLD = getattr(settings, "FINCA_FANOUT_THRESHOLD", 5000)
+FANOUT_BATCH     = getattr(settings, "FINCA_FANOUT_BATCH", 1000)
+TIMELINE_MAX     = getattr(settings, "FINCA_TIMELINE_MAX", 800)
+BACKFILL         = 50
+PAGE             = 20
+
+
+def is_celebrity(profile):
+    return profile is not None and profile.followers_count >= FANOUT_THRESHOLD
+
+
+# ---- escritura ----
+def fanout_post(post_id):
+    """Copia el post al timeline del autor y de sus seguidores (lotes de FANOUT_BATCH)."""
+    post = Post.objects.select_related("author__finca_profile").filter(pk=post_id).first()
+    if post is None:
+        return
+    TimelineEntry.objects.bulk_create(
+        [TimelineEntry(user_id=post.author_id, post_id=post.id, created_at=post.created_at)],
+        ignore_conflicts=True,
+    )
+    if is_celebrity(getattr(post.author, "finca_profile", None)):
+        return
+
+    last = 0
+    while True:
+        batch = list(
+            Follow.objects.filter(followee_id=post.author_id, follower_id__gt=last)
+            .order_by("follower_id").values_list("follower_id", flat=True)[:FANOUT_BATCH]
+        )
+        if not batch:
+            break
+        TimelineEntry.objects.bulk_create(
+            [TimelineEntry(user_id=uid, post_id=post.id, created_at=post.created_at) for uid in batch],
+            ignore_conflicts=True,
+        )
+        last = batch[-1]
+
+
+def backfill_follow(follower_id, followee_id):
+    """Al seguir a un autor normal, trae sus últimos posts al timeline."""
+    recent = (
+        Post.objects.filter(author_id=followee_id)
+        .order_by("-created_at").values_list("id", "created_at")[:BACKFILL]
+    )
+    TimelineEntry.objects.bulk_create(
+        [TimelineEntry(user_id=follower_id, post_id=pid, created_at=ts) for pid, ts in recent],
+        ignore_conflicts=True,
+    )
+
+
+def demote(author_id):
+    """
+    El autor bajó del umbral: home_page ya no trae sus posts al leer, así que los
+    últimos BACKFILL (publicados sin fan-out) se copian a cada seguidor, por lotes.
+    """
+    recent = list(
+        Post.objects.filter(author_id=author_id)
+        .order_by("-created_at").values_list("id", "created_at")[:BACKFILL]
+    )
+    if not recent:
+        return
+    last = 0
+    while True:
+        batch = list(
+            Follow.objects.filter(followee_id=author_id, follower_id__gt=last)
+            .order_by("follower_id").values_list("follower_id", flat=True)[:FANOUT_BATCH]
+        )
+        if not batch:
+            break
+        TimelineEntry.objects.bulk_create(
+            [TimelineEntry(user_id=uid, post_id=pid, created_at=ts) for uid in batch for pid, ts in recent],
+            ignore_conflicts=True, batch_size=FANOUT_BATCH,
+        )
+        last = batch[-1]
+
+
+def drop_follow(follower_id, followee_id):
+    TimelineEntry.objects.filter(user_id=follower_id, post__author_id=followee_id).delete()
+
+
+def trim(user_id, keep=TIMELINE_MAX):
+    """Borra lo que quede por debajo de las `keep` entradas más recientes."""
+    cutoff = (
+        TimelineEntry.objects.filter(user_id=user_id)
+        .order_by("-created_at", "-post_id").values_list("created_at", "post_id")[keep:keep + 1]
+    )
+    cutoff = list(cutoff)
+    if not cutoff:
+        return 0
+    ts, pid = cutoff[0]
+    return TimelineEntry.objects.filter(user_id=user_id).filter(
+        Q(created_at__lt=ts) | Q(created_at=ts, post_id__lte=pid)
+    ).delete()[0]
+
+
+# ---- lectura ----
+def encode_cursor(ts, post_id):
+    return base64.urlsafe_b64encode(f"{ts.isoformat()}|{post_id}".encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        ts, pid = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(ts), int(pid)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def _before(qs, cursor, ts_field, id_field):
+    if cursor is None:
+        return qs
+    ts, pid = cursor
+    return qs.filter(Q(**{f"{ts_field}__lt": ts}) | Q(**{ts_field: ts, f"{id_field}__lt": pid}))
+
+
+def home_page(viewer_id, cursor=None, limit=PAGE):
+    """
+    Ids de la página (más reciente primero) y cursor siguiente, mezclando el
+    timeline materializado con los posts de autores seguidos "celebridad".
+    Devuelve None si el usuario no sigue a nadie (arranque en frío).
+    """
+    following = Follow.objects.filter(follower_id=viewer_id)
+    if not following.exists():
+        return None
+
+    pushed = (
+        _before(
+            # los posts en borrado siguen en el timeline hasta que deletion.run los limpie
+            TimelineEntry.objects.filter(user_id=viewer_id, post__deleted_at__isnull=True),
+            cursor, "created_at", "post_id",
+        )
+        .order_by("-created_at", "-post_id").values_list("created_at", "post_id")[:limit + 1]
+    )
+    celebrities = following.filter(
+        followee__finca_profile__followers_count__gte=FANOUT_THRESHOLD
+    ).values("followee_id")
+    pulled = (
+        _before(Post.objects.filter(author_id__in=celebrities), cursor, "created_at", "id")
+        .order_by("-created_at", "-id").values_list("created_at", "id")[:limit + 1]
+    )
+
+    ids, seen, last = [], set(), None
+    for ts, pid in heapq.merge(list(pushed), list(pulled), reverse=True):
+        if pid in seen:
+            continue
+        seen.add(pid)
+        if len(ids) == limit:
+            return ids, encode_cursor(*last)
+        ids.append(pid)
+        last = (ts, pid)
+    return ids, None
+
+
+def global_page(cursor=None, limit=PAGE):
+    """Arranque en frío: ids de los posts más nuevos de todos, con el mismo cursor que home_page."""
+    rows = list(
+        _before(Post.objects.all(), cursor, "created_at", "id")
+        .order_by("-created_at", "-id").values_list("created_at", "id")[:limit + 1]
+    )
+    if len(rows) > limit:
+        return [pid for _, pid in rows[:limit]], encode_cursor(*rows[limit - 1])
+    return [pid for _, pid in rows], None
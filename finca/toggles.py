@@ -0,0 +1,103 @@
+# finca/toggles.py
+"""
+Estrella / guardado en una sola sentencia por petición.
+
+El flujo anterior (get_object_or_404 → get_or_create → delete → COUNT) eran
+4+ viajes a la base y, con doble toque, dos get_or_create concurrentes sobre
+el unique_together terminaban en IntegrityError (500).
+
+En Postgres todo va en un solo statement con CTEs:
+
+- `del`: DELETE … RETURNING id (si se pide quitar o alternar)
+- `ins`: INSERT … ON CONFLICT DO NOTHING RETURNING id (si se pide poner, o
+  alternar y no se borró nada); el INSERT sale de `post`, así que un post
+  inexistente no inserta nada
+- contador: COUNT(*) del snapshot + filas insertadas − filas borradas
+
+Como el SQL crudo no dispara signals, el ChangeLog se escribe aquí (sync.record).
+En otros motores (SQLite en desarrollo) se usa el ORM dentro de un savepoint.
+"""
+from django.db import IntegrityError, connection, transaction
+from django.utils import timezone
+
+from . import sync
+from .models import ChangeLog, Post, PostSave, PostStar
+
+MODELS = {"star": PostStar, "save": PostSave}
+
+_SQL = """
+WITH post AS (
+    SELECT id FROM {post} WHERE id = %(post)s AND deleted_at IS NULL
+), del AS (
+    DELETE FROM {table}
+    WHERE post_id = %(post)s AND user_id = %(user)s AND %(unset)s
+    RETURNING id, created_at
+), ins AS (
+    INSERT INTO {table} (post_id, user_id, created_at)
+    SELECT id, %(user)s, %(now)s FROM post
+    WHERE %(set)s AND NOT EXISTS (SELECT 1 FROM del)
+    ON CONFLICT (post_id, user_id) DO NOTHING
+    RETURNING id
+)
+SELECT
+    (SELECT id FROM post),
+    (SELECT id FROM ins),
+    (SELECT id FROM del),
+    (SELECT COUNT(*) FROM {table} WHERE post_id = %(post)s)
+        + (SELECT COUNT(*) FROM ins) - (SELECT COUNT(*) FROM del),
+    (SELECT created_at FROM del)
+"""
+
+
+def _postgres(model, post_id, user, want):
+    qn = connection.ops.quote_name
+    sql = _SQL.format(post=qn(Post._meta.db_table), table=qn(model._meta.db_table))
+    with connection.cursor() as cursor:
+        cursor.execute(sql, {
+            "post": post_id, "user": user.id, "now": timezone.now(),
+            "set": want is not False, "unset": want is not True,
+        })
+        return cursor.fetchone()
+
+
+def _orm(model, post_id, user, want):
+    if not Post.objects.filter(id=post_id).exists():
+        return None, None, None, 0
+    inserted = deleted = None
+    if want is not True:
+        deleted = (
+            model.objects.filter(post_id=post_id, user=user)
+            .values_list("id", flat=True).first()
+        )
+        if deleted is not None:
+            model.objects.filter(id=deleted).delete()   # signals → ChangeLog
+    if want is not False and deleted is None:
+        try:
+            with transaction.atomic():
+                inserted = model.objects.create(post_id=post_id, user=user).id
+        except IntegrityError:
+            pass                                        # otro request ganó la carrera
+    return post_id, inserted, deleted, model.objects.filter(post_id=post_id).count()
+
+
+def apply(kind, post_id, user, want=None):
+    """
+    Pone (want=True), quita (want=False) o alterna (want=None) la interacción
+    `kind` del usuario sobre el post. Devuelve (has, count) o None si el post
+    no existe. PUT / DELETE son idempotentes: repetirlos no cambia nada.
+    """
+    model = MODELS[kind]
+    if connection.vendor == "postgresql":
+        found, inserted, deleted, count, removed_since = _postgres(model, post_id, user, want)
+        if inserted is not None:
+            sync.record(kind, ChangeLog.CREATE, inserted, post_id=post_id, actor_id=user.id)
+        if deleted is not None:
+            # `removed_since`: created_at de la fila borrada (trending resta ese término)
+            sync.record(kind, ChangeLog.DELETE, deleted, post_id=post_id, actor_id=user.id, when=removed_since)
+    else:
+        found, inserted, deleted, count = _orm(model, post_id, user, want)
+    if found is None:
+        return None
+    # alternar: si no se borró nada, la fila quedó (insertada aquí o por la carrera)
+    has = want if want is not None else deleted is None
+    return has, count
@@ -0,0 +1,104 @@
+# finca/trending.py
+"""
+Puntaje "trending" materializado en PostScore, mantenido incrementalmente.
+
+Cada interacción suma w · e^((t - EPOCH) / TAU): lo reciente pesa más y nada
+hay que "envejecer" después (decaimiento relativo). Se guarda en espacio
+logarítmico, así que cada evento es un solo UPDATE atómico:
+
+    score' = logaddexp(score, ln(w) + (t - EPOCH) / TAU)
+
+Quitar una interacción resta el término con su fecha original (el created_at
+de la fila borrada), con el argumento del logaritmo acotado para no llegar a
+ln(0); compact_trending recalcula exacto los posts recientes y descarta los viejos.
+"""
+import math
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db.models import Case, F, FloatField, Value, When
+from django.db.models.functions import Abs, Exp, Greatest, Ln
+from django.utils import timezone
+
+from .models import Post, PostScore, PostStar, Comment, PostWhatsAppShare, PostSave
+
+EPOCH     = datetime(2025, 1, 1, tzinfo=dt_timezone.utc)
+HALF_LIFE = timedelta(hours=getattr(settings, "FINCA_TRENDING_HALF_LIFE_HOURS", 12))
+TAU       = HALF_LIFE.total_seconds() / math.log(2)
+HORIZON   = timedelta(days=getattr(settings, "FINCA_TRENDING_HORIZON_DAYS", 14))
+
+# peso por tipo de evento ("post" = la publicación misma)
+WEIGHTS = {"post": 1.0, "star": 1.0, "comment": 2.0, "save": 2.0, "repost": 3.0, "whatsapp": 3.0}
+MIN_REMAINDER = 1e-12
+
+
+def event_score(entity, when=None):
+    when = when or timezone.now()
+    return math.log(WEIGHTS[entity]) + (when - EPOCH).total_seconds() / TAU
+
+
+def _logaddexp(a, b):
+    if a is None:
+        return b
+    hi, lo = (a, b) if a >= b else (b, a)
+    return hi + math.log1p(math.exp(lo - hi))
+
+
+def on_post_created(post):
+    PostScore.objects.create(post_id=post.id, score=event_score("post", post.created_at))
+
+
+def bump(post_id, entity, added=True, count=1, when=None):
+    """
+    Aplica `count` eventos iguales (altas o bajas) al puntaje del post: un
+    UPDATE, sin leer antes. n eventos simultáneos suman ln(n) al exponente.
+    `when`: fecha del evento (en una baja, la de la fila borrada); por defecto ahora.
+    """
+    x = Value(event_score(entity, when) + math.log(count), output_field=FloatField())
+    one = Value(1.0, output_field=FloatField())
+    if added:
+        new = Greatest(F("score"), x) + Ln(one + Exp(-Abs(F("score") - x)))
+    else:
+        # score ≈ x → 1 − e^(x−score) ≈ 0: se acota para que Postgres no evalúe ln(0)
+        tiny = Value(MIN_REMAINDER, output_field=FloatField())
+        new = Case(
+            When(score__gt=x, then=F("score") + Ln(Greatest(one - Exp(x - F("score")), tiny))),
+            default=F("score"),
+        )
+    PostScore.objects.filter(post_id=post_id).update(score=new)
+
+
+def recompute(since=None):
+    """
+    Recalcula exacto el puntaje de los posts creados desde `since` (por
+    defecto HORIZON) y borra los puntajes de los anteriores.
+    Devuelve (recalculados, borrados).
+    """
+    since = since or timezone.now() - HORIZON
+    scores = {
+        pid: event_score("post", ts)
+        for pid, ts in Post.objects.filter(created_at__gte=since).values_list("id", "created_at").iterator()
+    }
+    sources = [
+        ("star", PostStar.objects, "post_id"),
+        ("comment", Comment.objects, "post_id"),
+        ("save", PostSave.objects, "post_id"),
+        ("whatsapp", PostWhatsAppShare.objects, "post_id"),
+        ("repost", Post.objects, "repost_of_id"),
+    ]
+    for entity, manager, fk in sources:
+        rows = manager.filter(**{f"{fk}__in": list(scores)}).values_list(fk, "created_at")
+        for pid, ts in rows.iterator(chunk_size=5000):
+            scores[pid] = _logaddexp(scores[pid], event_score(entity, ts))
+
+    existing = set(PostScore.objects.filter(post_id__in=list(scores)).values_list("post_id", flat=True))
+    PostScore.objects.bulk_update(
+        [PostScore(post_id=pid, score=s) for pid, s in scores.items() if pid in existing],
+        ["score"], batch_size=1000,
+    )
+    PostScore.objects.bulk_create(
+        [PostScore(post_id=pid, score=s) for pid, s in scores.items() if pid not in existing],
+        batch_size=1000, ignore_conflicts=True,
+    )
+    dropped = PostScore.objects.exclude(post__created_at__gte=since).delete()[0]
+    return len(scores), dropped
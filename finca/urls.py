@@ -1,38 +1,82 @@
 # finca/urls.py
+from django.conf import settings
 from django.urls import path
+from . import aviews, media
+from .pagination import TimelinePagination
 from .views import (
-    MyFincaViewSet, PostViewSet, CommentViewSet, CoverSlideViewSet
+    MyFincaViewSet, PostViewSet, CommentViewSet, CoverSlideViewSet, FollowViewSet,
+    NotificationViewSet, live_stream, live_ticket,
 )
 
+# throttle_scope="expensive": GET sin paginar → presupuesto propio y cupo de
+# concurrencia (throttling.py); las escrituras usan siempre el bucket "write"
 finca_view        = MyFincaViewSet.as_view({"get": "list", "put": "update", "post": "create"})
+finca_bundle      = MyFincaViewSet.as_view({"get": "bundle"})
+finca_export      = MyFincaViewSet.as_view({"get": "export_data"}, throttle_scope="expensive")
+finca_nearby      = MyFincaViewSet.as_view({"get": "nearby"})
 post_view         = PostViewSet.as_view({"get": "list", "post": "create"})
 post_detail       = PostViewSet.as_view({"patch": "partial_update", "delete": "destroy"})
 post_feed         = PostViewSet.as_view({"get": "feed"})
+post_home         = PostViewSet.as_view({"get": "home"})
 post_saved        = PostViewSet.as_view({"get": "saved"})             # 🔖
-post_star         = PostViewSet.as_view({"post": "star"})
-post_starrers     = PostViewSet.as_view({"get": "starrers"})
-post_comments     = PostViewSet.as_view({"get": "comments", "post": "comments"})
+post_sync         = PostViewSet.as_view({"get": "sync"})
+post_batch        = PostViewSet.as_view({"post": "batch"})
+post_timeline     = PostViewSet.as_view({"get": "timeline"}, pagination_class=TimelinePagination)
+post_tag          = PostViewSet.as_view({"get": "tag_posts"}, pagination_class=TimelinePagination)
+post_mentions     = PostViewSet.as_view({"get": "mentions"}, pagination_class=TimelinePagination)
+post_star         = PostViewSet.as_view({"post": "star", "put": "star", "delete": "star"})
+post_starrers     = PostViewSet.as_view({"get": "starrers"}, throttle_scope="expensive")
+post_deletion     = PostViewSet.as_view({"get": "deletion_status"})
+post_comments     = PostViewSet.as_view({"get": "comments", "post": "comments"}, throttle_scope="expensive")
 post_whatsapp     = PostViewSet.as_view({"post": "whatsapp"})
-post_whatsappers  = PostViewSet.as_view({"get": "whatsappers"})
+post_whatsappers  = PostViewSet.as_view({"get": "whatsappers"}, throttle_scope="expensive")
 post_repost       = PostViewSet.as_view({"post": "repost"})
-post_reposters    = PostViewSet.as_view({"get": "reposters"})
-post_save         = PostViewSet.as_view({"post": "save"})             # 🔖
-post_savers       = PostViewSet.as_view({"get": "savers"})            # 🔖
+post_reposters    = PostViewSet.as_view({"get": "reposters"}, throttle_scope="expensive")
+post_save         = PostViewSet.as_view({"post": "save", "put": "save", "delete": "save"})  # 🔖
+post_savers       = PostViewSet.as_view({"get": "savers"}, throttle_scope="expensive")  # 🔖
+
+# GET de solo lectura como corrutinas bajo ASGI (aviews.py); POST y msgpack siguen en DRF
+if getattr(settings, "FINCA_ASYNC_VIEWS", False):
+    post_feed        = aviews.with_fallback(aviews.feed, post_feed)
+    post_saved       = aviews.with_fallback(aviews.saved, post_saved)
+    post_comments    = aviews.with_fallback(aviews.comments, post_comments)
+    post_starrers    = aviews.with_fallback(aviews.starrers, post_starrers)
+    post_whatsappers = aviews.with_fallback(aviews.whatsappers, post_whatsappers)
+    post_reposters   = aviews.with_fallback(aviews.reposters, post_reposters)
+    post_savers      = aviews.with_fallback(aviews.savers, post_savers)
 
 # borrar comentario (autor del comentario o autor del post)
 comment_detail    = CommentViewSet.as_view({"delete": "destroy"})
 
+# seguir / dejar de seguir
+user_follow       = FollowViewSet.as_view({"post": "create", "delete": "destroy"})
+
+# notificaciones
+notifications      = NotificationViewSet.as_view({"get": "list"})
+notifications_read = NotificationViewSet.as_view({"post": "read"})
+
 # slides de portada
 cover_slides      = CoverSlideViewSet.as_view({"get": "list", "post": "create"})
 
 urlpatterns = [
     path("",                           finca_view,        name="mi-finca"),
+    path("bundle/",                    finca_bundle,      name="mi-finca-bundle"),
+    path("export/",                    finca_export,      name="mi-finca-export"),
+    path("fincas/nearby/",             finca_nearby,      name="finca-nearby"),
     path("posts/",                     post_view,         name="finca-posts"),
     path("posts/<int:pk>/",            post_detail,       name="finca-post-detail"),
     path("feed/",                      post_feed,         name="finca-feed"),
+    path("home/",                      post_home,         name="finca-home"),
     path("saved/",                     post_saved,        name="finca-saved"),
+    path("sync/",                      post_sync,         name="finca-sync"),
+    path("batch/",                     post_batch,        name="finca-batch"),
+    path("users/<str:username>/posts/", post_timeline,    name="finca-user-posts"),
+    path("tags/<str:tag>/posts/",      post_tag,          name="finca-tag-posts"),
+    path("mentions/",                  post_mentions,     name="finca-mentions"),
+    path("users/<str:username>/follow/", user_follow,     name="finca-user-follow"),
     path("posts/<int:pk>/star/",       post_star,         name="finca-post-star"),
     path("posts/<int:pk>/starrers/",   post_starrers,     name="finca-post-starrers"),
+    path("posts/<int:pk>/deletion/",   post_deletion,     name="finca-post-deletion"),
     path("posts/<int:pk>/comments/",   post_comments,     name="finca-post-comments"),
     path("posts/<int:pk>/whatsapp/",   post_whatsapp,     name="finca-post-whatsapp"),
     path("posts/<int:pk>/whatsappers/",post_whatsappers,  name="finca-post-whatsappers"),
@@ -44,6 +88,21 @@ urlpatterns = [
     # eliminar comentario
     path("comments/<int:pk>/",         comment_detail,    name="finca-comment-detail"),
 
+    # notificaciones
+    path("notifications/",             notifications,     name="finca-notifications"),
+    path("notifications/read/",        notifications_read, name="finca-notifications-read"),
+
+    # eventos en vivo (SSE)
+    path("live/",                      live_stream,       name="finca-live"),
+    path("live/ticket/",               live_ticket,       name="finca-live-ticket"),
+
     # slides de portada
     path("cover-slides/",              cover_slides,      name="finca-cover-slides"),
+
+    # pantalla de otra finca (al final: <username> captura cualquier segmento)
+    path("<str:username>/bundle/",     finca_bundle,      name="finca-bundle"),
 ]
+
+# media firmada (media.py): sin FINCA_MEDIA_SIGNED no hay ruta, no un servidor de archivos abierto
+if getattr(settings, "FINCA_MEDIA_SIGNED", False):
+    urlpatterns += [path("media/<path:name>", media.serve, name="finca-media")]
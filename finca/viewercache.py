@@ -0,0 +1,105 @@
+# finca/viewercache.py
+"""
+Cache por usuario de los posts con los que interactuó (star / save /
+whatsapp / repost), para resolver has_* de cualquier página sin tocar la base.
+
+Formato: una sola clave por usuario con {tipo: bytes}, donde bytes es un
+array ordenado de int64 (membership con bisect sobre un memoryview, sin
+copiar). Un tipo con más de MAX_IDS ids se guarda como None y ese tipo
+sigue yendo por SQL.
+
+Versionado: junto a los datos vive un contador `gen` por usuario.
+- lectura: get_many([gen, datos]) → un solo viaje al cache; los datos solo
+  valen si se guardaron con el `gen` actual
+- carga (miss): se lee el gen, luego la base, y se guarda con ese gen; si
+  entre medio hubo un cambio el gen ya avanzó y la carga queda descartada
+- cambio (sync._side_effects, tras el commit): incr(gen) y, si los datos
+  estaban al día (gen - 1), se actualizan en su lugar; si no, se borran.
+  Si el gen ya no está (desalojado), también se borran: al recrearlo en 0
+  unos datos viejos con gen 0 volverían a parecer vigentes
+- el gen no vence (los datos sí, con TTL): que expire antes que unos datos
+  que apply() sigue renovando no debe poder resucitar una copia vieja
+"""
+from array import array
+from bisect import bisect_left
+
+from django.conf import settings
+from django.core.cache import cache
+
+SCHEMA  = 1     # subir si cambia el formato: invalida todo
+TTL     = getattr(settings, "FINCA_ENGAGEMENT_CACHE_TTL", 24 * 3600)
+MAX_IDS = getattr(settings, "FINCA_ENGAGEMENT_CACHE_MAX", 20000)
+KINDS   = ("star", "save", "whatsapp", "repost")
+
+
+def enabled():
+    """
+    FINCA_ENGAGEMENT_CACHE: True / False, o None = automático. Los cambios se
+    aplican en el cache del proceso que los hizo, así que en automático solo
+    se activa con un cache compartido (Redis, Memcached…), no con LocMemCache.
+    """
+    flag = getattr(settings, "FINCA_ENGAGEMENT_CACHE", None)
+    if flag is None:
+        backend = settings.CACHES["default"]["BACKEND"]
+        return not backend.endswith(("LocMemCache", "DummyCache"))
+    return flag
+
+
+def _keys(user_id):
+    return f"finca:eng:{SCHEMA}:{user_id}:gen", f"finca:eng:{SCHEMA}:{user_id}"
+
+
+def pack(ids):
+    ids = sorted(set(ids))
+    return array("q", ids).tobytes() if len(ids) <= MAX_IDS else None
+
+
+def contains(blob, post_id):
+    ids = memoryview(blob).cast("q")
+    i = bisect_left(ids, post_id)
+    return i < len(ids) and ids[i] == post_id
+
+
+def read(user_id):
+    """(datos o None si no hay / están viejos, gen actual)."""
+    gen_key, data_key = _keys(user_id)
+    got = cache.get_many([gen_key, data_key])
+    gen, data = got.get(gen_key), got.get(data_key)
+    if gen is None:
+        cache.add(gen_key, 0, None)
+        return None, 0
+    if data is None or data.get("gen") != gen:
+        return None, gen
+    return data, gen
+
+
+def store(user_id, gen, blobs):
+    """Guarda {tipo: bytes | None} calculado con la base leída tras `gen`."""
+    cache.set(_keys(user_id)[1], {"gen": gen, **blobs}, TTL)
+
+
+def apply(user_id, kind, post_id, added):
+    """Refleja un alta / baja confirmada en el set del usuario."""
+    gen_key, data_key = _keys(user_id)
+    try:
+        gen = cache.incr(gen_key)
+    except ValueError:
+        cache.delete(data_key)                  # sin gen no se sabe si los datos están al día
+        return
+    data = cache.get(data_key)
+    if data is None:
+        return
+    if data.get("gen") != gen - 1 or data.get(kind) is None:
+        cache.delete(data_key)                  # hubo otro cambio en paralelo: que recargue
+        return
+    ids = array("q")
+    ids.frombytes(data[kind])
+    i = bisect_left(ids, post_id)
+    present = i < len(ids) and ids[i] == post_id
+    if added and not present:
+        ids.insert(i, post_id)
+    elif not added and present:
+        del ids[i]
+    data[kind] = ids.tobytes() if len(ids) <= MAX_IDS else None
+    data["gen"] = gen
+    cache.set(data_key, data, TTL)
@@ -1,14 +1,36 @@
 # finca/views.py
-from django.db.models import Count
+import hashlib
+
+from django.contrib.auth.models import User
+from django.core.exceptions import ObjectDoesNotExist
+from django.core.handlers.asgi import ASGIRequest
+from django.db import IntegrityError, transaction
+from django.db.models import F, Max, Q
+from django.http import Http404, JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.cache import patch_vary_headers
+from rest_framework.authtoken.models import Token
 from rest_framework import viewsets, permissions, status
-from rest_framework.parsers import JSONParser, MultiPartParser, FormParser
+from rest_framework.parsers import MultiPartParser, FormParser
 from rest_framework.response import Response
-from rest_framework.decorators import action
+from rest_framework.settings import api_settings
+from rest_framework.decorators import action, api_view, permission_classes
 
-from .models import Profile, Post, PostStar, Comment, PostWhatsAppShare, PostSave, CoverSlide
+from .models import (
+    Profile, Post, Comment, PostWhatsAppShare, CoverSlide, ChangeLog, Follow,
+    Notification, PostDeletion, Mention, PostTag,
+)
+from .pagination import NotificationPagination, TimelinePagination
+from .parsers import FastJSONParser, MessagePackParser
+from .renderers import CompactJSONRenderer
+from . import (
+    batch, covers, deletion, export, fastpath, feedcache, geo, live, notifications, prefetch, shares, sync, tags, tasks,
+    timeline, toggles,
+)
 from .serializers import (
-    ProfileSerializer, PostSerializer, CommentSerializer, abs_url, CoverSlideSerializer
+    ProfileSerializer, PostSerializer, CommentSerializer, abs_url, CoverSlideSerializer,
+    _user_preview, public_profile,
 )
 
 
@@ -28,11 +50,29 @@ class IsCommentOwnerOrPostAuthor(permissions.BasePermission):
         return (obj.user_id == request.user.id) or (obj.post.author_id == request.user.id)
 
 
+def _cover_payload(slides, request):
+    """Slides ya evaluados → respuesta de cover-slides/ (caption/biblio del primero)."""
+    first = slides[0] if slides else None
+    return {
+        "results": CoverSlideSerializer(slides, many=True, context={"request": request}).data,
+        "caption": first.caption if first else "",
+        "bibliography": first.bibliography if first else "",
+    }
+
+
 # ---------- PERFIL (mi finca) ----------
 class MyFincaViewSet(viewsets.ModelViewSet):
+    """
+    /api/finca/                    GET, PUT, POST (mi perfil)
+    /api/finca/bundle/             GET (perfil + portada + primera página de posts)
+    /api/finca/<username>/bundle/  GET (lo mismo para otra finca)
+    /api/finca/export/             GET (ZIP con mis datos y archivos, en streaming)
+    /api/finca/fincas/nearby/      GET (fincas cercanas: ?near=lat,lng|me, ?radius=km, ?limit=)
+    """
     serializer_class   = ProfileSerializer
     permission_classes = [permissions.IsAuthenticated, IsOwner]
-    parser_classes     = [JSONParser, MultiPartParser, FormParser]
+    parser_classes     = [FastJSONParser, MessagePackParser, MultiPartParser, FormParser]
+    throttle_scope     = None      # urls.py: "expensive" en export/
 
     def get_serializer_context(self):
         ctx = super().get_serializer_context()
@@ -40,7 +80,11 @@ class MyFincaViewSet(viewsets.ModelViewSet):
         return ctx
 
     def get_object(self):
-        perfil, _ = Profile.objects.get_or_create(user=self.request.user)
+        # user + users.Profile (date_of_birth / gender) en la misma consulta
+        perfil, _ = (
+            Profile.objects.select_related("user", "user__profile")
+            .get_or_create(user=self.request.user)
+        )
         return perfil
 
     def list(self, request, *args, **kwargs):
@@ -56,63 +100,210 @@ class MyFincaViewSet(viewsets.ModelViewSet):
         kwargs["partial"] = True
         return super().update(request, *args, **kwargs)
 
+    # -------- BUNDLE --------
+    BUNDLE_POSTS = 12
+
+    @action(detail=False, methods=["get"], url_path="bundle")
+    def bundle(self, request, username=None):
+        """
+        Toda la pantalla de una finca en un solo request y con un número fijo
+        de consultas: perfil (1), slides (1), versión (1) y la primera página
+        de posts (1 + resolución por lotes de prefetch.resolve).
+        Soporta GET condicional: If-None-Match → 304 sin tocar los posts.
+        De otra finca solo se devuelve el perfil público (serializers.public_profile).
+        """
+        if username is None or username == request.user.username:
+            profile = self.get_object()
+        else:
+            owner = get_object_or_404(User.objects.select_related("finca_profile"), username=username)
+            try:
+                profile = owner.finca_profile
+            except ObjectDoesNotExist:
+                profile = Profile(user=owner)      # sin perfil todavía: el de por defecto, sin escribir
+        owner_id = profile.user_id
+        is_owner = owner_id == request.user.id
+        slides = list(CoverSlide.objects.filter(user_id=owner_id).order_by("index"))
+
+        # versión: perfiles + slides + último cambio en posts/interacciones del dueño
+        version = ChangeLog.objects.filter(
+            Q(actor_id=owner_id) | Q(post_id__in=Post.objects.filter(author_id=owner_id).values("id"))
+        ).aggregate(m=Max("id"))["m"]
+        user_profile = getattr(profile.user, "profile", None) if is_owner else None
+        etag = '"%s"' % hashlib.md5(repr((
+            request.user.id, profile.updated_at, getattr(user_profile, "updated_at", None),
+            [(s.id, s.updated_at) for s in slides], version, self.BUNDLE_POSTS,
+        )).encode()).hexdigest()
+        if etag in request.headers.get("If-None-Match", ""):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            rows = list(
+                prefetch.with_counts(Post.objects.filter(author_id=owner_id))
+                .order_by("-created_at", "-id")[:self.BUNDLE_POSTS + 1]
+            )
+            posts = rows[:self.BUNDLE_POSTS]
+            ctx = {"request": request, "page_state": prefetch.resolve(posts, request.user)}
+            response = Response({
+                "profile": (
+                    self.get_serializer(profile).data if is_owner else public_profile(profile, request)
+                ),
+                "cover": _cover_payload(slides, request),
+                "posts": {
+                    "results": fastpath.posts(posts, ctx),
+                    "has_more": len(rows) > self.BUNDLE_POSTS,
+                },
+            })
+        response["ETag"] = etag
+        patch_vary_headers(response, ["Authorization"])
+        return response
+
+    # -------- FINCAS CERCANAS --------
+    @action(detail=False, methods=["get"], url_path="fincas/nearby")
+    def nearby(self, request):
+        """
+        Con ?radius= todas las fincas dentro del radio; sin él las ?limit= (20,
+        máx. 100) más cercanas. Por defecto alrededor de mi finca (?near=me).
+        Cada resultado: preview del usuario + distance_km (sin coordenadas).
+        """
+        try:
+            lat, lng = geo.origin(request.query_params.get("near"), request.user)
+        except ValueError as exc:
+            return Response({"detail": str(exc)}, status=400)
+        try:
+            limit = min(max(int(request.query_params.get("limit") or 20), 1), 100)
+        except ValueError:
+            limit = 20
+        radius = geo.radius(request.query_params.get("radius"))
+        results = []
+        for km, profile in geo.nearby(lat, lng, radius, limit, exclude_user_id=request.user.id):
+            item = _user_preview(profile.user, request)
+            item["distance_km"] = round(km, 1)
+            results.append(item)
+        return Response({"results": results})
+
+    # -------- EXPORTACIÓN --------
+    @action(detail=False, methods=["get"], url_path="export")
+    def export_data(self, request):
+        """
+        ZIP con todos los datos y archivos del usuario. Se arma mientras se
+        envía (export.py): no pasa por RAM ni por un archivo temporal.
+        """
+        stamp = timezone.localtime().strftime("%Y%m%d")
+        response = StreamingHttpResponse(export.stream(request.user), content_type="application/zip")
+        response["Content-Disposition"] = (
+            f'attachment; filename="finca-{request.user.username}-{stamp}.zip"'
+        )
+        response["X-Accel-Buffering"] = "no"
+        return response
+
 
 # ---------- POSTS ----------
 class PostViewSet(viewsets.ModelViewSet):
     """
     /api/finca/posts/        GET, POST  (solo mis posts)
-    /api/finca/posts/<id>/   PATCH, DELETE (solo autor)
-    /api/finca/feed/         GET (todos los posts)
+    /api/finca/posts/<id>/   PATCH, DELETE (solo autor; el DELETE se completa en segundo plano)
+    /api/finca/posts/<id>/deletion/     GET  (progreso del borrado)
+    /api/finca/feed/         GET (todos los posts; ?order=trending)
+    /api/finca/home/         GET (posts de las fincas que sigo)
     /api/finca/saved/        GET (posts guardados por el usuario)
-    /api/finca/posts/<id>/star/         POST (toggle)
+    /api/finca/users/<username>/posts/  GET (timeline de otra finca, cursor)
+    /api/finca/tags/<tag>/posts/        GET (posts con #tag en el texto o los comentarios, cursor)
+    /api/finca/mentions/                GET (posts y comentarios que me mencionan, cursor)
+    /api/finca/posts/<id>/star/         POST (toggle), PUT / DELETE (fijar estado)
     /api/finca/posts/<id>/starrers/     GET  (listado usuarios)
     /api/finca/posts/<id>/comments/     GET, POST (árbol / crear)
     /api/finca/posts/<id>/whatsapp/     POST (registrar share idempotente)
     /api/finca/posts/<id>/whatsappers/  GET  (listado usuarios)
     /api/finca/posts/<id>/repost/       POST (crear/obtener repost propio)
     /api/finca/posts/<id>/reposters/    GET  (listado usuarios que compartieron)
-    /api/finca/posts/<id>/save/         POST (toggle guardado)
+    /api/finca/posts/<id>/save/         POST (toggle guardado), PUT / DELETE (fijar estado)
     /api/finca/posts/<id>/savers/       GET  (listado usuarios que guardaron)
+    /api/finca/sync/?since=<token>      GET  (cambios desde el último token)
+    /api/finca/batch/                   POST (cola offline: stars, guardados, shares, comentarios)
+
+    posts/, feed/ y saved/ aceptan ?format=compact: usuarios y originales de
+    repost van una sola vez en las tablas `users` / `posts` y los posts los
+    referencian por id.
     """
     serializer_class   = PostSerializer
     permission_classes = [permissions.IsAuthenticated, IsAuthor]
-    parser_classes     = [JSONParser, MultiPartParser, FormParser]
+    parser_classes     = [FastJSONParser, MessagePackParser, MultiPartParser, FormParser]
+    throttle_scope     = None      # urls.py: "expensive" en los GET sin paginar
+    renderer_classes   = [*api_settings.DEFAULT_RENDERER_CLASSES, CompactJSONRenderer]
 
     def get_serializer_context(self):
         ctx = super().get_serializer_context()
         ctx["request"] = self.request
         return ctx
 
+    def _list_response(self, qs, author=None, base=None, load=None):
+        """
+        Pagina (si aplica) y serializa con la página resuelta por lotes.
+        - ?fields=a,b,c   campos dispersos
+        - ?format=compact normaliza usuarios/posts en tablas laterales
+        - author          todos los posts son del mismo autor (se asigna sin join)
+        - base            PageState sin viewer ya calculado (feedcache)
+        - load            filas de la página → posts (qs sobre un índice, p. ej. PostTag)
+        """
+        page = self.paginate_queryset(qs)
+        rows = list(page if page is not None else qs)
+        if load is not None:
+            rows = load(rows)
+        data, ctx = self._serialize_rows(rows, author, base)
+        compact = "users" in ctx
+
+        if page is not None:
+            response = self.get_paginated_response(data)
+            if compact:
+                response.data["users"] = ctx["users"]
+                response.data["posts"] = ctx["posts"]
+            return response
+        if compact:
+            data = {"users": ctx["users"], "posts": ctx["posts"], "results": data}
+        return Response(data)
+
+    def _serialize_rows(self, rows, author=None, base=None):
+        """Serializa posts ya evaluados; devuelve (data, contexto)."""
+        if author is not None:
+            for post in rows:
+                post.author = author
+
+        ctx = self.get_serializer_context()
+        raw_fields = self.request.query_params.get("fields")
+        fields = {f.strip() for f in raw_fields.split(",") if f.strip()} if raw_fields else None
+        ctx["fields"] = fields
+        ctx["previews"] = {}
+        ctx["page_state"] = prefetch.resolve(rows, self.request.user, fields, base)
+        compact = getattr(self.request.accepted_renderer, "format", None) == "compact"
+        if compact:
+            ctx["users"] = {}
+            ctx["posts"] = {}
+        serializer_class = self.get_serializer_class()
+        if self.request.method == "GET" and serializer_class is PostSerializer:
+            data = fastpath.posts(rows, ctx)    # misma salida, sin la maquinaria de DRF
+        else:
+            data = serializer_class(rows, many=True, context=ctx).data
+        return data, ctx
+
     # listado por defecto: SOLO mis posts
     def get_queryset(self):
-        return (
-            Post.objects
-            .filter(author=self.request.user)
-            .select_related("author")
-            .prefetch_related(
-                # 🔁
-                "reposts__author", "reposts__author__finca_profile",
-                # ⭐
-                "stars__user", "stars__user__finca_profile",
-                # 💬
-                "comments__user", "comments__user__finca_profile",
-                # 📲
-                "whatsapp_shares__user", "whatsapp_shares__user__finca_profile",
-                # 🔖
-                "saves__user", "saves__user__finca_profile",
-            )
-            .annotate(
-                comments_count=Count("comments"),
-                whatsapp_count=Count("whatsapp_shares"),
-                reposts_count=Count("reposts"),
-                saves_count=Count("saves"),
-            )
-            .order_by("-created_at")
-        )
+        return prefetch.with_counts(
+            Post.objects.filter(author=self.request.user)
+        ).order_by("-created_at")
 
+    def list(self, request, *args, **kwargs):
+        return self._list_response(self.filter_queryset(self.get_queryset()))
+
+    @transaction.atomic
     def perform_create(self, serializer):
-        serializer.save(author=self.request.user)
+        post = serializer.save(author=self.request.user)
+        tags.index_posts([post])
 
+    def perform_update(self, serializer):
+        post = serializer.save()
+        if "text" in serializer.validated_data:
+            tags.index_posts([post])
+
+    @transaction.atomic
     def partial_update(self, request, *args, **kwargs):
         """
         Edición parcial (PATCH) con soporte para limpiar media:
@@ -148,40 +339,140 @@ class PostViewSet(viewsets.ModelViewSet):
 
         return response
 
+    @transaction.atomic
     def destroy(self, request, *args, **kwargs):
+        """
+        Oculta el post al instante y borra lo que cuelga de él en segundo
+        plano (deletion.py). Progreso en GET posts/<id>/deletion/.
+        """
         instance = self.get_object()
         self.check_object_permissions(request, instance)
-        instance.delete()
+        deletion.start(instance)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+    @action(detail=True, methods=["get"], url_path="deletion",
+            permission_classes=[permissions.IsAuthenticated])
+    def deletion_status(self, request, pk=None):
+        """Progreso del borrado de un post propio."""
+        job = get_object_or_404(PostDeletion, post_id=pk, author=request.user)
+        return Response({
+            "post": job.post_id,
+            "total": job.total,
+            "done": job.done,
+            "finished": job.finished_at is not None,
+        })
+
     # -------- FEED GLOBAL --------
     @action(detail=False, methods=["get"], url_path="feed",
             permission_classes=[permissions.IsAuthenticated])
     def feed(self, request):
+        """
+        ?order=trending → top-K por PostScore (índice en score, sin Count() por request);
+        ?near=lat,lng|me [&radius=km] → los más nuevos de las fincas cercanas (geo.py);
+        ?limit= (por defecto 50, máx. 100).
+        Cronológico con ?limit= → los N más nuevos desde la copia precalculada
+        (feedcache); sin ?limit= devuelve todo, como siempre.
+        Contrato de la copia: has_* es en vivo; los *_count pueden ir un rebuild
+        por detrás (hasta FINCA_FEED_HEAD_TTL s). El contador exacto tras una
+        interacción propia es el que devuelve star/, save/, whatsapp/…
+        """
+        try:
+            rows, base = feedcache.select(request.query_params, request.user)
+        except ValueError as exc:
+            return Response({"detail": str(exc)}, status=400)
+        return self._list_response(rows, base=base)
+
+    def _feed_queryset(self):
+        return feedcache.queryset()
+
+    # -------- INICIO (posts de quienes sigo) --------
+    @action(detail=False, methods=["get"], url_path="home",
+            permission_classes=[permissions.IsAuthenticated])
+    def home(self, request):
+        """
+        Timeline personal: fan-out híbrido (timeline.py), paginado con ?cursor=.
+        Si el usuario aún no sigue a nadie devuelve el feed global con el mismo
+        sobre y cursor (la primera página sale de la copia de feedcache).
+        """
+        cursor = request.query_params.get("cursor")
+        cursor = timeline.decode_cursor(cursor) if cursor else None
+        page, base = timeline.home_page(request.user.id, cursor), None
+        if page is None:
+            cached = feedcache.head() if cursor is None and feedcache.HEAD > timeline.PAGE else None
+            if cached is not None:
+                rows, base = cached
+                last = rows[timeline.PAGE - 1] if len(rows) > timeline.PAGE else None
+                rows = rows[:timeline.PAGE]
+                next_cursor = timeline.encode_cursor(last.created_at, last.id) if last else None
+            else:
+                page = timeline.global_page(cursor)
+
+        if page is not None:
+            ids, next_cursor = page
+            by_id = prefetch.with_counts(Post.objects.filter(id__in=ids)).in_bulk()
+            rows = [by_id[i] for i in ids if i in by_id]
+        data, ctx = self._serialize_rows(rows, base=base)
+        payload = {"results": data, "next": next_cursor}
+        if "users" in ctx:
+            payload.update(users=ctx["users"], posts=ctx["posts"])
+        return Response(payload)
+
+    # -------- TIMELINE PÚBLICO DE UNA FINCA --------
+    @action(detail=False, methods=["get"], url_path=r"users/(?P<username>[^/.]+)/posts",
+            permission_classes=[permissions.IsAuthenticated], pagination_class=TimelinePagination)
+    def timeline(self, request, username=None):
+        """
+        Posts de <username> con paginación por cursor (índice author, -created_at, -id).
+        El autor y su perfil se cargan una vez por página, no por post.
+        """
+        owner = get_object_or_404(User.objects.select_related("finca_profile"), username=username)
+        qs = prefetch.with_counts(Post.objects.filter(author=owner), select_author=False)
+        return self._list_response(qs, author=owner)
+
+    # -------- HASHTAGS Y MENCIONES --------
+    @action(detail=False, methods=["get"], url_path=r"tags/(?P<tag>[^/.]+)/posts",
+            permission_classes=[permissions.IsAuthenticated], pagination_class=TimelinePagination)
+    def tag_posts(self, request, tag=None):
+        """Posts con #<tag> (texto o comentarios), por el índice (tag, -created_at, -id)."""
+        def load(rows):
+            ids = [row.post_id for row in rows]
+            by_id = prefetch.with_counts(Post.objects.filter(id__in=ids)).in_bulk()
+            return [by_id[i] for i in ids if i in by_id]
+
+        qs = PostTag.objects.filter(tag=tags.normalize(tag), post__deleted_at__isnull=True)
+        return self._list_response(qs, load=load)
+
+    @action(detail=False, methods=["get"], url_path="mentions",
+            permission_classes=[permissions.IsAuthenticated], pagination_class=TimelinePagination)
+    def mentions(self, request):
+        """
+        Menciones del usuario autenticado (más reciente primero, cursor):
+        { id, created_at, author, comment: {id, text} | null, post }
+        """
         qs = (
-            Post.objects
-            .select_related("author")
-            .prefetch_related(
-                "reposts__author", "reposts__author__finca_profile",
-                "stars__user", "stars__user__finca_profile",
-                "comments__user", "comments__user__finca_profile",
-                "whatsapp_shares__user", "whatsapp_shares__user__finca_profile",
-                "saves__user", "saves__user__finca_profile",
-            )
-            .annotate(
-                stars_count=Count("stars"),
-                comments_count=Count("comments"),
-                whatsapp_count=Count("whatsapp_shares"),
-                reposts_count=Count("reposts"),
-                saves_count=Count("saves"),
-            )
-            .order_by("-created_at")
+            Mention.objects.filter(user=request.user, post__deleted_at__isnull=True)
+            .select_related("author", "author__finca_profile", "comment")
         )
         page = self.paginate_queryset(qs)
-        ser = self.get_serializer(page or qs, many=True)
-        if page is not None:
-            return self.get_paginated_response(ser.data)
-        return Response(ser.data)
+        ids = list(dict.fromkeys(m.post_id for m in page))
+        by_id = prefetch.with_counts(Post.objects.filter(id__in=ids)).in_bulk()
+        data, ctx = self._serialize_rows([by_id[i] for i in ids if i in by_id])
+        posts = {d["id"]: d for d in data}
+        results = [
+            {
+                "id": m.id,
+                "created_at": m.created_at,
+                "author": _user_preview(m.author, request),
+                "comment": {"id": m.comment.id, "text": m.comment.text} if m.comment_id else None,
+                "post": posts.get(m.post_id),
+            }
+            for m in page
+        ]
+        response = self.get_paginated_response(results)
+        if "users" in ctx:
+            response.data["users"] = ctx["users"]
+            response.data["posts"] = ctx["posts"]
+        return response
 
     # -------- LISTA DE GUARDADOS --------
     @action(detail=False, methods=["get"], url_path="saved",
@@ -191,51 +482,111 @@ class PostViewSet(viewsets.ModelViewSet):
         Lista las publicaciones que el usuario autenticado ha guardado.
         Ordenadas por fecha de guardado (más reciente primero).
         """
-        qs = (
-            Post.objects
-            .filter(saves__user=request.user)
-            .select_related("author")
-            .prefetch_related(
-                "reposts__author", "reposts__author__finca_profile",
-                "stars__user", "stars__user__finca_profile",
-                "comments__user", "comments__user__finca_profile",
-                "whatsapp_shares__user", "whatsapp_shares__user__finca_profile",
-                "saves__user", "saves__user__finca_profile",
-            )
-            .annotate(
-                stars_count=Count("stars"),
-                comments_count=Count("comments"),
-                whatsapp_count=Count("whatsapp_shares"),
-                reposts_count=Count("reposts"),
-                saves_count=Count("saves"),
-            )
-            .order_by("-saves__created_at", "-created_at")
+        qs = prefetch.with_counts(
+            Post.objects.filter(saves__user=request.user)
+        ).order_by("-saves__created_at", "-created_at")
+        return self._list_response(qs)
+
+    # -------- SYNC INCREMENTAL --------
+    @action(detail=False, methods=["get"], url_path="sync",
+            permission_classes=[permissions.IsAuthenticated])
+    def sync(self, request):
+        """
+        Cambios desde ?since=<token>:
+        - posts=<ids>    posts que el cliente tiene en pantalla/caché
+        - threads=<ids>  posts cuyos comentarios tiene abiertos
+        Sin token (o si fue compactado) responde reset=true y el token actual.
+        """
+        def _ids(name):
+            raw = request.query_params.get(name) or ""
+            return [int(x) for x in raw.split(",") if x.strip().isdigit()]
+
+        try:
+            since = int(request.query_params.get("since") or 0)
+        except ValueError:
+            return Response({"detail": "since inválido."}, status=400)
+
+        if since <= 0 or since < sync.compaction_horizon():
+            return Response({"reset": True, "token": str(sync.current_token())})
+
+        changes = sync.collect_changes(
+            since, request.user.id, held_posts=_ids("posts"), threads=_ids("threads"),
         )
-        page = self.paginate_queryset(qs)
-        ser = self.get_serializer(page or qs, many=True)
-        if page is not None:
-            return self.get_paginated_response(ser.data)
-        return Response(ser.data)
+        ctx = self.get_serializer_context()
+        posts = list(self._feed_queryset().filter(id__in=changes["upserted_posts"]))
+        ctx["page_state"] = prefetch.resolve(posts, request.user)
+        comments = (
+            Comment.objects.filter(id__in=changes["new_comments"])
+            .select_related("user", "user__finca_profile")
+            .order_by("created_at")
+        )
+        return Response({
+            "reset": False,
+            "token": str(changes["token"]),
+            "has_more": changes["has_more"],
+            "posts": fastpath.posts(posts, ctx),
+            "deleted_posts": changes["deleted_posts"],
+            "counter_deltas": changes["counter_deltas"],
+            "viewer": changes["viewer"],
+            "comments": [
+                {
+                    "id": c.id, "post": c.post_id, "parent": c.parent_id, "text": c.text,
+                    "created_at": c.created_at, "user": _user_preview(c.user, request),
+                }
+                for c in comments
+            ],
+            "deleted_comments": changes["deleted_comments"],
+        })
+
+    # -------- LOTE OFFLINE --------
+    @action(detail=False, methods=["post"], url_path="batch",
+            permission_classes=[permissions.IsAuthenticated])
+    def batch(self, request):
+        """
+        Cola offline en un solo request:
+        { "operations": [ {"key": "uuid", "op": "star|unstar|save|unsave|whatsapp|comment",
+                           "post": <id>, "text": "...", "parent": <id|null>}, ... ] }
+        Devuelve el resultado por operación y el estado final de cada post afectado.
+        """
+        if not isinstance(request.data, dict):
+            return Response({"detail": "Se espera un objeto con operations."}, status=400)
+        try:
+            results, post_ids = batch.apply(request.user, request.data.get("operations"))
+        except batch.BatchError as exc:
+            return Response({"detail": str(exc)}, status=400)
+
+        flags = prefetch.viewer_flags(list(post_ids), request.user) if post_ids else {}
+        counts = (
+            prefetch.with_counts(Post.objects.filter(id__in=post_ids))
+            .values("id", *prefetch.COUNTS)
+        )
+        state = {}
+        for row in counts:
+            post_id = row.pop("id")
+            for kind, (flag, _sample, _first) in prefetch.FIELDS.items():
+                row[flag] = post_id in flags.get(kind, ())
+            state[post_id] = row
+        return Response({"results": results, "posts": state})
 
     # -------- REACCIONES (⭐) --------
-    @action(detail=True, methods=["post"], url_path="star",
+    def _toggle(self, request, kind, pk):
+        """POST alterna; PUT pone y DELETE quita (idempotentes, seguros de reintentar)."""
+        want = {"POST": None, "PUT": True, "DELETE": False}[request.method]
+        result = toggles.apply(kind, int(pk), request.user, want)
+        if result is None:
+            raise Http404
+        return result
+
+    @action(detail=True, methods=["post", "put", "delete"], url_path="star",
             permission_classes=[permissions.IsAuthenticated])
+    @transaction.atomic
     def star(self, request, pk=None):
         """
-        Toggle de estrella para el usuario autenticado sobre el post <pk>.
-        No exige ser autor del post.
+        Estrella del usuario autenticado sobre el post <pk> (POST alterna,
+        PUT / DELETE fijan el estado). No exige ser autor del post.
         """
-        post = get_object_or_404(Post, pk=pk)
-        obj, created = PostStar.objects.get_or_create(post=post, user=request.user)
-        if not created:
-            obj.delete()
-            has = False
-        else:
-            has = True
-        return Response({
-            "has_starred": has,
-            "stars_count": PostStar.objects.filter(post=post).count()
-        })
+        has, count = self._toggle(request, "star", pk)
+        return Response({"has_starred": has, "stars_count": count})
 
     @action(detail=True, methods=["get"], url_path="starrers",
             permission_classes=[permissions.IsAuthenticated])
@@ -260,6 +611,7 @@ class PostViewSet(viewsets.ModelViewSet):
     # -------- COMENTARIOS --------
     @action(detail=True, methods=["get", "post"], url_path="comments",
             permission_classes=[permissions.IsAuthenticated])
+    @transaction.atomic
     def comments(self, request, pk=None):
         """
         GET: devuelve árbol de comentarios (solo raíces con sus 'replies').
@@ -268,14 +620,7 @@ class PostViewSet(viewsets.ModelViewSet):
         post = get_object_or_404(Post, pk=pk)
 
         if request.method.lower() == "get":
-            roots = (
-                Comment.objects
-                .filter(post=post, parent__isnull=True)
-                .select_related("user", "user__finca_profile")
-                .prefetch_related("replies__user", "replies__user__finca_profile", "replies__replies")
-                .order_by("created_at")
-            )
-            data = CommentSerializer(roots, many=True, context={"request": request}).data
+            data = fastpath.comment_tree(post, request)
             return Response({"count": post.comments.count(), "results": data})
 
         # POST
@@ -287,24 +632,34 @@ class PostViewSet(viewsets.ModelViewSet):
         if parent_id:
             parent = get_object_or_404(Comment, pk=parent_id, post=post)
 
-        c = Comment.objects.create(post=post, user=request.user, text=text, parent=parent)
+        with transaction.atomic():             # comentario e índice de tags juntos o nada
+            c = Comment.objects.create(post=post, user=request.user, text=text, parent=parent)
+            tags.index_comments([c])
         ser = CommentSerializer(c, context={"request": request})
         return Response({"created": ser.data, "count": post.comments.count()}, status=201)
 
     # -------- 📲 WHATSAPP --------
     @action(detail=True, methods=["post"], url_path="whatsapp",
             permission_classes=[permissions.IsAuthenticated])
+    @transaction.atomic
     def whatsapp(self, request, pk=None):
         """
         Registra (idempotente) que el usuario compartió por WhatsApp.
         No se hace toggle; si ya existe no se duplica.
         """
         post = get_object_or_404(Post, pk=pk)
-        PostWhatsAppShare.objects.get_or_create(post=post, user=request.user)
+        if shares.enabled():
+            # write-behind: se anota en el buffer y se vuelca en lote (shares.py);
+            # el contador suma lo pendiente que aún no está en la base
+            shares.buffer.add(post.id, request.user.id)
+            count = shares.count(post.id)
+        else:
+            PostWhatsAppShare.objects.get_or_create(post=post, user=request.user)
+            count = PostWhatsAppShare.objects.filter(post=post).count()
         return Response({
             "created": True,
             "has_shared_whatsapp": True,
-            "whatsapp_count": PostWhatsAppShare.objects.filter(post=post).count(),
+            "whatsapp_count": count,
         })
 
     @action(detail=True, methods=["get"], url_path="whatsappers",
@@ -330,6 +685,7 @@ class PostViewSet(viewsets.ModelViewSet):
     # -------- 🔁 REPOST --------
     @action(detail=True, methods=["post"], url_path="repost",
             permission_classes=[permissions.IsAuthenticated])
+    @transaction.atomic
     def repost(self, request, pk=None):
         """
         Crea (idempotente) un post de 'repost' del original <pk>.
@@ -369,23 +725,16 @@ class PostViewSet(viewsets.ModelViewSet):
         return Response({"count": qs.count(), "results": results})
 
     # -------- 🔖 GUARDADOS --------
-    @action(detail=True, methods=["post"], url_path="save",
+    @action(detail=True, methods=["post", "put", "delete"], url_path="save",
             permission_classes=[permissions.IsAuthenticated])
+    @transaction.atomic
     def save(self, request, pk=None):
         """
-        Toggle de 'guardado' para el usuario autenticado sobre el post <pk>.
+        'Guardado' del usuario autenticado sobre el post <pk> (POST alterna,
+        PUT / DELETE fijan el estado).
         """
-        post = get_object_or_404(Post, pk=pk)
-        obj, created = PostSave.objects.get_or_create(post=post, user=request.user)
-        if not created:
-            obj.delete()
-            has = False
-        else:
-            has = True
-        return Response({
-            "has_saved": has,
-            "saves_count": PostSave.objects.filter(post=post).count(),
-        })
+        has, count = self._toggle(request, "save", pk)
+        return Response({"has_saved": has, "saves_count": count})
 
     @action(detail=True, methods=["get"], url_path="savers",
             permission_classes=[permissions.IsAuthenticated])
@@ -414,14 +763,107 @@ class CommentViewSet(viewsets.GenericViewSet):
     serializer_class = CommentSerializer
     permission_classes = [permissions.IsAuthenticated, IsCommentOwnerOrPostAuthor]
 
+    @transaction.atomic
     def destroy(self, request, pk=None):
         obj = get_object_or_404(Comment, pk=pk)
         self.check_object_permissions(request, obj)
         post = obj.post
+        # el tag puede seguir en otro comentario: se recalcula el post entero
+        retag = bool(tags.hashtags(obj.text)) or obj.replies.exists()
         obj.delete()
+        if retag:
+            tags.index_posts([post])
         return Response({"count": post.comments.count()}, status=status.HTTP_204_NO_CONTENT)
 
 
+# ---- Seguir / dejar de seguir ----
+class FollowViewSet(viewsets.ViewSet):
+    """
+    POST   /api/finca/users/<username>/follow/  → seguir (idempotente)
+    DELETE /api/finca/users/<username>/follow/  → dejar de seguir
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    @transaction.atomic
+    def create(self, request, username=None):
+        followee = get_object_or_404(User, username=username)
+        if followee.id == request.user.id:
+            return Response({"detail": "No puedes seguirte a ti mismo."}, status=400)
+        profile, _ = Profile.objects.get_or_create(user=followee)
+        # doble toque: sin get_or_create, que en carrera sobre el unique_together daba 500
+        try:
+            with transaction.atomic():
+                Follow.objects.create(follower=request.user, followee=followee)
+            created = True
+        except IntegrityError:
+            created = False                     # ya lo seguía (u otro request ganó la carrera)
+        if created:
+            Profile.objects.filter(pk=profile.pk).update(followers_count=F("followers_count") + 1)
+            profile.refresh_from_db(fields=["followers_count"])
+            if not timeline.is_celebrity(profile):
+                tasks.defer(timeline.backfill_follow, request.user.id, followee.id)
+        return Response({"following": True, "followers_count": profile.followers_count},
+                        status=201 if created else 200)
+
+    @transaction.atomic
+    def destroy(self, request, username=None):
+        followee = get_object_or_404(User, username=username)
+        deleted, _ = Follow.objects.filter(follower=request.user, followee=followee).delete()
+        if deleted:
+            Profile.objects.filter(user=followee, followers_count__gt=0).update(
+                followers_count=F("followers_count") - 1
+            )
+            tasks.defer(timeline.drop_follow, request.user.id, followee.id)
+            # la fila queda bloqueada hasta el commit: solo un unfollow ve el cruce del umbral
+            count = Profile.objects.filter(user=followee).values_list("followers_count", flat=True).first()
+            if count == timeline.FANOUT_THRESHOLD - 1:
+                tasks.defer(timeline.demote, followee.id)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+# ---- Notificaciones ----
+class NotificationViewSet(viewsets.GenericViewSet):
+    """
+    GET  /api/finca/notifications/       → agregadas, cursor (más recientes primero)
+    POST /api/finca/notifications/read/  → marca todas como leídas
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class   = NotificationPagination
+
+    def get_queryset(self):
+        return Notification.objects.filter(recipient=self.request.user)
+
+    def list(self, request):
+        page = self.paginate_queryset(self.get_queryset())
+        actor_ids = {uid for n in page for uid in n.actor_ids}
+        actors = {
+            u.id: _user_preview(u, request)
+            for u in User.objects.filter(id__in=actor_ids).select_related("finca_profile")
+        }
+        results = []
+        for n in page:
+            previews = [actors[uid] for uid in n.actor_ids if uid in actors]
+            results.append({
+                "id": n.id, "kind": n.kind, "post": n.post_id,
+                "actor_count": n.actor_count, "actors": previews,
+                "summary": notifications.summary(n, previews),
+                "read": n.read, "updated_at": n.updated_at,
+            })
+        response = self.get_paginated_response(results)
+        response.data["unread"] = (
+            Profile.objects.filter(user=request.user)
+            .values_list("unread_notifications", flat=True).first() or 0
+        )
+        return response
+
+    @action(detail=False, methods=["post"], url_path="read")
+    @transaction.atomic
+    def read(self, request):
+        self.get_queryset().filter(read=False).update(read=True)
+        Profile.objects.filter(user=request.user).update(unread_notifications=0)
+        return Response({"unread": 0})
+
+
 # ========= CoverSlide (listar / guardar) =========
 class CoverSlideViewSet(viewsets.ViewSet):
     """
@@ -433,73 +875,59 @@ class CoverSlideViewSet(viewsets.ViewSet):
       - caption / bibliography a nivel global (fallback si no viene por-slot)
     """
     permission_classes = [permissions.IsAuthenticated]
-    parser_classes     = [JSONParser, MultiPartParser, FormParser]
+    parser_classes     = [FastJSONParser, MessagePackParser, MultiPartParser, FormParser]
 
     def list(self, request):
-        qs = CoverSlide.objects.filter(user=request.user).order_by("index")
-        ser = CoverSlideSerializer(qs, many=True, context={"request": request})
-        first = qs.first()
-        return Response({
-            "results": ser.data,
-            "caption": first.caption if first else "",
-            "bibliography": first.bibliography if first else "",
-        })
+        slides = list(CoverSlide.objects.filter(user=request.user).order_by("index"))
+        return Response(_cover_payload(slides, request))
 
     def create(self, request):
         common_caption = (request.data.get("caption") or "").strip()
         common_biblio  = (request.data.get("bibliography") or "").strip()
 
-        out = []
-        for idx in range(3):
-            f = request.FILES.get(f"slide{idx}")
-            clear = request.data.get(f"slide{idx}_clear")
-            # por-slot campos (opcionales)
-            slot_caption = (request.data.get(f"slide{idx}_caption") or "").strip()
-            slot_biblio  = (request.data.get(f"slide{idx}_bibliography") or "").strip()
-            slot_text_x  = request.data.get(f"slide{idx}_text_x")
-            slot_text_y  = request.data.get(f"slide{idx}_text_y")
-            slot_color   = request.data.get(f"slide{idx}_color")
-            slot_font    = request.data.get(f"slide{idx}_font")
-            slot_size    = request.data.get(f"slide{idx}_text_size")
-            slot_effect  = request.data.get(f"slide{idx}_effect")
-
-            obj, _ = CoverSlide.objects.get_or_create(user=request.user, index=idx)
-
-            if clear:
-                if obj.image:
-                    obj.image.delete(save=False)
-                obj.image = None
-
-            if f:
-                obj.image = f
-
-            # caption/bibliography por slide (con fallback global)
-            if slot_caption or common_caption:
-                obj.caption = slot_caption if slot_caption != "" else common_caption
-            if slot_biblio or common_biblio:
-                obj.bibliography = slot_biblio if slot_biblio != "" else common_biblio
-
-            # Guardado defensivo de extras (solo si existen en el modelo)
-            def _set_if_has(field, value, caster=lambda v: v):
-                if value is None:
-                    return
-                if hasattr(obj, field):
-                    try:
-                        setattr(obj, field, caster(value))
-                    except Exception:
-                        pass
-
-            # posiciones/estilos (si tu modelo los tiene)
-            _set_if_has("text_x", slot_text_x, float)
-            _set_if_has("text_y", slot_text_y, float)
-            _set_if_has("text_color", slot_color, str)
-            _set_if_has("text_font", slot_font, str)
-            _set_if_has("text_size", slot_size, float)
-            _set_if_has("effect", slot_effect, str)
-
-            obj.save()
-            out.append(obj)
+        # una transacción, solo los slots que cambian (covers.py)
+        out = covers.save(request.user, request.data, request.FILES, common_caption, common_biblio)
 
         ser = CoverSlideSerializer(out, many=True, context={"request": request})
         # devolvemos también eco del caption/biblio global por conveniencia
         return Response({"results": ser.data, "caption": common_caption, "bibliography": common_biblio})
+
+
+# ========= En vivo (SSE) =========
+@api_view(["POST"])
+@permission_classes([permissions.IsAuthenticated])
+def live_ticket(request):
+    """POST /api/finca/live/ticket/ → ticket firmado de corta vida para ?ticket= de live/."""
+    return Response({"ticket": live.ticket(request.user.id), "expires_in": live.ticket_ttl()})
+
+
+async def live_stream(request):
+    """
+    GET /api/finca/live/?posts=1,2,3[&ticket=<ticket>]
+    Server-Sent Events con los cambios de contadores y comentarios nuevos de
+    esos posts, agrupados cada 250 ms. Solo bajo ASGI: cada conexión inactiva
+    es una corrutina; bajo WSGI ocuparía un worker mientras dure (501).
+    Auth: header `Authorization: Token <key>` o ?ticket= (EventSource no
+    permite headers; ver live.ticket).
+    """
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({"detail": "live/ requiere el servidor ASGI."}, status=501)
+
+    auth = request.headers.get("Authorization", "")
+    if auth.startswith("Token "):
+        ok = await Token.objects.filter(key=auth[6:].strip(), user__is_active=True).aexists()
+    else:
+        user_id = live.ticket_user(request.GET.get("ticket", ""))
+        ok = user_id is not None and await User.objects.filter(id=user_id, is_active=True).aexists()
+    if not ok:
+        return JsonResponse({"detail": "Credenciales no válidas."}, status=401)
+
+    post_ids = [int(x) for x in request.GET.get("posts", "").split(",") if x.strip().isdigit()][:200]
+    if not post_ids:
+        return JsonResponse({"detail": "posts requerido."}, status=400)
+
+    sub = live.bus.subscribe(post_ids)
+    response = StreamingHttpResponse(live.stream(sub), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response